@@ -1,12 +1,12 @@
 # api_client.py (النسخة النهائية والمعدلة)
 import requests
-import json
 import pandas as pd
 from datetime import datetime, timedelta
 
 # استيراد الدوال من ملفاتك
 from data_pull import fetch_crypto_data_from_coingecko
 from feature_engineering import create_features 
+from request_body import encode_body
 
 # --- إعدادات العميل ---
 BASE_API_URL = "http://localhost:8000" # تم تغيير الاسم إلى BASE
@@ -34,11 +34,12 @@ def prepare_payload(features_df: pd.DataFrame) -> dict:
     payload = {"sequence": sequence_as_list}
     return payload
 
-def call_api(url: str, payload: dict) -> float:
-    """تم تعديل الدالة لتستقبل رابط URL متغير."""
-    headers = {"Content-Type": "application/json"}
+def call_api(url: str, payload: dict, encoding: str = 'gzip') -> float:
+    """تم تعديل الدالة لتستقبل رابط URL متغير.
+    يتم ضغط جسم الطلب افتراضياً (gzip، أو zstd إذا كانت مكتبة zstandard مثبتة، أو None بدون ضغط)."""
+    body, headers = encode_body(payload, encoding)
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = requests.post(url, headers=headers, data=body)
         response.raise_for_status()
         result = response.json()
         return result.get('prediction')
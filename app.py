@@ -1,79 +1,105 @@
 # app.py (النسخة النهائية والمعدلة)
 
 import os
-import glob
+import json
+import time
+import threading
+from contextlib import nullcontext
 from datetime import datetime
-from flask import Flask, request, jsonify, abort
+from flask import Flask, request, jsonify, abort, Response
 import logging
 
+import metrics
+import profiling
+from prediction_cache import PREDICTION_CACHE, sequence_hash
+from prediction_log import log_prediction
+from request_body import read_json, RequestBodyError, MAX_REQUEST_BYTES
+from forecast_store import ForecastStore
+
 # افترض أن دوالك موجودة في model_forecast.py
-from model_forecast import load_prediction_assets, make_prediction
+from model_forecast import load_prediction_assets, make_prediction, warm_up
+from model_registry import registry_path, load_registry, resolve_artifacts, features_hash
 
 # --- إعداد التطبيق ---
 app = Flask(__name__)
+# الحد الأقصى لحجم الطلب كما يصل عبر الشبكة (مضغوطاً أو لا)؛ الحجم بعد فك الضغط محدود في request_body
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
 logging.basicConfig(level=logging.INFO)
 
 
 # --- تعريف المسارات المطلقة بناءً على إعدادات render.yaml ---
 # هذا يضمن أن التطبيق يقرأ ويكتب من القرص الصلب الدائم
-MODELS_DIR = '/data/models'
-DATA_DIR = '/data/data' # افترضنا أن ملفات csv ستكون في مجلد 'data' داخل القرص
+# يمكن تغييرها عبر متغيرات البيئة (مثلاً لتشغيل اختبار الحمل على بيانات محلية)
+MODELS_DIR = os.environ.get('MODELS_DIR', '/data/models')
+DATA_DIR = os.environ.get('DATA_DIR', '/data/data') # افترضنا أن ملفات csv ستكون في مجلد 'data' داخل القرص
+# عائلة النماذج المخدومة: lstm (الافتراضي) أو gbm (أشجار تعزيز بزمن استجابة منخفض، ملفات gbm_<coin>_<date>.joblib)
+# أو student (طالب مقطّر من LSTM عبر distill.py، ملفات student_<coin>_<date>.pth)
+MODEL_TYPE = os.environ.get('MODEL_TYPE', 'lstm').lower()
+MODEL_SUFFIX = '.joblib' if MODEL_TYPE == 'gbm' else '.pth'
+MODEL_CONFIGS = {'gbm': 'config/config_gbm.json', 'student': 'config/config_student.json'}
+# عدد تمريرات الإحماء التركيبية لكل نموذج قبل أن تعلن العملية جاهزيتها عبر /ready (0 لتعطيل الإحماء)
+WARMUP_PASSES = int(os.environ.get('WARMUP_PASSES', '3'))
 
 
 # --- دوال مساعدة ووظائف تحميل النماذج ---
 
-def find_latest_file(directory, coin, prefix, suffix):
-    """
-    تبحث هذه الدالة في مجلد معين عن أحدث ملف يطابق نمطًا محددًا.
-    """
-    search_pattern = os.path.join(directory, f"{prefix}{coin}_*{suffix}")
-    files = glob.glob(search_pattern)
-    if not files:
-        return None
-
-    latest_file = None
-    latest_date = None
-
-    for file_path in files:
-        filename = os.path.basename(file_path)
-        try:
-            date_str = filename.replace(f"{prefix}{coin}_", "").replace(suffix, "")
-            current_date = datetime.strptime(date_str, '%d%m%Y')
-            if latest_date is None or current_date > latest_date:
-                latest_date = current_date
-                latest_file = file_path
-        except ValueError:
-            app.logger.warning(f"Ignoring file with incorrect date format: {filename}")
-            continue
-    return latest_file
-
 def load_all_assets(target_coins):
     """
     يقوم بتحميل أصول النماذج لجميع العملات المستهدفة.
     """
     loaded_assets = {}
+    # سجل النماذج (registry.json) يُقرأ مرة واحدة، ثم يتم تحديد ملفات كل عملة ببحث مباشر دون مسح المجلدات
+    registry = load_registry(registry_path(MODELS_DIR))
     for coin in target_coins:
         app.logger.info(f"--- Loading assets for {coin.upper()} ---")
+        load_started = time.perf_counter()
         try:
-            MODEL_TYPE = 'lstm'
-            CONFIG_PATH = 'config/config_nn.json'
+            CONFIG_PATH = MODEL_CONFIGS.get(MODEL_TYPE, 'config/config_nn.json')
             FEATURES_PATH = 'config/features.json'
             
-            # البحث عن أحدث الملفات ديناميكياً في المسارات المطلقة
-            MODEL_PATH = find_latest_file(MODELS_DIR, coin, f"{MODEL_TYPE}_", ".pth")
-            VALID_DATA_PATH = find_latest_file(DATA_DIR, coin, "", ".csv")
+            # الملفات من السجل؛ العملات غير المسجلة بعد يُبحث عن أحدث ملفاتها في المجلدات (find_latest_file)
+            # نموذج الآفاق المتعددة اختياري (lstm_horizon_<coin>_<date>.pth)، متاح لنماذج LSTM فقط
+            artifacts = resolve_artifacts(coin, MODEL_TYPE, MODELS_DIR, DATA_DIR, registry, MODEL_SUFFIX)
+            MODEL_PATH = artifacts['model_path']
+            VALID_DATA_PATH = artifacts['data_path']
+            HORIZON_MODEL_PATH = artifacts['horizon_model_path'] if MODEL_TYPE == 'lstm' else None
 
-            if not MODEL_PATH or not VALID_DATA_PATH:
+            if not MODEL_PATH or not (VALID_DATA_PATH or artifacts['scaler_path']):
                 raise FileNotFoundError(f"Could not find model or data files for {coin.upper()} in persistent storage")
 
+            # النموذج المسجل يحمل بصمة قائمة الميزات التي دُرّب عليها
+            if artifacts['features_hash']:
+                with open(FEATURES_PATH) as f:
+                    if features_hash(json.load(f)['features']) != artifacts['features_hash']:
+                        raise ValueError(f"Model {artifacts['version']} was trained on a different features list")
+
             # تحميل الأصول للعملة الحالية
             coin_assets = load_prediction_assets(
-                CONFIG_PATH, FEATURES_PATH, MODEL_PATH, MODEL_TYPE, VALID_DATA_PATH, coin
+                CONFIG_PATH, FEATURES_PATH, MODEL_PATH, MODEL_TYPE, VALID_DATA_PATH, coin,
+                horizon_model_path=HORIZON_MODEL_PATH, scaler_path=artifacts['scaler_path']
             )
+            # إصدار النموذج هو اسم ملفه بدون اللاحقة (مثلاً lstm_btc_19102026)
+            coin_assets['model_info'] = {
+                "coin": coin,
+                "model_type": MODEL_TYPE,
+                "model_version": artifacts['version'],
+                "model_file": os.path.basename(MODEL_PATH),
+                "data_file": os.path.basename(VALID_DATA_PATH) if VALID_DATA_PATH else None,
+                "source": artifacts['source'],
+                "metrics": artifacts['metrics'],
+                "max_horizon": coin_assets['max_horizon'],
+                "horizon_model_version": os.path.splitext(os.path.basename(HORIZON_MODEL_PATH))[0] if HORIZON_MODEL_PATH else None,
+                "loaded_at": datetime.now().isoformat(timespec='seconds'),
+            }
             loaded_assets[coin] = coin_assets
+            metrics.ASSET_LOAD_SECONDS.observe(time.perf_counter() - load_started, coin=coin)
             app.logger.info(f"Assets for {coin.upper()} loaded successfully using {os.path.basename(MODEL_PATH)}")
+            # تنبيه إذا لم يُحمّل نموذج آفاق متعددة: ?horizon=H سيُرفض لهذه العملة
+            if MODEL_TYPE == 'lstm' and coin_assets['max_horizon'] == 1:
+                app.logger.warning(f"{coin.upper()} ({artifacts['source']}) has no horizon model; only horizon=1 is served")
 
         except Exception as e:
+            metrics.ASSET_LOAD_FAILURES.inc(coin=coin)
             app.logger.error(f"FATAL: Could not load assets for {coin.upper()}. Error: {e}")
     return loaded_assets
 
@@ -86,6 +112,43 @@ TARGET_COINS = [
 ]
 assets_by_coin = load_all_assets(TARGET_COINS)
 
+# التنبؤات المحسوبة مسبقاً بواسطة train_worker.py (تُقرأ من القرص الدائم)
+forecast_store = ForecastStore()
+
+
+def warm_up_coin(coin, coin_assets):
+    """إحماء نماذج عملة واحدة وتسجيل زمن أول تمريرة والتمريرات التالية."""
+    timings = warm_up(coin_assets, passes=WARMUP_PASSES)
+    if timings:
+        metrics.WARMUP_SECONDS.observe(timings[0], coin=coin, phase='first')
+        for seconds in timings[1:]:
+            metrics.WARMUP_SECONDS.observe(seconds, coin=coin, phase='steady')
+    return timings
+
+
+# حالة الإحماء لهذه العملية: /health يعمل فوراً، بينما /ready لا يعيد 200 إلا بعد انتهاء الإحماء
+warmup_state = {"done": threading.Event(), "coins": {}, "started_at": None, "finished_at": None}
+
+
+def warm_up_all():
+    """إحماء كل العملات المحمّلة في خيط خلفي (تعمل مرة واحدة في كل عملية gunicorn)."""
+    warmup_state["started_at"] = datetime.now().isoformat(timespec='seconds')
+    for coin, coin_assets in list(assets_by_coin.items()):
+        try:
+            timings = warm_up_coin(coin, coin_assets)
+            warmup_state["coins"][coin] = {"passes": len(timings),
+                                           "first_ms": round(timings[0] * 1000, 3) if timings else None,
+                                           "last_ms": round(timings[-1] * 1000, 3) if timings else None}
+        except Exception as e:
+            warmup_state["coins"][coin] = {"error": str(e)}
+            app.logger.error(f"Warm-up failed for {coin.upper()}: {e}")
+    warmup_state["finished_at"] = datetime.now().isoformat(timespec='seconds')
+    warmup_state["done"].set()
+    app.logger.info(f"Warm-up finished for {len(assets_by_coin)} coins")
+
+
+threading.Thread(target=warm_up_all, name='model-warmup', daemon=True).start()
+
 
 # --- نقاط النهاية (Endpoints) ---
 
@@ -104,6 +167,18 @@ def health_check():
         "failed_models": failed_to_load
     }), status_code
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """نقطة نهاية الجاهزية: 200 فقط بعد تحميل كل النماذج وانتهاء الإحماء (مسار healthCheckPath في render.yaml)."""
+    failed_to_load = [coin for coin in TARGET_COINS if coin not in assets_by_coin]
+    warmed = warmup_state["done"].is_set()
+    ready = warmed and not failed_to_load
+    return jsonify({
+        "status": "ready" if ready else ("warming_up" if not warmed else "unhealthy"),
+        "warmup": {k: v for k, v in warmup_state.items() if k != "done"},
+        "failed_models": failed_to_load
+    }), 200 if ready else 503
+
 @app.route('/info/<string:coin>', methods=['GET'])
 def model_info(coin):
     """إرجاع معلومات عن النموذج المستخدم حالياً لعملة معينة."""
@@ -117,23 +192,80 @@ def model_info(coin):
 def handle_prediction(coin):
     """نقطة النهاية الرئيسية لعمل التنبؤ لعملة معينة."""
     coin = coin.lower()
+    request_started = time.perf_counter()
     if coin not in assets_by_coin:
+        # قيمة ثابتة للتسمية: العملة من مسار الطلب قد تكون أي نص، وكل قيمة جديدة تنشئ سلسلة Prometheus
+        metrics.PREDICTION_ERRORS.inc(coin='unknown', reason='unknown_coin')
         abort(404, description=f"Prediction service is not available for '{coin}'. Model not found.")
         
     if not request.is_json:
+        metrics.PREDICTION_ERRORS.inc(coin=coin, reason='invalid_format')
         abort(400, description="Invalid request format. Expecting a JSON body.")
 
-    data = request.get_json()
-    
-    try:
-        prediction = make_prediction(assets=assets_by_coin[coin], input_data=data)
-        return jsonify({"coin": coin, "prediction": prediction})
+    # عدد الخطوات المستقبلية المطلوبة (?horizon=H)، الافتراضي خطوة واحدة
+    horizon = request.args.get('horizon', default=1, type=int)
+    max_horizon = assets_by_coin[coin]['max_horizon']
+    if horizon is None or horizon < 1 or horizon > max_horizon:
+        metrics.PREDICTION_ERRORS.inc(coin=coin, reason='invalid_horizon')
+        abort(400, description=f"Invalid horizon. Supported values for '{coin}' are 1 to {max_horizon}.")
+
+    # وضع التحليل الاختياري: يتم تسجيل ملف تحليل أداء لكل طلب رقم N فقط
+    capture = nullcontext()
+    if profiling.PREDICT_SAMPLER.should_profile():
+        model_version = assets_by_coin[coin]['model_info']['model_version']
+        capture = profiling.ProfileCapture('predict', coin, model_version, background_save=True)
+
+    with capture:
+        # الجسم قد يكون مضغوطاً (Content-Encoding: gzip أو zstd)، ويُفك ضغطه تدريجياً مع حد أقصى للحجم
+        try:
+            with metrics.PREDICTION_STAGE_SECONDS.time(coin=coin, stage='parse_json'):
+                data = read_json(request.stream, request.headers.get('Content-Encoding'))
+        except RequestBodyError as e:
+            metrics.PREDICTION_ERRORS.inc(coin=coin, reason='invalid_body')
+            abort(e.status, description=str(e))
+        
+        try:
+            # نفس التسلسل لنفس النموذج يعطي نفس النتيجة، لذا نعيد استخدامها من الذاكرة المؤقتة
+            coin_assets = assets_by_coin[coin]
+            with metrics.PREDICTION_STAGE_SECONDS.time(coin=coin, stage='cache_key'):
+                digest = sequence_hash(data, coin_assets['features'])
+            version_field = 'model_version' if horizon == 1 else 'horizon_model_version'
+            cache_key = (coin, coin_assets['model_info'][version_field], digest, horizon) if digest else None
+
+            prediction = PREDICTION_CACHE.get_or_compute(
+                cache_key, lambda: make_prediction(assets=coin_assets, input_data=data, horizon=horizon)
+            )
+            elapsed = time.perf_counter() - request_started
+            metrics.PREDICTION_STAGE_SECONDS.observe(elapsed, coin=coin, stage='total')
+            # تسجيل الطلب والتنبؤ للاختبارات الرجعية: إضافة إلى طابور في الذاكرة فقط، والكتابة على القرص في الخلفية
+            log_prediction(coin, coin_assets['model_info'][version_field], horizon, prediction, digest, elapsed,
+                           input_data=data, features=coin_assets['features'])
+            if horizon == 1:
+                return jsonify({"coin": coin, "prediction": prediction})
+            # المسار الكامل، مع إبقاء "prediction" للخطوة الأولى للتوافق مع العملاء الحاليين
+            return jsonify({"coin": coin, "horizon": horizon, "prediction": prediction[0], "trajectory": prediction})
+
+        except KeyError as e:
+            metrics.PREDICTION_ERRORS.inc(coin=coin, reason='missing_field')
+            abort(400, description=f"Missing required field in request: {e}")
+        except Exception as e:
+            metrics.PREDICTION_ERRORS.inc(coin=coin, reason='internal')
+            app.logger.error(f"An unexpected error occurred during prediction for {coin.upper()}: {e}")
+            abort(500)
+
+@app.route('/forecast/<string:coin>', methods=['GET'])
+def precomputed_forecast(coin):
+    """إرجاع تنبؤ اليوم التالي المحسوب مسبقاً لعملة معينة دون تشغيل النموذج."""
+    coin = coin.lower()
+    record = forecast_store.get(coin)
+    if record is None:
+        abort(404, description=f"No precomputed forecast available for coin '{coin}'.")
+    return jsonify(record), 200
 
-    except KeyError as e:
-        abort(400, description=f"Missing required field in request: {e}")
-    except Exception as e:
-        app.logger.error(f"An unexpected error occurred during prediction for {coin.upper()}: {e}")
-        abort(500)
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """مقاييس زمن كل مرحلة من مراحل التنبؤ وعدادات الأخطاء بصيغة Prometheus."""
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
 
 
 # --- معالجات الأخطاء (Error Handlers) ---
@@ -141,6 +273,10 @@ def handle_prediction(coin):
 def bad_request(error): return jsonify({"error": "Bad Request", "message": error.description or "Invalid data received."}), 400
 @app.errorhandler(404)
 def not_found(error): return jsonify({"error": "Not Found", "message": error.description or "This resource does not exist."}), 404
+@app.errorhandler(413)
+def payload_too_large(error): return jsonify({"error": "Payload Too Large", "message": error.description or "The request body is too large."}), 413
+@app.errorhandler(415)
+def unsupported_media_type(error): return jsonify({"error": "Unsupported Media Type", "message": error.description or "Unsupported request body encoding."}), 415
 @app.errorhandler(500)
 def internal_server_error(error): return jsonify({"error": "Internal Server Error", "message": "An unexpected error occurred on our end."}), 500
 @app.errorhandler(503)
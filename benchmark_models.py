@@ -0,0 +1,146 @@
+"""
+File: benchmark_models.py
+Description: Accuracy and serving latency of the gradient-boosted tree model against the LSTM on one split.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Both models are trained on the same train split (LSTM through Forecaster with MinMax scaling as in
+model_pretrain, GBM on raw lagged features) and scored on every window of the valid split with the metrics of
+walk_forward. Both predict the next day's price from a window, the target of the served train_worker models.
+Latency is measured the way /predict serves a request: one sequence in, one price out, including scaling and
+inverse scaling for the LSTM. Timings are repeated and reported as p50/p99.
+"""
+
+# Imports
+import os
+import argparse
+import json
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from split_store import read_frame
+from walk_forward import regression_metrics
+
+warnings.filterwarnings("ignore")
+
+
+def latency(fn, repeats):
+    """p50/p99 wall time (ms) of fn() after one warm-up call."""
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'p50_ms': round(float(np.percentile(timings, 50)), 4), 'p99_ms': round(float(np.percentile(timings, 99)), 4)}
+
+
+def benchmark_lstm(train_df, valid_df, features, target_col, config, epochs, repeats):
+    import torch
+    import pytorch_lightning as pl
+    from sklearn.preprocessing import MinMaxScaler
+    from torch.utils.data import DataLoader
+    from model_pretrain import StockDataset
+    from pretrain.lstm import LSTM
+    from pretrain.forecaster import Forecaster
+
+    columns = features + [target_col]
+    scaler = MinMaxScaler().fit(train_df[columns])
+    target_scaler = MinMaxScaler().fit(train_df[[target_col]])
+    train_scaled = pd.DataFrame(scaler.transform(train_df[columns]), columns=columns)
+    valid_scaled = pd.DataFrame(scaler.transform(valid_df[columns]), columns=columns)
+
+    pl.seed_everything(config['seed'])
+    sequence_length = config.get('sequence_length', 60)
+    # Next-day labels, as train_worker.create_sequences
+    train_loader = DataLoader(StockDataset(train_scaled, target_col, features, sequence_length, label_offset=1),
+                              batch_size=config['batch_size'], shuffle=True)
+    network = LSTM(n_features=len(features), hidden_units=config['hidden_units'], n_layers=config['n_layers'])
+    trainer = pl.Trainer(max_epochs=epochs, accelerator='cpu', devices=1, logger=False, enable_checkpointing=False,
+                         enable_progress_bar=False, enable_model_summary=False)
+    started = time.perf_counter()
+    trainer.fit(Forecaster(network, lr=config['learning_rate']), train_loader)
+    train_seconds = time.perf_counter() - started
+    network.eval()
+
+    x = valid_scaled[features].to_numpy(dtype=np.float32)
+    windows = np.lib.stride_tricks.sliding_window_view(x, sequence_length, axis=0).transpose(0, 2, 1)[:-1]
+    with torch.no_grad():
+        scaled = network(torch.from_numpy(np.ascontiguousarray(windows))).numpy().reshape(-1, 1)
+    predicted = target_scaler.inverse_transform(scaled).ravel()
+    target = valid_df[target_col].to_numpy()
+    actual, previous = target[sequence_length:], target[sequence_length - 1:-1]
+
+    # One request: scale the raw sequence, forward, inverse scale
+    request = valid_df[columns].tail(sequence_length).to_numpy()
+
+    def serve():
+        seq = scaler.transform(request)[:, :len(features)]
+        with torch.no_grad():
+            y = network(torch.tensor(seq, dtype=torch.float).unsqueeze(0)).numpy()
+        return target_scaler.inverse_transform(y.reshape(-1, 1))
+
+    return dict(model='lstm', train_seconds=round(train_seconds, 2), windows=len(actual),
+                **regression_metrics(actual, predicted, previous), **latency(serve, repeats))
+
+
+def benchmark_gbm(train_df, valid_df, features, target_col, config, repeats):
+    from pretrain.gbm import LaggedGBM, DEFAULT_LAGS
+
+    gbm = LaggedGBM(features, target_col, lags=config.get('lags', DEFAULT_LAGS),
+                    reference_feature=config.get('reference_feature'), n_trees=config['n_trees'],
+                    learning_rate=config['learning_rate'], patience=config.get('patience'),
+                    max_leaf_nodes=config.get('max_leaf_nodes', 31), seed=config['seed'])
+    started = time.perf_counter()
+    gbm.fit(train_df)
+    train_seconds = time.perf_counter() - started
+
+    predicted = gbm.predict(valid_df[features])[:-1]
+    target = valid_df[target_col].to_numpy()
+    actual, previous = target[gbm.lags[-1] + 1:], target[gbm.lags[-1]:-1]
+    request = valid_df[features].tail(gbm.min_rows).to_numpy(dtype=np.float32)
+
+    return dict(model='gbm', train_seconds=round(train_seconds, 2), windows=len(actual), trees=int(gbm.model.n_iter_),
+                **regression_metrics(actual, predicted, previous),
+                **latency(lambda: gbm.predict_window(request), repeats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the GBM model family against the LSTM')
+    parser.add_argument('--train', type=str, required=True, help='training split (CSV or binary split)')
+    parser.add_argument('--valid', type=str, required=True, help='validation split (CSV or binary split)')
+    parser.add_argument('--target', type=str, required=True, help='target coin (e.g., BTC)')
+    parser.add_argument('--features', type=str, default='config/features.json')
+    parser.add_argument('--config_nn', type=str, default='config/config_nn.json')
+    parser.add_argument('--config_gbm', type=str, default='config/config_gbm.json')
+    parser.add_argument('--epochs', type=int, default=10, help='LSTM training epochs')
+    parser.add_argument('--repeats', type=int, default=200, help='timed single-request predictions per model')
+    parser.add_argument('-o', '--output', type=str, default='benchmarks/models.json')
+    args = parser.parse_args()
+
+    with open(args.features) as f: features = json.load(f)['features']
+    with open(args.config_nn) as f: config_nn = json.load(f)
+    with open(args.config_gbm) as f: config_gbm = json.load(f)
+    target_col = f"{args.target.lower()}_avg_ohlc"
+    train_df = read_frame(args.train, features + [target_col])
+    valid_df = read_frame(args.valid, features + [target_col])
+
+    results = [
+        benchmark_gbm(train_df, valid_df, features, target_col, config_gbm, args.repeats),
+        benchmark_lstm(train_df, valid_df, features, target_col, config_nn, args.epochs, args.repeats),
+    ]
+    table = pd.DataFrame(results)
+    print('\n' + table[['model', 'train_seconds', 'windows', 'mae', 'rmse', 'mape', 'directional_accuracy',
+                        'p50_ms', 'p99_ms']].to_string(index=False))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'target': args.target.upper(), 'features': len(features), 'results': results}, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
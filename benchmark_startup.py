@@ -0,0 +1,125 @@
+"""
+File: benchmark_startup.py
+Description: Serving startup benchmark: import cost of the inference path and cold start of an app.py worker.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Every run is a fresh interpreter, like a new gunicorn worker. It measures:
+    import_torch_s     import torch alone (shared by every variant, not avoidable)
+    import_serving_s   import model_forecast on top of torch, and which heavy modules it pulled in
+    app_startup_s      import app: models, scalers and registry of every coin loaded from the fixtures
+    first_predict_ms   first /predict request through the Flask test client
+    rss_mb             peak resident memory of the worker
+Several trees can be compared (e.g. a `git worktree` of an older commit with --repos): they all run against
+the same fixtures (random-weight LSTMs, feature tables and a registry with scaler sidecars) written once here.
+"""
+
+# Imports
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('pytorch_lightning', 'lightning', 'sklearn', 'scipy', 'pandas', 'pandas_ta', 'matplotlib')
+
+CHILD = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+import torch
+torch_done = time.perf_counter()
+import model_forecast
+serving_done = time.perf_counter()
+heavy = [m for m in HEAVY if m in sys.modules]
+import app
+app_done = time.perf_counter()
+client = app.app.test_client()
+with open(PAYLOAD) as f: body = f.read()
+request_started = time.perf_counter()
+response = client.post('/predict/' + COIN, data=body, content_type='application/json')
+request_done = time.perf_counter()
+assert response.status_code == 200, response.get_data(as_text=True)
+print(json.dumps({
+    'import_torch_s': torch_done - started,
+    'import_serving_s': serving_done - torch_done,
+    'app_startup_s': app_done - serving_done,
+    'first_predict_ms': (request_done - request_started) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_modules': heavy,
+    'loaded_coins': len(app.assets_by_coin),
+}))
+"""
+
+
+def write_fixtures(fixtures_dir, coins, seed=0):
+    """load_test fixtures plus a registry entry and a scaler sidecar per coin, as train_worker writes them."""
+    from load_test import generate_fixtures
+    from inference.scaling import MinMaxScaler
+    from model_registry import register_version, registry_path, save_scalers
+
+    models_dir, data_dir, data, features = generate_fixtures(fixtures_dir, coins, seed)
+    for name in sorted(os.listdir(models_dir)):
+        version = os.path.splitext(name)[0]
+        coin = version.split('_')[1]
+        target_col = f"{coin}_avg_ohlc"
+        columns = features + [target_col]
+        scaler_path = os.path.join(models_dir, f"{version}.scaler.json")
+        save_scalers(scaler_path, MinMaxScaler().fit(data[columns].to_numpy()),
+                     MinMaxScaler().fit(data[[target_col]].to_numpy()), columns)
+        register_version(registry_path(models_dir), coin, version, 'lstm', os.path.join(models_dir, name),
+                         os.path.join(data_dir, f"{version.split('_', 1)[1]}.csv"), features, scaler_path=scaler_path)
+
+    payload_path = os.path.join(fixtures_dir, 'payload.json')
+    window = data[features].tail(60)
+    with open(payload_path, 'w') as f:
+        json.dump({'sequence': window.to_dict(orient='records')}, f)
+    return models_dir, data_dir, payload_path
+
+
+def run_child(repo, models_dir, data_dir, payload_path, coin):
+    code = (f"HEAVY = {HEAVY_MODULES!r}\nPAYLOAD = {payload_path!r}\nCOIN = {coin!r}\n" + CHILD)
+    env = dict(os.environ, MODELS_DIR=models_dir, DATA_DIR=data_dir, REGISTRY_PATH=os.path.join(models_dir, 'registry.json'))
+    result = subprocess.run([sys.executable, '-c', code], cwd=repo, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark run failed in {repo}:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    keys = ('import_torch_s', 'import_serving_s', 'app_startup_s', 'first_predict_ms', 'rss_mb')
+    summary = {key: round(statistics.median(run[key] for run in runs), 4) for key in keys}
+    summary['heavy_modules'] = runs[-1]['heavy_modules']
+    summary['loaded_coins'] = runs[-1]['loaded_coins']
+    return summary
+
+
+def main():
+    from load_test import COIN_LIST
+    parser = argparse.ArgumentParser(description='Benchmark serving import cost and worker cold start')
+    parser.add_argument('--repos', nargs='+', default=[BASE_DIR], help='source trees to compare (default: this one)')
+    parser.add_argument('--coins', type=int, default=len(COIN_LIST), help='number of coins with fixtures')
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters per tree (median reported)')
+    parser.add_argument('-o', '--output', type=str, default='benchmarks/startup.json')
+    args = parser.parse_args()
+
+    coins = COIN_LIST[:args.coins]
+    results = []
+    with tempfile.TemporaryDirectory() as fixtures_dir:
+        models_dir, data_dir, payload_path = write_fixtures(fixtures_dir, coins)
+        for repo in args.repos:
+            runs = [run_child(os.path.abspath(repo), models_dir, data_dir, payload_path, coins[0])
+                    for _ in range(args.runs)]
+            results.append(dict(repo=os.path.abspath(repo), **summarize(runs)))
+            print(f"{repo}: {results[-1]}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'coins': len(coins), 'runs': args.runs, 'results': results}, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
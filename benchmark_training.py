@@ -0,0 +1,234 @@
+"""
+File: benchmark_training.py
+Description: Training throughput benchmark for the pretrain model zoo (LSTM, GRU, LSTMTuned, SimpleLSTM).
+File Created: 19/10/2026
+Python Version: 3.9+
+"""
+
+# Imports
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import platform
+import subprocess
+import multiprocessing as mp
+from datetime import datetime
+from queue import Empty
+
+import torch
+import torch.nn as nn
+from torch.utils.data import TensorDataset, DataLoader
+
+N_FEATURES = 246
+SEQUENCE_LENGTH = 60
+MODEL_CHOICES = ['lstm', 'gru', 'lstm_tuned', 'simple_lstm']
+
+
+def build_model(name, n_features, hidden_units, n_layers):
+    """Instantiate one of the pretrain models with a common set of arguments."""
+    if name == 'lstm':
+        from pretrain.lstm import LSTM
+        return LSTM(n_features=n_features, hidden_units=hidden_units, n_layers=n_layers)
+    if name == 'gru':
+        from pretrain.gru import GRU
+        return GRU(n_features=n_features, hidden_units=hidden_units, n_layers=n_layers)
+    if name == 'lstm_tuned':
+        from pretrain.lstm_tuned import LSTMTuned
+        return LSTMTuned(n_features=n_features, hidden_units=hidden_units, n_layers=n_layers, lr=1e-3)
+    if name == 'simple_lstm':
+        from pretrain.simple_lstm import SimpleLSTM
+        return SimpleLSTM(n_features=n_features, hidden_units=hidden_units, n_layers=n_layers)
+    raise ValueError(f"Unknown model '{name}'. Choose one of {MODEL_CHOICES}.")
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 2)
+
+
+def run_case(case, n_samples, n_epochs, n_features, sequence_length, seed):
+    """
+    Train one model configuration on synthetic data and return its measurements.
+    Runs inside a fresh process so thread settings and peak RSS do not leak between cases.
+    """
+    torch.set_num_threads(case['threads'])
+    torch.manual_seed(seed)
+
+    X = torch.randn(n_samples, sequence_length, n_features)
+    y = torch.randn(n_samples, 1)
+    loader = DataLoader(TensorDataset(X, y), batch_size=case['batch_size'], shuffle=True, num_workers=0)
+
+    model = build_model(case['model'], n_features, case['hidden_units'], case['n_layers'])
+    model.train()
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+    loss_fn = nn.MSELoss()
+
+    epoch_times = []
+    for _ in range(n_epochs):
+        start = time.perf_counter()
+        for x_batch, y_batch in loader:
+            optimizer.zero_grad()
+            y_hat = model(x_batch)
+            # LSTMTuned returns (prediction, hidden)
+            if isinstance(y_hat, tuple):
+                y_hat = y_hat[0]
+            loss = loss_fn(y_hat, y_batch)
+            loss.backward()
+            optimizer.step()
+        epoch_times.append(time.perf_counter() - start)
+
+    # The first epoch includes allocator growth and kernel warm-up, so it is reported but not averaged
+    steady = epoch_times[1:] if len(epoch_times) > 1 else epoch_times
+    epoch_time_mean = sum(steady) / len(steady)
+
+    return dict(
+        case,
+        n_params=sum(p.numel() for p in model.parameters()),
+        epoch_times=[round(t, 4) for t in epoch_times],
+        epoch_time_mean=round(epoch_time_mean, 4),
+        samples_per_sec=round(n_samples / epoch_time_mean, 2),
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def _case_worker(queue, *args):
+    try:
+        queue.put(run_case(*args))
+    except Exception as e:
+        queue.put(dict(args[0], error=str(e)))
+
+
+def run_isolated(case, *args, timeout=None):
+    """
+    Run a single case in a spawned child process and collect its result. A child that dies without reporting
+    (OOM kill, segfault in a compiled kernel) or runs past `timeout` seconds is recorded as a failed case.
+    """
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_case_worker, args=(queue, case) + args)
+    proc.start()
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        try:
+            result = queue.get(timeout=1.0)
+            break
+        except Empty:
+            if not proc.is_alive():
+                # The result may still be in flight right after the child exited
+                try:
+                    result = queue.get(timeout=1.0)
+                except Empty:
+                    result = dict(case, error=f"child process exited with code {proc.exitcode} without a result")
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                proc.kill()
+                result = dict(case, error=f"timed out after {timeout}s")
+                break
+    proc.join()
+    return result
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def case_key(result):
+    return (result['model'], result['hidden_units'], result['n_layers'], result['batch_size'], result['threads'])
+
+
+def compare_with_baseline(results, baseline_path):
+    """Print the samples/sec ratio of every case against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {case_key(r): r for r in baseline['results'] if 'error' not in r}
+
+    print(f"\nComparison against {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for r in results:
+        old = previous.get(case_key(r))
+        if 'error' in r or old is None:
+            continue
+        ratio = r['samples_per_sec'] / old['samples_per_sec']
+        flag = '  <-- regression' if ratio < 0.9 else ''
+        print(f"  {case_key(r)}: {old['samples_per_sec']:.1f} -> {r['samples_per_sec']:.1f} samples/s ({ratio:.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark training throughput of the pretrain models on synthetic data.')
+    parser.add_argument('--models', nargs='+', default=MODEL_CHOICES, choices=MODEL_CHOICES, help='models to benchmark')
+    parser.add_argument('--hidden_units', nargs='+', type=int, default=[68, 128], help='hidden sizes to sweep')
+    parser.add_argument('--n_layers', nargs='+', type=int, default=[2, 6], help='layer counts to sweep')
+    parser.add_argument('--batch_sizes', nargs='+', type=int, default=[32, 64], help='batch sizes to sweep')
+    parser.add_argument('--threads', nargs='+', type=int, default=[1, os.cpu_count() or 1], help='torch thread counts to sweep')
+    parser.add_argument('--n_samples', type=int, default=1024, help='number of synthetic training windows')
+    parser.add_argument('--epochs', type=int, default=3, help='epochs per case (the first one is treated as warm-up)')
+    parser.add_argument('--n_features', type=int, default=N_FEATURES, help='feature width of the synthetic table')
+    parser.add_argument('--sequence_length', type=int, default=SEQUENCE_LENGTH, help='window length')
+    parser.add_argument('--seed', type=int, default=1234, help='random seed for the synthetic data')
+    parser.add_argument('--case_timeout', type=float, default=1800, help='seconds before a case is killed and recorded as failed (0: no limit)')
+    parser.add_argument('-o', '--output', type=str, help='results file (default is benchmarks/training_<commit>_<date>.json)')
+    parser.add_argument('--compare', type=str, help='previous results file to compare against')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    if not args.output:
+        today = datetime.now().strftime('%d%m%Y')
+        args.output = os.path.join('benchmarks', f'training_{commit}_{today}.json')
+
+    cases = [
+        dict(model=m, hidden_units=h, n_layers=l, batch_size=b, threads=t)
+        for m, h, l, b, t in itertools.product(args.models, args.hidden_units, args.n_layers, args.batch_sizes, sorted(set(args.threads)))
+    ]
+    print(f"Running {len(cases)} benchmark cases ({args.n_samples} samples x {args.epochs} epochs each)...")
+
+    results = []
+    for i, case in enumerate(cases, 1):
+        result = run_isolated(case, args.n_samples, args.epochs, args.n_features, args.sequence_length, args.seed,
+                              timeout=args.case_timeout)
+        results.append(result)
+        if 'error' in result:
+            print(f"[{i}/{len(cases)}] {case_key(result)} failed: {result['error']}")
+        else:
+            print(f"[{i}/{len(cases)}] {case_key(result)}: {result['samples_per_sec']:.1f} samples/s, "
+                  f"{result['epoch_time_mean']:.3f} s/epoch, peak RSS {result['peak_rss_mb']} MB")
+
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'n_samples': args.n_samples,
+            'epochs': args.epochs,
+            'n_features': args.n_features,
+            'sequence_length': args.sequence_length,
+        },
+        'results': results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        compare_with_baseline(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
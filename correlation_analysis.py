@@ -13,319 +13,145 @@ from datetime import datetime
 import sys
 import pandas as pd
 
-# Parser for CLI
-parser = argparse.ArgumentParser(description='compute correlations between coin prices (avg ohlc or close)')
+from correlation_engine import METHODS, VARIABLES, SMOOTHING, pivot_prices, static_corr, rolling_corr, save_store, \
+    lead_lag
 
-# Data
-parser.add_argument('-d', '--data', type=str, nargs=1, help='path to the csv dataset')
 
-# Variable
-parser.add_argument('-v', '--variable', type=str, nargs='?', default='avg_ohlc',
-                    help='variable on which computing correlations (default is avg ohlc prices)')
+def parse_arguments():
+    # Parser for CLI
+    parser = argparse.ArgumentParser(description='compute correlations between coin prices (avg ohlc or close)')
 
-# Segment
-parser.add_argument('-w', '--window', type=str, nargs='?', default='daily',
-                    help='sliding window to use for computations (default is daily)')
+    # Data
+    parser.add_argument('-d', '--data', type=str, nargs=1, help='path to the csv dataset')
 
-# Method
-parser.add_argument('-m', '--method', type=str, nargs='?', default='pearson',
-                    help='method to compute correlations (default is pearson)')
+    # Variable
+    parser.add_argument('-v', '--variable', type=str, nargs='?', default='avg_ohlc',
+                        help='variable on which computing correlations (default is avg ohlc prices)')
 
-# Path
-parser.add_argument('-p', '--path', type=str, nargs='?', default=os.getcwd(),
-                    help='path for saving the correlation dataset (default is current directory)')
+    # Segment
+    parser.add_argument('-w', '--window', type=str, nargs='?', default='daily',
+                        help='sliding window to use for computations (default is daily)')
 
-# Filename
-parser.add_argument('-f', '--filename', type=str, nargs='?',
-                    help='filename for dataset (default is correlations_TODAY)')
+    # Method
+    parser.add_argument('-m', '--method', type=str, nargs='?', default='pearson',
+                        help='method to compute correlations (default is pearson)')
 
-# Arg parse
-args = parser.parse_args()
+    # Rolling
+    parser.add_argument('-r', '--rolling', type=int, nargs='?',
+                        help='length (in rows) of rolling correlation windows; writes a [T, n, n] .npy store '
+                             'instead of a single static matrix')
 
-# Exception (invalid path)
-if not os.path.exists(args.path):
-    print('Invalid path provided: destination does not exist!')
-    sys.exit(1)
+    # Lead-lag
+    parser.add_argument('-l', '--lead_lag', type=int, nargs='?',
+                        help='maximum lag (in rows) for a lead-lag analysis of daily returns; writes the peak lag '
+                             'and strength of every coin pair instead of a single static matrix')
 
-# Validate data
-if not args.data:
-    print('Missing argument: --data is required!')
-    sys.exit(1)
+    # Min periods
+    parser.add_argument('--min_periods', type=int, nargs='?',
+                        help='minimum overlapping rows per pair in a pearson rolling window (default is the window length)')
 
-(data,) = args.data
+    # Path
+    parser.add_argument('-p', '--path', type=str, nargs='?', default=os.getcwd(),
+                        help='path for saving the correlation dataset (default is current directory)')
 
-# Validate filename
-if not args.filename:
-    now = datetime.now()
-    today = datetime.strftime(now, '%d-%m-%Y')
-    filename = 'correlations_' + today
-    filename = filename.replace('-', '')
+    # Filename
+    parser.add_argument('-f', '--filename', type=str, nargs='?',
+                        help='filename for dataset (default is correlations_TODAY)')
 
-else:
-    filename = args.filename
+    return parser.parse_args()
 
-# Print args
-print({'--data': data, '--variable': args.variable, '--window': args.window,
-       '--method': args.method, '--path': args.path,  '--filename': filename})
 
-# Extract and process data
-try:
-    data = pd.read_csv(data, sep=',')
+def main():
+    args = parse_arguments()
+
+    # Exception (invalid path)
+    if not os.path.exists(args.path):
+        print('Invalid path provided: destination does not exist!')
+        sys.exit(1)
+
+    # Validate data
+    if not args.data:
+        print('Missing argument: --data is required!')
+        sys.exit(1)
+
+    (data,) = args.data
+
+    # Validate choices
+    if args.window not in SMOOTHING:
+        print('Invalid window selected: allowed are daily, weekly and monthly!')
+        sys.exit(1)
+    if args.variable not in VARIABLES:
+        print('Invalid variable selected: allowed are avg_ohlc and close!')
+        sys.exit(1)
+    if args.method not in METHODS:
+        print('Invalid method selected: allowed are pearson, kendall and spearman!')
+        sys.exit(1)
+
+    # Validate filename
+    if not args.filename:
+        now = datetime.now()
+        today = datetime.strftime(now, '%d-%m-%Y')
+        filename = 'correlations_' + today
+        filename = filename.replace('-', '')
+
+    else:
+        filename = args.filename
+
+    # Print args
+    print({'--data': data, '--variable': args.variable, '--window': args.window,
+           '--method': args.method, '--rolling': args.rolling, '--lead_lag': args.lead_lag, '--path': args.path, '--filename': filename})
+
+    # Extract and process data
     try:
-        data['Date'] = pd.to_datetime(data['Date'])
-
-        # If daily
-        if args.window == 'daily':
-
-            # Avg OHLC
-            if args.variable == 'avg_ohlc':
-                df = pd.DataFrame(data['Date'].unique(), columns=['Date'])
-                df = df.set_index('Date')
-                data['Avg OHLC Price'] = data[['Open', 'High', 'Low', 'Close']].mean(axis=1)
-                data.drop(['Open', 'High', 'Low', 'Close'], axis=1, inplace=True)
-                data = data.set_index('Date')
-                group = data.groupby('Coin')
-                for i in data['Coin'].unique():
-                    coin = group.get_group(i)
-                    coin = coin.rename(columns={'Avg OHLC Price': i})
-                    df[i] = coin[i]
-
-                # Pearson
-                if args.method == 'pearson':
-                    corr = df.corr(method='pearson')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Kendall
-                elif args.method == 'kendall':
-                    corr = df.corr(method='kendall')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Spearman
-                elif args.method == 'spearman':
-                    corr = df.corr(method='spearman')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Not allowed
-                elif args.method not in ['pearson', 'kendall', 'spearman']:
-                    print('Invalid method selected: allowed are pearson, kendall and spearman!')
-                    sys.exit(1)
-
-            # Close
-            elif args.variable == 'close':
-                df = pd.DataFrame(data['Date'].unique(), columns=['Date'])
-                df = df.set_index('Date')
-                data.drop(['Open', 'High', 'Low'], axis=1, inplace=True)
-                data = data.set_index('Date')
-                group = data.groupby('Coin')
-                for i in data['Coin'].unique():
-                    coin = group.get_group(i)
-                    coin = coin.rename(columns={'Close': i})
-                    df[i] = coin[i]
-
-                # Pearson
-                if args.method == 'pearson':
-                    corr = df.corr(method='pearson')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Kendall
-                elif args.method == 'kendall':
-                    corr = df.corr(method='kendall')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Spearman
-                elif args.method == 'spearman':
-                    corr = df.corr(method='spearman')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Not allowed
-                elif args.method not in ['pearson', 'kendall', 'spearman']:
-                    print('Invalid method selected: allowed are pearson, kendall and spearman!')
-                    sys.exit(1)
-
-            # Not allowed
-            elif args.variable not in ['avg_ohlc', 'close']:
-                print('Invalid variable selected: allowed are avg_ohlc and close!')
-                sys.exit(1)
-
-        # If weekly
-        elif args.window == 'weekly':
-
-            # Avg OHLC
-            if args.variable == 'avg_ohlc':
-                df = pd.DataFrame(data['Date'].unique(), columns=['Date'])
-                df = df.set_index('Date')
-                data['Avg OHLC Price'] = data[['Open', 'High', 'Low', 'Close']].mean(axis=1)
-                data.drop(['Open', 'High', 'Low', 'Close'], axis=1, inplace=True)
-                data = data.set_index('Date')
-                group = data.groupby('Coin')
-                for i in data['Coin'].unique():
-                    coin = group.get_group(i)
-                    coin = coin.rolling('7D', on=coin.index).mean(numeric_only=True).sort_values(by='Date')
-                    coin = coin.rename(columns={'Avg OHLC Price': i})
-                    df[i] = coin[i]
-
-                # Pearson
-                if args.method == 'pearson':
-                    corr = df.corr(method='pearson')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Kendall
-                elif args.method == 'kendall':
-                    corr = df.corr(method='kendall')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Spearman
-                elif args.method == 'spearman':
-                    corr = df.corr(method='spearman')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Not allowed
-                elif args.method not in ['pearson', 'kendall', 'spearman']:
-                    print('Invalid method selected: allowed are pearson, kendall and spearman!')
-                    sys.exit(1)
-
-            # Close
-            elif args.variable == 'close':
-                df = pd.DataFrame(data['Date'].unique(), columns=['Date'])
-                df = df.set_index('Date')
-                data.drop(['Open', 'High', 'Low'], axis=1, inplace=True)
-                data = data.set_index('Date')
-                group = data.groupby('Coin')
-                for i in data['Coin'].unique():
-                    coin = group.get_group(i)
-                    coin = coin.rolling('7D', on=coin.index).mean(numeric_only=True).sort_values(by='Date')
-                    coin = coin.rename(columns={'Close': i})
-                    df[i] = coin[i]
-
-                # Pearson
-                if args.method == 'pearson':
-                    corr = df.corr(method='pearson')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Kendall
-                elif args.method == 'kendall':
-                    corr = df.corr(method='kendall')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Spearman
-                elif args.method == 'spearman':
-                    corr = df.corr(method='spearman')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Not allowed
-                elif args.method not in ['pearson', 'kendall', 'spearman']:
-                    print('Invalid method selected: allowed are pearson, kendall and spearman!')
-                    sys.exit(1)
-
-            # Not allowed
-            elif args.variable not in ['avg_ohlc', 'close']:
-                print('Invalid variable selected: allowed are avg_ohlc and close!')
-                sys.exit(1)
-
-        # If monthly
-        elif args.window == 'monthly':
-
-            # Avg OHLC
-            if args.variable == 'avg_ohlc':
-                df = pd.DataFrame(data['Date'].unique(), columns=['Date'])
-                df = df.set_index('Date')
-                data['Avg OHLC Price'] = data[['Open', 'High', 'Low', 'Close']].mean(axis=1)
-                data.drop(['Open', 'High', 'Low', 'Close'], axis=1, inplace=True)
-                data = data.set_index('Date')
-                group = data.groupby('Coin')
-                for i in data['Coin'].unique():
-                    coin = group.get_group(i)
-                    coin = coin.rolling('30D', on=coin.index).mean(numeric_only=True).sort_values(by='Date')
-                    coin = coin.rename(columns={'Avg OHLC Price': i})
-                    df[i] = coin[i]
-
-                # Pearson
-                if args.method == 'pearson':
-                    corr = df.corr(method='pearson')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Kendall
-                elif args.method == 'kendall':
-                    corr = df.corr(method='kendall')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Spearman
-                elif args.method == 'spearman':
-                    corr = df.corr(method='spearman')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Not allowed
-                elif args.method not in ['pearson', 'kendall', 'spearman']:
-                    print('Invalid method selected: allowed are pearson, kendall and spearman!')
-                    sys.exit(1)
-
-            # Close
-            elif args.variable == 'close':
-                df = pd.DataFrame(data['Date'].unique(), columns=['Date'])
-                df = df.set_index('Date')
-                data.drop(['Open', 'High', 'Low'], axis=1, inplace=True)
-                data = data.set_index('Date')
-                group = data.groupby('Coin')
-                for i in data['Coin'].unique():
-                    coin = group.get_group(i)
-                    coin = coin.rolling('30D', on=coin.index).mean(numeric_only=True).sort_values(by='Date')
-                    coin = coin.rename(columns={'Close': i})
-                    df[i] = coin[i]
-
-                # Pearson
-                if args.method == 'pearson':
-                    corr = df.corr(method='pearson')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Kendall
-                elif args.method == 'kendall':
-                    corr = df.corr(method='kendall')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Spearman
-                elif args.method == 'spearman':
-                    corr = df.corr(method='spearman')
-                    file_name = os.path.join(args.path, filename + '.csv')
-                    corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
-
-                # Not allowed
-                elif args.method not in ['pearson', 'kendall', 'spearman']:
-                    print('Invalid method selected: allowed are pearson, kendall and spearman!')
-                    sys.exit(1)
-
-            # Not allowed
-            elif args.variable not in ['avg_ohlc', 'close']:
-                print('Invalid variable selected: allowed are avg_ohlc and close!')
-                sys.exit(1)
-
-        # Not allowed
-        elif args.window not in ['daily', 'weekly', 'monthly']:
-            print('Invalid window selected: allowed are daily, weekly and monthly!')
-            sys.exit(1)
+        data = pd.read_csv(data, sep=',')
+    # Exception: file not found
+    except FileNotFoundError:
+        print('Invalid path provided: csv file does not exist!')
+        sys.exit(1)
 
+    try:
+        # One pivot for every coin, then the optional weekly/monthly smoothing
+        wide = pivot_prices(data, variable=args.variable, smoothing=args.window)
     # Exception: bad formatted csv
     except KeyError:
         print('Invalid data format: wrong coin data provided!')
         sys.exit(1)
 
-# Exception: file not found
-except FileNotFoundError:
-    print('Invalid path provided: csv file does not exist!')
-    sys.exit(1)
+    if args.rolling and args.lead_lag:
+        print('Invalid arguments: --rolling and --lead_lag cannot be used together!')
+        sys.exit(1)
+
+    # Lead-lag pairs
+    if args.lead_lag:
+        if not 1 <= args.lead_lag < len(wide) - 1:
+            print(f'Invalid lead-lag: must be between 1 and the number of dates minus 2 ({len(wide) - 2})!')
+            sys.exit(1)
+        _, pairs = lead_lag(wide, args.lead_lag)
+        file_name = os.path.join(args.path, filename + '.csv')
+        pairs.to_csv(file_name, sep=',', encoding='utf-8', index=False)
+        print(f"Lead-lag peaks for {len(pairs)} pairs saved to {file_name}")
+        return
+
+    # Static matrix
+    if not args.rolling:
+        corr = static_corr(wide, method=args.method)
+        file_name = os.path.join(args.path, filename + '.csv')
+        corr.to_csv(file_name, sep=',', encoding='utf-8', index=True)
+        print(f"Correlations saved to {file_name}")
+        return
+
+    # Rolling matrices
+    if not 2 <= args.rolling <= len(wide):
+        print(f'Invalid rolling window: must be between 2 and the number of dates ({len(wide)})!')
+        sys.exit(1)
+
+    store_path = os.path.join(args.path, filename)
+    corr = rolling_corr(wide, args.rolling, method=args.method, min_periods=args.min_periods,
+                        out_path=store_path + '.npy')
+    save_store(store_path, corr, wide.index, wide.columns, method=args.method, rolling=args.rolling,
+               variable=args.variable, window=args.window)
+    print(f"Rolling correlations {corr.shape} saved to {store_path}.npy (metadata in {store_path}.json)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+"""
+File: correlation_engine.py
+Description: Vectorized static and rolling correlation engine for coin price series.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+The long OHLC table is pivoted once into a [T, n] matrix. Rolling matrices are produced as a [T, n, n]
+float32 array, written straight into a memory-mapped .npy store so the output never has to fit in RAM:
+    pearson   running pairwise sums (count, sum, sum of squares, cross products) updated by adding the
+              row entering the window and subtracting the row leaving it, with missing values handled
+              pairwise; sums are rebuilt exactly every `window` steps to bound floating point drift.
+    spearman  within-window ranks computed for chunks of windows at once, then batched matmuls.
+    kendall   tau-b from a running concordance matrix: sliding by one row only adds the sign products
+              of the entering row and removes those of the leaving row, O(n^2 * window) per step.
+Rows of the output before the first full window are NaN, so index t always refers to the window ending at t.
+
+lead_lag() gives the cross-correlation of every coin pair at every lag from batched FFTs, O(n^2 * T log T),
+with the peak lag and strength per pair.
+"""
+
+# Imports
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('pearson', 'spearman', 'kendall')
+VARIABLES = ('avg_ohlc', 'close')
+SMOOTHING = {'daily': None, 'weekly': '7D', 'monthly': '30D'}
+
+
+def pivot_prices(data, variable='avg_ohlc', smoothing='daily'):
+    """
+    Long table (Date, Coin, Open, High, Low, Close, ...) -> wide [dates x coins] frame in a single pivot.
+    `smoothing` applies the same time-based rolling mean the original per-coin loop used.
+    """
+    if variable not in VARIABLES:
+        raise ValueError(f"Invalid variable '{variable}': allowed are {', '.join(VARIABLES)}")
+    if smoothing not in SMOOTHING:
+        raise ValueError(f"Invalid window '{smoothing}': allowed are {', '.join(SMOOTHING)}")
+
+    data = data.copy()
+    data['Date'] = pd.to_datetime(data['Date'])
+    if variable == 'avg_ohlc':
+        data['value'] = data[['Open', 'High', 'Low', 'Close']].mean(axis=1)
+    else:
+        data['value'] = data['Close']
+
+    wide = data.pivot_table(index='Date', columns='Coin', values='value', aggfunc='last', sort=True)
+    wide = wide[list(pd.unique(data['Coin']))]
+    wide.columns.name = None
+
+    if SMOOTHING[smoothing]:
+        wide = wide.rolling(SMOOTHING[smoothing]).mean()
+    return wide
+
+
+def static_corr(wide, method='pearson'):
+    """Single correlation matrix over the whole history (pairwise complete)."""
+    if method not in METHODS:
+        raise ValueError(f"Invalid method '{method}': allowed are {', '.join(METHODS)}")
+    return wide.corr(method=method)
+
+
+def _allocate(out_path, shape):
+    if out_path is None:
+        return np.full(shape, np.nan, dtype=np.float32)
+    out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=shape)
+    out[:] = np.nan
+    return out
+
+
+def _pearson_from_sums(count, sx, sxx, sxy, min_periods):
+    # sx[i, j] is the sum of series i over rows where both i and j are present, so series j's sum is sx.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_i, mean_j = sx / count, sx.T / count
+        cov = sxy / count - mean_i * mean_j
+        var_i = sxx / count - mean_i * mean_i
+        var_j = sxx.T / count - mean_j * mean_j
+        corr = cov / np.sqrt(var_i * var_j)
+    corr[count < min_periods] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _row_terms(row):
+    present = ~np.isnan(row)
+    mask = present.astype(np.float64)
+    value = np.where(present, row, 0.0)
+    return mask, value
+
+
+def _rolling_pearson(values, window, min_periods, out):
+    T, n = values.shape
+    # Centre each series so the running sums stay small and subtraction loses little precision
+    values = values - np.nanmean(values, axis=0)
+    count, sx, sxx, sxy = (np.zeros((n, n)) for _ in range(4))
+
+    def add(row, sign):
+        mask, value = _row_terms(row)
+        count[...] += sign * np.outer(mask, mask)
+        sx[...] += sign * np.outer(value, mask)
+        sxx[...] += sign * np.outer(value * value, mask)
+        sxy[...] += sign * np.outer(value, value)
+
+    for t in range(T):
+        if t >= window and (t - window) % window == 0:
+            # Periodic exact rebuild of the window sums
+            for arr in (count, sx, sxx, sxy):
+                arr[...] = 0.0
+            for row in values[t - window + 1:t]:
+                add(row, 1.0)
+        elif t >= window:
+            add(values[t - window], -1.0)
+        add(values[t], 1.0)
+        if t >= window - 1:
+            out[t] = _pearson_from_sums(count, sx, sxx, sxy, min_periods)
+    return out
+
+
+def _rank_windows(windows):
+    """Average ranks (0-based) along the last axis of [..., window]; tied values share their mean rank."""
+    w = windows.shape[-1]
+    order = windows.argsort(axis=-1, kind='stable')
+    sorted_vals = np.take_along_axis(windows, order, axis=-1)
+    positions = np.broadcast_to(np.arange(w, dtype=np.float64), windows.shape)
+
+    # First and last sorted position of every tie group, found with running max/min instead of a loop
+    equal_next = np.diff(sorted_vals, axis=-1) == 0
+    pad = np.zeros(windows.shape[:-1] + (1,), dtype=bool)
+    starts_group = ~np.concatenate([pad, equal_next], axis=-1)
+    ends_group = ~np.concatenate([equal_next, pad], axis=-1)
+    first = np.maximum.accumulate(np.where(starts_group, positions, 0.0), axis=-1)
+    last = np.minimum.accumulate(np.where(ends_group, positions, w)[..., ::-1], axis=-1)[..., ::-1]
+
+    ranks = np.empty_like(windows)
+    np.put_along_axis(ranks, order, (first + last) / 2.0, axis=-1)
+    return ranks
+
+
+def _rolling_spearman(values, window, out, chunk_size):
+    T, n = values.shape
+    views = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)  # [T-window+1, n, window]
+    for start in range(0, views.shape[0], chunk_size):
+        chunk = np.array(views[start:start + chunk_size], dtype=np.float64)
+        invalid = np.isnan(chunk).any(axis=-1)                     # [c, n]
+        ranks = _rank_windows(np.where(np.isnan(chunk), 0.0, chunk))
+        ranks -= ranks.mean(axis=-1, keepdims=True)
+        norms = np.sqrt((ranks * ranks).sum(axis=-1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ranks /= norms[..., None]
+        corr = np.matmul(ranks, ranks.transpose(0, 2, 1))
+        corr[invalid[:, :, None] | invalid[:, None, :]] = np.nan
+        out[start + window - 1:start + window - 1 + corr.shape[0]] = np.clip(corr, -1.0, 1.0)
+    return out
+
+
+def _rolling_kendall(values, window, out):
+    T, n = values.shape
+    invalid_counts = np.isnan(values).astype(np.int64)
+    filled = np.where(np.isnan(values), 0.0, values)
+    concordance = np.zeros((n, n))
+
+    def pair_signs(t, lo, hi):
+        # Sign of (x_t - x_s) for every other row s of the window, shape [n, hi - lo]
+        return np.sign(filled[t][:, None] - filled[lo:hi].T)
+
+    for t in range(T):
+        if t >= window:
+            # The leaving row forms pairs with the rows still in the window
+            s = pair_signs(t - window, t - window + 1, t)
+            concordance -= s @ s.T
+        s = pair_signs(t, max(0, t - window + 1), t)
+        concordance += s @ s.T
+        if t >= window - 1:
+            untied = np.diag(concordance).copy()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = concordance / np.sqrt(np.outer(untied, untied))
+            invalid = invalid_counts[t - window + 1:t + 1].any(axis=0)
+            corr[invalid, :] = np.nan
+            corr[:, invalid] = np.nan
+            out[t] = np.clip(corr, -1.0, 1.0)
+    return out
+
+
+def rolling_corr(wide, window, method='pearson', min_periods=None, out_path=None, chunk_size=256):
+    """
+    Rolling correlation matrices of every pair of columns of `wide` ([T, n] frame or array).
+    Returns a [T, n, n] float32 array, memory-mapped at `out_path` (.npy) when given.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Invalid method '{method}': allowed are {', '.join(METHODS)}")
+    values = np.asarray(wide, dtype=np.float64)
+    T, n = values.shape
+    if not 2 <= window <= T:
+        raise ValueError(f"Window must be between 2 and the series length ({T}), got {window}")
+
+    out = _allocate(out_path, (T, n, n))
+    if method == 'pearson':
+        _rolling_pearson(values, window, min_periods or window, out)
+    elif method == 'spearman':
+        _rolling_spearman(values, window, out, chunk_size)
+    else:
+        _rolling_kendall(values, window, out)
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+def save_store(path, corr, dates, coins, **meta):
+    """
+    Persist a [T, n, n] result as <path>.npy plus a <path>.json sidecar with dates and coin order.
+    `corr` already memory-mapped at <path>.npy is left in place.
+    """
+    npy_path = path + '.npy'
+    if not (isinstance(corr, np.memmap) and os.path.abspath(corr.filename) == os.path.abspath(npy_path)):
+        np.save(npy_path, np.asarray(corr, dtype=np.float32))
+    with open(path + '.json', 'w') as f:
+        json.dump(dict(meta, shape=list(corr.shape), coins=list(coins),
+                       dates=[pd.Timestamp(d).strftime('%Y-%m-%d %H:%M:%S') for d in dates]), f)
+    return npy_path
+
+
+def load_store(path):
+    """Open a saved store read-only: returns (memory-mapped [T, n, n] array, metadata dict)."""
+    with open(path + '.json') as f:
+        meta = json.load(f)
+    return np.load(path + '.npy', mmap_mode='r'), meta
+
+
+def _xcorr_fft(a, b, nfft, lags):
+    """
+    Raw cross-correlation sums c[i, j, k] = sum_t a[i, t] * b[j, t + k] for the requested lags, from one
+    batched FFT over series laid out as rows ([series, T], time contiguous).
+    """
+    fa = np.fft.rfft(a, n=nfft, axis=-1)
+    fb = np.fft.rfft(b, n=nfft, axis=-1)
+    full = np.fft.irfft(np.conj(fa)[:, None, :] * fb[None, :, :], n=nfft, axis=-1)
+    return full[..., lags]                                        # lag k at index k, lag -k at nfft - k
+
+
+def lead_lag(wide, max_lag, returns=True, min_overlap=30, chunk_size=32):
+    """
+    Cross-correlation of every pair of coins at every lag in [-max_lag, max_lag].
+    corr[i, j, max_lag + k] is corr(x_i(t), x_j(t + k)), so a peak at k > 0 means coin i leads coin j by k rows.
+    Each series is standardized once (missing values contribute zero) and the sums for all lags come from
+    batched FFTs, normalized by the number of overlapping observations at each lag. Lags with fewer than
+    `min_overlap` overlapping rows are NaN. With `returns` the analysis runs on percentage changes, since
+    trending price levels correlate at every lag.
+
+    Returns (corr [n, n, 2 * max_lag + 1] array, DataFrame with the peak lag and strength of every pair).
+    """
+    frame = pd.DataFrame(wide)
+    if returns:
+        frame = frame.pct_change(fill_method=None).iloc[1:]
+    values = frame.to_numpy(dtype=np.float64)
+    T, n = values.shape
+    if not 1 <= max_lag < T:
+        raise ValueError(f"max_lag must be between 1 and the series length - 1 ({T - 1}), got {max_lag}")
+
+    present = ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (values - np.nanmean(values, axis=0)) / np.nanstd(values, axis=0)
+    z = np.where(present & np.isfinite(z), z, 0.0)
+    mask = present.astype(np.float64)
+
+    # Zero padding to at least 2T avoids circular wrap-around; fast length keeps the FFTs cheap
+    nfft = 1 << int(np.ceil(np.log2(2 * T)))
+    lags = np.arange(-max_lag, max_lag + 1)
+    z, mask = np.ascontiguousarray(z.T), np.ascontiguousarray(mask.T)
+    corr = np.empty((n, n, lags.size))
+    for start in range(0, n, chunk_size):
+        rows = slice(start, start + chunk_size)
+        sums = _xcorr_fft(z[rows], z, nfft, lags)
+        if present.all():
+            counts = (T - np.abs(lags)).astype(np.float64)
+        else:
+            counts = np.rint(_xcorr_fft(mask[rows], mask, nfft, lags))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block = sums / counts
+        block[np.broadcast_to(counts < min_overlap, block.shape)] = np.nan
+        corr[rows] = np.clip(block, -1.0, 1.0)
+
+    coins = list(frame.columns) if isinstance(wide, pd.DataFrame) else list(range(n))
+    i, j = np.triu_indices(n, k=1)
+    pair_corr = corr[i, j]                                        # [pairs, lags]
+    valid = ~np.isnan(pair_corr).all(axis=1)
+    peak = np.nanargmax(np.where(np.isnan(pair_corr), -np.inf, np.abs(pair_corr)), axis=1)
+    peak_lag = lags[peak]
+    peak_corr = np.where(valid, pair_corr[np.arange(len(i)), peak], np.nan)
+
+    summary = pd.DataFrame({
+        'coin_a': [coins[k] for k in i],
+        'coin_b': [coins[k] for k in j],
+        'peak_lag': np.where(valid, peak_lag, 0),
+        'peak_corr': peak_corr,
+        'zero_lag_corr': pair_corr[:, max_lag],
+    })
+    # Positive lag: coin_a leads coin_b; negative: coin_b leads coin_a
+    summary['leader'] = np.where(summary['peak_lag'] > 0, summary['coin_a'],
+                                 np.where(summary['peak_lag'] < 0, summary['coin_b'], ''))
+    summary['lead_days'] = summary['peak_lag'].abs()
+    summary = summary[valid].sort_values('peak_corr', key=np.abs, ascending=False).reset_index(drop=True)
+    return corr, summary
@@ -11,12 +11,17 @@ import pandas as pd
 import pandas_ta as ta
 import warnings
 
+from split_store import write_split
+from timeframe_resample import combine_timeframes, DEFAULT_CHUNKSIZE
+
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 def main():
     parser = argparse.ArgumentParser(description='Split coin price dataset and generate features')
     parser.add_argument('-d', '--data', type=str, help='Single CSV dataset file')
     parser.add_argument('--multi_data', nargs='+', help='Multiple CSV datasets for different timeframes (optional)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='rows read at a time when resampling --multi_data sources')
     parser.add_argument('-tr', '--train', type=float, required=True, help='ratio for train set split')
     parser.add_argument('-vd', '--valid', type=float, required=True, help='ratio for valid set split')
     parser.add_argument('-t', '--target', type=str, required=True, help='target coin symbol, e.g., BTC')
@@ -31,14 +36,10 @@ def main():
 
     target_coin_upper = args.target.upper()
 
+    timeframe_block = None
     if args.multi_data:
-        print("Reading multiple timeframe datasets...")
-        df_list = []
-        for file in args.multi_data:
-            temp_df = pd.read_csv(file)
-            temp_df['Source'] = os.path.basename(file).split('.')[0]
-            df_list.append(temp_df)
-        data = pd.concat(df_list, ignore_index=True)
+        print("Resampling multiple timeframe datasets to daily bars...")
+        data, timeframe_block = combine_timeframes(args.multi_data, chunksize=args.chunksize)
     elif args.data:
         data = pd.read_csv(args.data)
     else:
@@ -89,6 +90,11 @@ def main():
 
     final_features_df = pd.concat(all_features_list, axis=1)
     target_new_name = f"{target_coin_upper.lower()}_avg_ohlc"
+
+    if timeframe_block is not None:
+        # Intraday blocks (realized volatility, range per resolution) aligned on the daily index
+        final_features_df = final_features_df.join(timeframe_block, how='left')
+
     final_features_df.rename(columns={target_coin_upper: target_new_name}, inplace=True)
 
     print("Handling NaN values...")
@@ -118,5 +124,10 @@ def main():
     valid.to_csv(file_valid, sep=',', encoding='utf-8', index=True)
     print(f"Validation set saved to {file_valid}")
 
+    # Binary copies that model_pretrain / hyper_tune / model_tune memory-map instead of parsing the CSVs
+    for name, split in ((filename_1, train), (filename_2, valid)):
+        schema_path = write_split(split, os.path.join(args.path, name))
+        print(f"Binary split saved to {schema_path}")
+
 if __name__ == '__main__':
     main()
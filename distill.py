@@ -0,0 +1,255 @@
+"""
+File: distill.py
+Description: Knowledge distillation of the production LSTM into a compact serving student.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+The teacher (the 6 x 68 LSTM of config_nn.json) is run once over every training window in large batched
+forward passes. The student described by config/config_student.json (a 1-layer GRU or a temporal conv net,
+see pretrain/student.py) is then trained through Distiller on alpha * MSE(teacher) + (1 - alpha) * MSE(label),
+with early stopping on the validation loss against the true labels. Teacher outputs are only usable as-is
+as soft targets in the teacher's own scaled space and label convention, so both follow the teacher:
+    served teacher (registry, trained by train_worker): its scaler sidecar, labels on the next row
+    explicit --teacher without --teacher_scaler (model_pretrain): MinMax fitted on --train, labels on the
+                                                                  window's last row (StockDataset)
+
+The student's state_dict is exported as models/student_<coin>_<date>.pth: app.py serves it with
+MODEL_TYPE=student. A registry teacher's student is registered with the same scaler sidecar, so it is served
+in the scaled space it was trained in. A JSON report compares teacher and student on every validation window (metrics of
+walk_forward) and on single-request latency measured like benchmark_models.
+"""
+
+# Imports
+import os
+import argparse
+import json
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import torch
+import pytorch_lightning as pl
+from pytorch_lightning.callbacks import EarlyStopping
+from sklearn.preprocessing import MinMaxScaler
+from torch.utils.data import Dataset, DataLoader
+
+from benchmark_models import latency
+from model_registry import resolve_artifacts, load_scalers, register_version, registry_path
+from model_pretrain import StockDataset
+from pretrain.forecaster import Distiller
+from pretrain.gru import GRU
+from pretrain.lstm import LSTM
+from pretrain.student import build_student, STUDENT_TYPES
+from split_store import read_frame
+from walk_forward import regression_metrics
+from weights_store import export_weights, load_into
+
+warnings.filterwarnings("ignore")
+
+
+class DistillDataset(Dataset):
+    """StockDataset windows with the teacher's prediction for each window as a third element."""
+    def __init__(self, windows, teacher_outputs):
+        self.windows = windows
+        self.teacher_outputs = torch.tensor(teacher_outputs, dtype=torch.float)
+
+    def __len__(self):
+        return len(self.windows)
+
+    def __getitem__(self, index):
+        x, y = self.windows[index]
+        return x, y, self.teacher_outputs[index]
+
+
+def shift_labels(scaled_df, target_col, label_offset):
+    """Frame whose target column holds the value `label_offset` rows later (StockDataset labels the last row)."""
+    if not label_offset:
+        return scaled_df
+    shifted = scaled_df.assign(**{target_col: scaled_df[target_col].shift(-label_offset)})
+    return shifted.iloc[:len(shifted) - label_offset]
+
+
+def sliding_windows(scaled_df, features, sequence_length):
+    """All [N, seq, F] float32 windows of a scaled frame, in StockDataset order."""
+    x = scaled_df[features].to_numpy(dtype=np.float32)
+    windows = np.lib.stride_tricks.sliding_window_view(x, sequence_length, axis=0).transpose(0, 2, 1)
+    return np.ascontiguousarray(windows)
+
+
+def predict_scaled(network, windows, batch_size=2048):
+    """Scaled predictions of a network for every window, in batched no_grad passes."""
+    network.eval()
+    outputs = []
+    with torch.no_grad():
+        for start in range(0, len(windows), batch_size):
+            outputs.append(network(torch.from_numpy(windows[start:start + batch_size])).numpy().reshape(-1))
+    return np.concatenate(outputs)
+
+
+def load_teacher(path, teacher_type, config, n_features):
+    model_class = LSTM if teacher_type == 'lstm' else GRU
+    teacher = model_class(n_features=n_features, hidden_units=config['hidden_units'], n_layers=config['n_layers'])
+    return load_into(teacher, path).eval()
+
+
+def score(name, network, valid_windows, actual, target_scaler, request, scaler, n_features, repeats):
+    """Validation metrics and single-request latency (scale, forward, inverse scale) of one network."""
+    network.eval()
+    predicted = target_scaler.inverse_transform(predict_scaled(network, valid_windows).reshape(-1, 1)).ravel()
+
+    def serve():
+        seq = scaler.transform(request)[:, :n_features]
+        with torch.no_grad():
+            y = network(torch.tensor(seq, dtype=torch.float).unsqueeze(0)).numpy()
+        return target_scaler.inverse_transform(y.reshape(-1, 1))
+
+    result = dict(model=name, parameters=sum(p.numel() for p in network.parameters()),
+                  **regression_metrics(actual[1:], predicted[1:], actual[:-1]), **latency(serve, repeats))
+    return result, predicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Distill the production LSTM into a compact serving student')
+    parser.add_argument('--train', type=str, required=True, help='training split (CSV or binary split)')
+    parser.add_argument('--valid', type=str, required=True, help='validation split (CSV or binary split)')
+    parser.add_argument('--target', type=str, required=True, help='target coin (e.g., BTC)')
+    parser.add_argument('--features', type=str, default='config/features.json')
+    parser.add_argument('--teacher', type=str, help='teacher weights (default: the served version in the registry of <--path>/models)')
+    parser.add_argument('--teacher_type', type=str, default='lstm', choices=['lstm', 'gru'])
+    parser.add_argument('--teacher_scaler', type=str,
+                        help='scaler sidecar of an explicit --teacher trained by train_worker (next-row labels)')
+    parser.add_argument('--teacher_config', type=str, default='config/config_nn.json')
+    parser.add_argument('--config', type=str, default='config/config_student.json', help='student config')
+    parser.add_argument('--student', type=str, choices=STUDENT_TYPES, help='override student_type of the config')
+    parser.add_argument('--alpha', type=float, help='override the teacher weight of the config (0..1)')
+    parser.add_argument('--epochs', type=int, help='override n_epochs of the config')
+    parser.add_argument('--path', type=str, default=os.getcwd(), help='Path for saving the student model.')
+    parser.add_argument('--filename', type=str, help='Filename for the model (default: student_<coin>_<date>).')
+    parser.add_argument('--repeats', type=int, default=200, help='timed single-request predictions per model')
+    parser.add_argument('--report', type=str, help='report path (default: benchmarks/distill_<coin>.json)')
+    args = parser.parse_args()
+
+    coin = args.target.lower()
+    models_dir = os.path.join(args.path, 'models')
+    os.makedirs(models_dir, exist_ok=True)
+    filename = args.filename or f"student_{coin}_{datetime.now().strftime('%d%m%Y')}"
+    report_path = args.report or os.path.join('benchmarks', f'distill_{coin}.json')
+
+    try:
+        with open(args.features) as f: features = json.load(f)['features']
+        with open(args.teacher_config) as f: teacher_config = json.load(f)
+        with open(args.config) as f: config = json.load(f)
+        if args.student: config['student_type'] = args.student
+        if args.alpha is not None: config['alpha'] = args.alpha
+        if args.epochs: config['n_epochs'] = args.epochs
+
+        # The served version of the coin (registry), or the newest file for coins not registered yet
+        artifacts = None
+        if args.teacher:
+            teacher_path, teacher_scaler = args.teacher, args.teacher_scaler
+        else:
+            artifacts = resolve_artifacts(coin, args.teacher_type, models_dir, args.path)
+            teacher_path, teacher_scaler = artifacts['model_path'], artifacts['scaler_path']
+        if not teacher_path:
+            raise FileNotFoundError(f"No {args.teacher_type} teacher for {coin.upper()} in {models_dir}")
+
+        target_col = f"{coin}_avg_ohlc"
+        columns = features + [target_col]
+        train_df = read_frame(args.train, columns)
+        valid_df = read_frame(args.valid, columns)
+
+        # Soft targets are in the teacher's scaled space: train_worker teachers come with a scaler sidecar and
+        # next-row labels (create_sequences), model_pretrain teachers with a train-split fit and last-row labels
+        if teacher_scaler:
+            scaler, target_scaler = load_scalers(teacher_scaler, columns)
+            label_offset = 1
+        else:
+            scaler = MinMaxScaler().fit(train_df[columns])
+            target_scaler = MinMaxScaler().fit(train_df[[target_col]])
+            label_offset = 0
+        print(f"Teacher scaling: {teacher_scaler or 'fitted on --train'}, labels {label_offset} row(s) after the window")
+        train_scaled = shift_labels(pd.DataFrame(scaler.transform(train_df[columns]), columns=columns), target_col, label_offset)
+        valid_scaled = shift_labels(pd.DataFrame(scaler.transform(valid_df[columns]), columns=columns), target_col, label_offset)
+
+        sequence_length = teacher_config.get('sequence_length', 60)
+        teacher = load_teacher(teacher_path, args.teacher_type, teacher_config, len(features))
+        print(f"Teacher: {os.path.basename(teacher_path)}")
+
+        started = time.perf_counter()
+        train_windows = sliding_windows(train_scaled, features, sequence_length)
+        teacher_outputs = predict_scaled(teacher, train_windows)
+        print(f"Teacher outputs for {len(teacher_outputs)} training windows in {time.perf_counter() - started:.1f}s")
+
+        pl.seed_everything(config['seed'])
+        train_dataset = DistillDataset(StockDataset(train_scaled, target_col, features, sequence_length), teacher_outputs)
+        valid_dataset = StockDataset(valid_scaled, target_col, features, sequence_length)
+        train_loader = DataLoader(train_dataset, batch_size=config['batch_size'], num_workers=config['num_workers'], shuffle=True)
+        valid_loader = DataLoader(valid_dataset, batch_size=config['batch_size'], num_workers=config['num_workers'])
+
+        student = build_student(config, len(features))
+        trainer = pl.Trainer(
+            callbacks=[EarlyStopping('val_loss', patience=config['patience'])],
+            max_epochs=config['n_epochs'],
+            accelerator='gpu' if torch.cuda.is_available() else 'cpu',
+            devices=1,
+        )
+        print(f"\nDistilling into a {config['student_type'].upper()} student (alpha={config['alpha']})...")
+        started = time.perf_counter()
+        trainer.fit(Distiller(student, lr=config['learning_rate'], alpha=config['alpha']), train_loader, valid_loader)
+        train_seconds = time.perf_counter() - started
+        student.cpu().eval()
+
+        output_path = os.path.join(models_dir, filename + '.pth')
+        sidecar = export_weights(student.state_dict(), output_path)
+        print(f"\nStudent saved to: {output_path}")
+
+        # --- Accuracy and latency, teacher against student ---
+        valid_windows = sliding_windows(valid_scaled, features, sequence_length)
+        actual = valid_df[target_col].to_numpy()[sequence_length - 1 + label_offset:]
+        request = valid_df[columns].tail(sequence_length).to_numpy()
+        common = (valid_windows, actual, target_scaler, request, scaler, len(features), args.repeats)
+        teacher_result, teacher_predicted = score('teacher', teacher, *common)
+        student_result, student_predicted = score('student', student, *common)
+
+        deltas = {key: round(student_result[key] - teacher_result[key], 6)
+                  for key in ('mae', 'rmse', 'mape', 'directional_accuracy', 'p50_ms', 'p99_ms')}
+        deltas['speedup_p50'] = round(teacher_result['p50_ms'] / student_result['p50_ms'], 2)
+        deltas['parameter_ratio'] = round(student_result['parameters'] / teacher_result['parameters'], 4)
+        deltas['teacher_agreement_mae'] = float(np.mean(np.abs(student_predicted - teacher_predicted)))
+
+        table = pd.DataFrame([teacher_result, student_result])
+        print('\n' + table[['model', 'parameters', 'mae', 'rmse', 'mape', 'directional_accuracy',
+                            'p50_ms', 'p99_ms']].to_string(index=False))
+        print(f"\nStudent/teacher: {deltas['speedup_p50']}x faster (p50), MAE delta {deltas['mae']:+.6f}")
+
+        # Served with the teacher's scaler sidecar (app.py would otherwise refit the scalers from the CSV)
+        if artifacts is not None and artifacts['source'] == 'registry' and teacher_scaler:
+            register_version(registry_path(models_dir), coin, filename, 'student', output_path,
+                             artifacts['data_path'], features, scaler_path=teacher_scaler,
+                             metrics={key: student_result[key] for key in ('mae', 'rmse', 'mape', 'directional_accuracy')},
+                             checksum=sidecar['sha256'])
+            print(f"Student registered as {filename} with the teacher's scaler sidecar")
+
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump({'target': coin.upper(), 'teacher': os.path.basename(teacher_path),
+                       'student': os.path.basename(output_path), 'config': config,
+                       'teacher_scaler': os.path.basename(teacher_scaler) if teacher_scaler else None,
+                       'label_offset': label_offset,
+                       'train_windows': len(train_windows), 'valid_windows': len(valid_windows),
+                       'train_seconds': round(train_seconds, 2), 'results': [teacher_result, student_result],
+                       'deltas': deltas}, f, indent=2)
+        print(f"Report saved to {report_path}")
+
+    except Exception as e:
+        print(f"\nAn error occurred: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
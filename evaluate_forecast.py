@@ -1,100 +1,182 @@
 """
 File: evaluate_forecast.py
-Description: تحليل ورسم النتائج البيانية للتنبؤات مقارنة بالبيانات التاريخية.
-File Created: 07/06/2025
-Python Version: 3.9
+Description: اختبار رجعي (Backtest) بدون واجهة رسومية لنماذج العملات على فترة التحقق.
+File Created: 07/06/2025 (Refactored: 19/10/2026)
+Python Version: 3.9+
+
+لكل عملة يتم تحميل النموذج المخدوم وملف بياناته ومعاملات التحجيم من السجل (resolve_artifacts) بنفس طريقة الـ API، ثم تُبنى كل النوافذ المتدحرجة مرة واحدة
+وتُقيَّم في تمريرات أمامية كبيرة مجمّعة. تُقيَّم فقط النوافذ التي يقع هدفها في فترة التحقق (آخر 10% من الجدول
+كما يقسمه train_worker)، والهدف هو سعر اليوم التالي لآخر يوم في النافذة كما في create_sequences. تُحسب مقاييس MAE و RMSE و MAPE ودقة الاتجاه، وتُحفظ النتائج
+في جدول مقاييس وملف تنبؤات لكل عملة ورسوم بيانية ثابتة (PNG). تعمل العملات بالتوازي في عمليات منفصلة.
 """
 import os
 import argparse
 import sys
-import pandas as pd
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
 import numpy as np
-import matplotlib.pyplot as plt
-from datetime import timedelta
+import pandas as pd
+
+from precompute_forecasts import COIN_LIST, CONFIG_PATH, FEATURES_PATH, MODEL_TYPE, MODELS_DIR, DATA_DIR
+from feature_importance import build_windows, TRAIN_FRACTION
+from walk_forward import regression_metrics
+
+warnings.filterwarnings("ignore")
+
 
 def parse_arguments():
     """تحليل وسيطات سطر الأوامر."""
-    parser = argparse.ArgumentParser(description='تحليل ورسم نتائج التنبؤ.')
-    
-    parser.add_argument('-p', '--predictions', type=str, required=True,
-                        help='مسار ملف التنبؤات النصي (e.g., predictions_lstm_BTC_20250607.txt).')
-    
-    parser.add_argument('-d', '--historical_data', type=str, required=True,
-                        help='مسار ملف CSV الذي يحتوي على البيانات التاريخية للتحقق (e.g., data/split/valid_07062025.csv).')
-                        
-    parser.add_argument('-t', '--target', type=str, required=True,
-                        help='العمود المستهدف الذي تم التنبؤ به (e.g., BTC).')
-
-    parser.add_argument('-w', '--window', type=int, default=30,
-                        help='عدد الأيام التاريخية التي ستظهر في الرسم البياني للمقارنة (الافتراضي: 30).')
-
+    parser = argparse.ArgumentParser(description='اختبار رجعي لنماذج التنبؤ وحساب المقاييس.')
+    parser.add_argument('--coins', nargs='+', default=COIN_LIST, help='العملات المراد تقييمها.')
+    parser.add_argument('--models_dir', type=str, default=MODELS_DIR, help='مجلد النماذج.')
+    parser.add_argument('--data_dir', type=str, default=DATA_DIR, help='مجلد ملفات البيانات.')
+    parser.add_argument('-o', '--output_dir', type=str, default='backtest', help='مجلد حفظ النتائج والرسوم.')
+    parser.add_argument('-w', '--window', type=int, default=0,
+                        help='عدد الأيام الأخيرة في الرسم البياني (الافتراضي 0: كامل الفترة).')
+    parser.add_argument('--batch_size', type=int, default=2048, help='عدد النوافذ في كل تمرير أمامي.')
+    parser.add_argument('--workers', type=int, help='عدد العمليات المتوازية (الافتراضي: عدد المعالجات).')
+    parser.add_argument('--train_fraction', type=float, default=TRAIN_FRACTION,
+                        help='نسبة صفوف التدريب في أول الجدول؛ تُقيَّم الصفوف بعدها فقط (0: كامل الجدول، داخل العينة).')
     return parser.parse_args()
 
+
+def predict_windows(assets, windows, batch_size):
+    """تنبؤ كل النوافذ [N, seq, F] على دفعات كبيرة ثم عكس التحجيم إلى وحدات السعر."""
+    import torch
+    model, scaler = assets['model'], assets['target_only_scaler']
+    predictions = []
+    with torch.no_grad():
+        for start in range(0, len(windows), batch_size):
+            batch = torch.from_numpy(np.ascontiguousarray(windows[start:start + batch_size]))
+            predictions.append(model(batch).numpy().reshape(-1))
+    return scaler.inverse_transform(np.concatenate(predictions).reshape(-1, 1)).ravel()
+
+
+def plot_backtest(coin, history, metrics, path, window=0):
+    """رسم السعر الفعلي مقابل المتوقع والخطأ المطلق، وحفظه كصورة ثابتة."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if window:
+        history = history.tail(window)
+    fig, (ax, ax_err) = plt.subplots(2, 1, figsize=(15, 9), sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+    ax.plot(history.index, history['actual'], label=f'{coin.upper()} actual', color='dodgerblue', linewidth=1.2)
+    ax.plot(history.index, history['predicted'], label=f'{coin.upper()} predicted', color='orangered',
+            linewidth=1.0, linestyle='--')
+    ax.set_title(f"{coin.upper()} backtest - MAE {metrics['mae']:.4f}, RMSE {metrics['rmse']:.4f}, "
+                 f"MAPE {metrics['mape']:.2f}%, direction {metrics['directional_accuracy']:.2%}")
+    ax.set_ylabel('Price (USD)')
+    ax.grid(True, linestyle='--', linewidth=0.5)
+    ax.legend()
+
+    ax_err.fill_between(history.index, (history['predicted'] - history['actual']).abs(), color='gray', alpha=0.6)
+    ax_err.set_ylabel('|error|')
+    ax_err.grid(True, linestyle='--', linewidth=0.5)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
+def backtest_coin(coin, models_dir, data_dir, output_dir, batch_size, window, threads, train_fraction=TRAIN_FRACTION):
+    """تقييم عملة واحدة على كل نوافذ فترة التحقق (تعمل داخل عملية منفصلة)."""
+    import torch
+    from model_forecast import load_prediction_assets
+    from model_registry import resolve_artifacts
+    torch.set_num_threads(threads)
+
+    # نفس إصدار النموذج ونفس التحجيم المخدومين في الـ API
+    artifacts = resolve_artifacts(coin, MODEL_TYPE, models_dir, data_dir)
+    model_path, data_path = artifacts['model_path'], artifacts['data_path']
+    if not model_path or not data_path:
+        raise FileNotFoundError(f"Could not find model or data files for {coin.upper()}")
+
+    started = time.perf_counter()
+    assets = load_prediction_assets(CONFIG_PATH, FEATURES_PATH, model_path, MODEL_TYPE, data_path, coin,
+                                    scaler_path=artifacts['scaler_path'])
+    data_df = pd.read_csv(data_path, index_col='Date', parse_dates=True)
+    windows, targets, label_rows = build_windows(assets, data_df, train_fraction)
+    if len(windows) < 2:
+        raise ValueError(f"Not enough rows for {coin.upper()} to backtest")
+
+    predicted = predict_windows(assets, windows, batch_size)
+    history = pd.DataFrame({'actual': targets, 'predicted': predicted}, index=data_df.index[label_rows])
+    # القيمة الفعلية السابقة لكل هدف هي سعر آخر يوم في نافذته (لدقة الاتجاه ونموذج naive)
+    previous = data_df[assets['target_col_name']].to_numpy(dtype=np.float64)[label_rows - 1]
+    metrics = regression_metrics(targets, predicted, previous)
+
+    history.to_csv(os.path.join(output_dir, f"{coin}_predictions.csv"), index_label='Date')
+    try:
+        plot_backtest(coin, history, metrics, os.path.join(output_dir, 'charts', f"{coin}.png"), window)
+    except ImportError:
+        print(f"  - WARNING: matplotlib is not installed, no chart for {coin.upper()}")
+    print(f"  - {coin.upper()}: {len(windows)} windows, MAE {metrics['mae']:.4f}, "
+          f"{time.perf_counter() - started:.1f}s", flush=True)
+    return dict(coin=coin, model_version=os.path.splitext(os.path.basename(model_path))[0],
+                data_file=os.path.basename(data_path), windows=len(windows),
+                first_date=history.index[0].date(), last_date=history.index[-1].date(), **metrics)
+
+
+def plot_summary(metrics_df, path):
+    """رسم أعمدة لمقاييس كل العملات للمقارنة السريعة."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, (ax_mape, ax_dir) = plt.subplots(1, 2, figsize=(15, 6))
+    ordered = metrics_df.sort_values('mape')
+    ax_mape.bar(ordered['coin'].str.upper(), ordered['mape'], color='orangered')
+    ax_mape.set_title('MAPE (%)')
+    ax_dir.bar(ordered['coin'].str.upper(), ordered['directional_accuracy'], color='dodgerblue')
+    ax_dir.axhline(0.5, color='gray', linestyle='--', linewidth=1)
+    ax_dir.set_title('Directional accuracy')
+    for ax in (ax_mape, ax_dir):
+        ax.tick_params(axis='x', rotation=45)
+        ax.grid(True, axis='y', linestyle='--', linewidth=0.5)
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
 def main():
-    """الدالة الرئيسية لتشغيل عملية التحليل والرسم."""
+    """الدالة الرئيسية لتشغيل الاختبار الرجعي لكل العملات."""
     args = parse_arguments()
+    os.makedirs(os.path.join(args.output_dir, 'charts'), exist_ok=True)
 
-    # --- 1. تحميل البيانات ---
-    print("جاري تحميل البيانات التاريخية والتنبؤات...")
-    try:
-        # تحميل البيانات التاريخية
-        history_df = pd.read_csv(args.historical_data, index_col='Date', parse_dates=True)
-        
-        # تحميل ملف التنبؤات
-        predictions_array = np.loadtxt(args.predictions)
-        
-    except FileNotFoundError as e:
-        print(f"خطأ: لم يتم العثور على الملف: {e.filename}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"حدث خطأ أثناء تحميل البيانات: {e}")
+    workers = max(1, min(args.workers or os.cpu_count(), len(args.coins)))
+    threads = max(1, os.cpu_count() // workers)
+    print(f"--- اختبار رجعي لـ {len(args.coins)} عملة ({workers} عمليات) ---")
+
+    started = time.perf_counter()
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn')) as pool:
+        futures = {coin: pool.submit(backtest_coin, coin, args.models_dir, args.data_dir, args.output_dir,
+                                     args.batch_size, args.window, threads, args.train_fraction)
+                   for coin in args.coins}
+        for coin, future in futures.items():
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                print(f"  - ❌ {coin.upper()}: {e}")
+
+    if not rows:
+        print("❌ لم يتم تقييم أي عملة.")
         sys.exit(1)
 
-    # --- 2. إعداد البيانات للرسم ---
-    
-    # أخذ آخر جزء من البيانات التاريخية للعرض
-    historical_to_plot = history_df[args.target].tail(args.window)
-    
-    # إنشاء نطاق زمني للتنبؤات
-    last_historical_date = historical_to_plot.index[-1]
-    prediction_dates = pd.date_range(start=last_historical_date + timedelta(days=1), periods=len(predictions_array))
-    
-    # إنشاء DataFrame للتنبؤات
-    predictions_df = pd.Series(predictions_array.flatten(), index=prediction_dates, name=f"تنبؤ {args.target}")
-
-    # --- 3. إنشاء الرسم البياني ---
-    print("جاري إنشاء الرسم البياني...")
-    plt.style.use('seaborn-v0_8-darkgrid') # استخدام نمط جميل للرسم
-    fig, ax = plt.subplots(figsize=(15, 8)) # تحديد حجم الرسم
-
-    # رسم البيانات التاريخية
-    ax.plot(historical_to_plot.index, historical_to_plot.values, label=f'السعر الفعلي لـ {args.target}', color='dodgerblue', marker='o', linestyle='-')
-    
-    # رسم البيانات المتوقعة
-    ax.plot(predictions_df.index, predictions_df.values, label=f'السعر المتوقع لـ {args.target}', color='orangered', marker='o', linestyle='--')
-
-    # --- 4. تخصيص شكل الرسم البياني ---
-    
-    # تحديد عنوان الرسم والمحاور
-    fig.suptitle(f'تحليل أداء نموذج التنبؤ لعملة {args.target}', fontsize=20)
-    ax.set_title(f'آخر {args.window} يومًا من البيانات الفعلية مقارنة بـ {len(predictions_df)} يومًا من التنبؤات', fontsize=12)
-    ax.set_xlabel('التاريخ', fontsize=12)
-    ax.set_ylabel('السعر (USD)', fontsize=12)
-    
-    # تدوير تواريخ المحور السيني لتكون واضحة
-    plt.xticks(rotation=45)
-    
-    # إضافة شبكة خلفية
-    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
-    
-    # إضافة وسيلة الإيضاح (Legend)
-    ax.legend(fontsize=12)
-
-    # --- 5. عرض الرسم البياني ---
-    print("اكتمل. سيتم الآن عرض الرسم البياني...")
-    plt.tight_layout(rect=[0, 0, 1, 0.96]) # ضبط الهوامش
-    plt.show()
+    metrics_df = pd.DataFrame(rows)
+    metrics_path = os.path.join(args.output_dir, 'metrics.csv')
+    metrics_df.to_csv(metrics_path, index=False)
+    try:
+        plot_summary(metrics_df, os.path.join(args.output_dir, 'charts', 'summary.png'))
+    except ImportError:
+        print("WARNING: matplotlib is not installed, charts were skipped")
+    print('\n' + metrics_df[['coin', 'windows', 'mae', 'rmse', 'mape', 'directional_accuracy']].to_string(index=False))
+    print(f"\nاكتمل خلال {time.perf_counter() - started:.1f} ثانية. المقاييس: {metrics_path}")
+
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,177 @@
+"""
+File: feature_importance.py
+Description: Batched permutation feature importance of the served per-coin models.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+For every coin the served model, data file and scaler sidecar are resolved through the registry and loaded
+exactly as the API loads them. The windows labelled inside the validation tail (next-day targets, as
+train_worker trains them; see build_windows) are built once, and each feature is permuted across windows
+`repeats` times. Permuted copies for many
+(feature, repeat) pairs are stacked into one large tensor and scored in a single forward pass, so a coin takes
+F * repeats / copies_per_batch passes instead of F * repeats * windows. Importance is the increase of the MAE
+(in price units) over the unpermuted baseline. Coins run in parallel in spawned worker processes.
+"""
+
+# Imports
+import os
+import argparse
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+
+from precompute_forecasts import COIN_LIST, CONFIG_PATH, FEATURES_PATH, MODEL_TYPE, MODELS_DIR, DATA_DIR, \
+    SEQUENCE_LENGTH
+
+warnings.filterwarnings("ignore")
+
+
+# train_worker.prepare_dataloaders trains on the first 90% of the saved table and validates on the rest
+TRAIN_FRACTION = 0.9
+
+
+def build_windows(assets, data_df, train_fraction=TRAIN_FRACTION, label_offset=1):
+    """
+    Scale the stored data with the serving scaler and slice it into [N, seq, F] windows, their targets and the
+    row index of each target. As in train_worker.create_sequences, a window is labelled with the row
+    `label_offset` days after its last day (1: the next day). Only windows labelled inside the validation tail
+    (rows from int(len * train_fraction) on) are kept; their inputs may reach back into earlier rows.
+    """
+    features, target_col = assets['features'], assets['target_col_name']
+    sequence_length = assets['config'].get('sequence_length', SEQUENCE_LENGTH)
+    scaled = assets['main_scaler'].transform(data_df[features + [target_col]])[:, :len(features)]
+    windows = np.lib.stride_tricks.sliding_window_view(scaled.astype(np.float32), sequence_length, axis=0)
+    label_rows = np.arange(sequence_length - 1 + label_offset, len(data_df))
+    windows = windows[:len(label_rows)]
+    keep = label_rows >= int(len(data_df) * train_fraction)
+    targets = data_df[target_col].to_numpy(dtype=np.float64)[label_rows[keep]]
+    return windows[keep].transpose(0, 2, 1), targets, label_rows[keep]
+
+
+def _predict(model, scaler, batch):
+    import torch
+    with torch.no_grad():
+        y_hat = model(torch.from_numpy(batch)).numpy().reshape(-1, 1)
+    return scaler.inverse_transform(y_hat).ravel()
+
+
+def permutation_importance(assets, windows, targets, repeats=5, batch_windows=4096, seed=0):
+    """
+    (importance [F, repeats], baseline MAE). The same `repeats` row permutations are used for every feature,
+    so differences between features are not blurred by permutation noise.
+    """
+    model, scaler = assets['model'], assets['target_only_scaler']
+    n, sequence_length, n_features = windows.shape
+    windows = np.ascontiguousarray(windows)
+    baseline = np.abs(_predict(model, scaler, windows) - targets).mean()
+
+    rng = np.random.default_rng(seed)
+    permutations = [rng.permutation(n) for _ in range(repeats)]
+    jobs = [(f, r) for f in range(n_features) for r in range(repeats)]
+    copies = max(1, batch_windows // n)
+    buffer = np.empty((copies, n, sequence_length, n_features), dtype=np.float32)
+
+    importance = np.empty((n_features, repeats))
+    for start in range(0, len(jobs), copies):
+        chunk = jobs[start:start + copies]
+        batch = buffer[:len(chunk)]
+        batch[:] = windows
+        for k, (f, r) in enumerate(chunk):
+            batch[k, :, :, f] = windows[permutations[r], :, f]
+        predictions = _predict(model, scaler, batch.reshape(-1, sequence_length, n_features)).reshape(len(chunk), n)
+        errors = np.abs(predictions - targets).mean(axis=1)
+        for (f, r), error in zip(chunk, errors):
+            importance[f, r] = error - baseline
+    return importance, float(baseline)
+
+
+def coin_importance(coin, models_dir, data_dir, n_windows, repeats, batch_windows, seed, threads,
+                    train_fraction=TRAIN_FRACTION):
+    """Worker: importance table of one coin's served model."""
+    import torch
+    from model_forecast import load_prediction_assets
+    from model_registry import resolve_artifacts
+    torch.set_num_threads(threads)
+
+    artifacts = resolve_artifacts(coin, MODEL_TYPE, models_dir, data_dir)
+    model_path, data_path = artifacts['model_path'], artifacts['data_path']
+    if not model_path or not data_path:
+        raise FileNotFoundError(f"Could not find model or data files for {coin.upper()}")
+
+    started = time.perf_counter()
+    assets = load_prediction_assets(CONFIG_PATH, FEATURES_PATH, model_path, MODEL_TYPE, data_path, coin,
+                                    scaler_path=artifacts['scaler_path'])
+    data_df = pd.read_csv(data_path, index_col='Date', parse_dates=True)
+    windows, targets, _ = build_windows(assets, data_df, train_fraction)
+    if len(windows) == 0:
+        raise ValueError(f"Not enough validation rows for {coin.upper()} to build a single window")
+    windows, targets = windows[-n_windows:], targets[-n_windows:]
+
+    importance, baseline = permutation_importance(assets, windows, targets, repeats, batch_windows, seed)
+    table = pd.DataFrame({
+        'coin': coin,
+        'feature': assets['features'],
+        'importance': importance.mean(axis=1),
+        'importance_std': importance.std(axis=1),
+        'relative': importance.mean(axis=1) / baseline if baseline else np.nan,
+    })
+    table['rank'] = table['importance'].rank(ascending=False, method='first').astype(int)
+    print(f"  - {coin.upper()}: {len(windows)} windows, baseline MAE {baseline:.4f}, "
+          f"{time.perf_counter() - started:.1f}s ({os.path.basename(model_path)})", flush=True)
+    return table.sort_values('rank')
+
+
+def run_all(coins, models_dir=MODELS_DIR, data_dir=DATA_DIR, n_windows=256, repeats=5, batch_windows=4096,
+            seed=0, workers=None, train_fraction=TRAIN_FRACTION):
+    workers = max(1, min(workers or os.cpu_count(), len(coins)))
+    threads = max(1, os.cpu_count() // workers)
+    print(f"--- Permutation importance for {len(coins)} coins ({workers} workers x {threads} threads) ---")
+
+    tables = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn')) as pool:
+        futures = {coin: pool.submit(coin_importance, coin, models_dir, data_dir, n_windows, repeats,
+                                     batch_windows, seed, threads, train_fraction) for coin in coins}
+        for coin, future in futures.items():
+            try:
+                tables.append(future.result())
+            except Exception as e:
+                print(f"  - ❌ {coin.upper()}: {e}")
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Permutation feature importance of every coin model')
+    parser.add_argument('--coins', nargs='+', default=COIN_LIST, help='coins to analyse')
+    parser.add_argument('--models_dir', type=str, default=MODELS_DIR)
+    parser.add_argument('--data_dir', type=str, default=DATA_DIR)
+    parser.add_argument('--windows', type=int, default=256, help='at most this many of the latest validation windows')
+    parser.add_argument('--train_fraction', type=float, default=TRAIN_FRACTION,
+                        help='leading share of the table used for training; only later targets are scored (0: all)')
+    parser.add_argument('--repeats', type=int, default=5, help='permutations per feature')
+    parser.add_argument('--batch_windows', type=int, default=4096, help='windows scored per forward pass')
+    parser.add_argument('--workers', type=int, help='parallel coin workers (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=str, default='feature_importance.csv', help='long-format output CSV')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    table = run_all(args.coins, args.models_dir, args.data_dir, args.windows, args.repeats, args.batch_windows,
+                    args.seed, args.workers, args.train_fraction)
+    if table.empty:
+        print("❌ No coin could be analysed.")
+        return
+
+    table.to_csv(args.output, index=False)
+    wide_path = os.path.splitext(args.output)[0] + '_matrix.csv'
+    table.pivot(index='feature', columns='coin', values='importance').to_csv(wide_path)
+    print(f"\nDone in {time.perf_counter() - started:.1f}s. Saved to {args.output} and {wide_path}")
+    for coin, group in table.groupby('coin', sort=False):
+        print(f"{coin.upper()} top 5: " + ', '.join(group.head(5)['feature']))
+
+
+if __name__ == '__main__':
+    main()
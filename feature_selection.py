@@ -0,0 +1,182 @@
+"""
+File: feature_selection.py
+Description: Correlation-driven feature pruning: cluster redundant input features and emit a reduced features.json.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Features whose absolute correlation on the training split is above a threshold (pegged stablecoins, BTC/WBTC,
+the SMA/Bollinger bands of one coin, ...) are grouped by average-linkage hierarchical clustering on the distance
+1 - |corr|, and each cluster is replaced by the member most correlated with the target. Constant columns carry
+no information and are dropped. With --report, a short training run per threshold records how the input width
+relates to validation loss and to single-request inference latency.
+"""
+
+# Imports
+import os
+import argparse
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, fcluster
+from scipy.spatial.distance import squareform
+
+from correlation_engine import METHODS, static_corr
+from split_store import split_columns, read_frame
+
+warnings.filterwarnings("ignore", category=UserWarning)
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+
+def cluster_features(data, features, target_col, threshold=0.98, method='pearson'):
+    """
+    Group features whose |corr| exceeds `threshold` and keep one representative per group.
+    Returns (kept features in their original order, {representative: [dropped members]}, [constant features]).
+    """
+    constant = [f for f in features if data[f].nunique(dropna=True) <= 1]
+    candidates = [f for f in features if f not in constant]
+    if len(candidates) < 2:
+        return candidates, {}, constant
+
+    corr = static_corr(data[candidates], method=method).abs().fillna(0.0).to_numpy()
+    np.fill_diagonal(corr, 1.0)
+    distance = squareform(np.clip(1.0 - corr, 0.0, None), checks=False)
+    labels = fcluster(linkage(distance, method='average'), t=1.0 - threshold, criterion='distance')
+
+    relevance = data[candidates].corrwith(data[target_col], method=method).abs().fillna(0.0)
+    clusters = {}
+    for label in np.unique(labels):
+        members = [f for f, l in zip(candidates, labels) if l == label]
+        representative = relevance[members].idxmax()
+        clusters[representative] = [m for m in members if m != representative]
+
+    kept = [f for f in candidates if f in clusters]
+    dropped = {rep: members for rep, members in clusters.items() if members}
+    return kept, dropped, constant
+
+
+def write_features(path, kept, dropped, constant, **meta):
+    """Write a features.json readable by every loader (they only read 'features'); the rest documents the pruning."""
+    with open(path, 'w') as f:
+        json.dump(dict(meta, features=kept, merged=dropped, constant=constant), f, indent=2)
+
+
+def measure_latency(model, n_features, sequence_length, repeats=50):
+    """Median wall time of one single-sequence forward pass, as /predict runs it."""
+    import torch
+    x = torch.randn(1, sequence_length, n_features)
+    model.eval()
+    timings = []
+    with torch.no_grad():
+        model(x)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(x)
+            timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def evaluate_width(train_df, valid_df, features, target_col, config, epochs):
+    """Short training run on a feature subset: best validation loss and inference latency."""
+    import pytorch_lightning as pl
+    from sklearn.preprocessing import MinMaxScaler
+    from torch.utils.data import DataLoader
+    from model_pretrain import StockDataset
+    from pretrain.lstm import LSTM
+    from pretrain.forecaster import Forecaster
+
+    columns = features + [target_col]
+    scaler = MinMaxScaler()
+    train_scaled = pd.DataFrame(scaler.fit_transform(train_df[columns]), columns=columns)
+    valid_scaled = pd.DataFrame(scaler.transform(valid_df[columns]), columns=columns)
+
+    pl.seed_everything(config['seed'])
+    sequence_length = config.get('sequence_length', 60)
+    train_loader = DataLoader(StockDataset(train_scaled, target_col, features, sequence_length),
+                              batch_size=config['batch_size'], shuffle=True)
+    valid_loader = DataLoader(StockDataset(valid_scaled, target_col, features, sequence_length),
+                              batch_size=config['batch_size'])
+
+    network = LSTM(n_features=len(features), hidden_units=config['hidden_units'], n_layers=config['n_layers'])
+    model = Forecaster(network, lr=config['learning_rate'])
+    trainer = pl.Trainer(max_epochs=epochs, accelerator='cpu', devices=1, logger=False,
+                         enable_checkpointing=False, enable_progress_bar=False, enable_model_summary=False)
+    start = time.perf_counter()
+    trainer.fit(model, train_loader, valid_loader)
+    train_seconds = time.perf_counter() - start
+    val_loss = trainer.callback_metrics.get('val_loss')
+
+    return {
+        'val_loss': float(val_loss) if val_loss is not None else None,
+        'train_seconds': round(train_seconds, 2),
+        'latency_ms': round(measure_latency(network, len(features), sequence_length) * 1000, 3),
+        'payload_values': len(features) * sequence_length,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prune redundant features by correlation clustering')
+    parser.add_argument('--train', type=str, required=True, help='Path to the CSV training dataset.')
+    parser.add_argument('--valid', type=str, help='Path to the CSV validation dataset (needed for --report).')
+    parser.add_argument('--target', type=str, required=True, help='Target coin (e.g., BTC).')
+    parser.add_argument('--features', type=str, default='config/features.json', help='Input features.json.')
+    parser.add_argument('--threshold', type=float, default=0.98, help='|corr| above which features are merged.')
+    parser.add_argument('-m', '--method', type=str, default='pearson', help='pearson, spearman or kendall.')
+    parser.add_argument('-o', '--output', type=str, default='config/features_pruned.json', help='Reduced features.json.')
+    parser.add_argument('--report', nargs='*', type=float,
+                        help='thresholds to compare by validation loss and latency (the full list is always included)')
+    parser.add_argument('--config', type=str, default='config/config_nn.json', help='Model config for --report runs.')
+    parser.add_argument('--epochs', type=int, default=5, help='Training epochs per --report run.')
+    args = parser.parse_args()
+
+    if args.method not in METHODS:
+        print('Invalid method selected: allowed are pearson, kendall and spearman!')
+        sys.exit(1)
+    if not 0.0 < args.threshold <= 1.0:
+        print('Invalid threshold: must be in (0, 1]!')
+        sys.exit(1)
+    if args.report is not None and not args.valid:
+        print('Missing argument: --report needs --valid!')
+        sys.exit(1)
+
+    with open(args.features) as f: features = json.load(f)['features']
+    target_col = f"{args.target.lower()}_avg_ohlc"
+    available_columns = split_columns(args.train)
+    missing = [f for f in features + [target_col] if f not in available_columns]
+    if missing:
+        print(f"The following columns are not in the dataset: {missing}")
+        sys.exit(1)
+    train_df = read_frame(args.train, features + [target_col])
+
+    kept, dropped, constant = cluster_features(train_df, features, target_col, args.threshold, args.method)
+    write_features(args.output, kept, dropped, constant, source=os.path.basename(args.features),
+                   target=args.target.upper(), threshold=args.threshold, method=args.method)
+    print(f"{len(features)} -> {len(kept)} features ({sum(map(len, dropped.values()))} merged, "
+          f"{len(constant)} constant). Saved to {args.output}")
+
+    if args.report is None:
+        return
+
+    with open(args.config) as f: config = json.load(f)
+    valid_df = read_frame(args.valid, features + [target_col])
+    runs = [(None, features)] + [(t, cluster_features(train_df, features, target_col, t, args.method)[0])
+                                 for t in sorted(set(args.report + [args.threshold]), reverse=True)]
+    rows = []
+    for threshold, subset in runs:
+        label = 'all' if threshold is None else threshold
+        print(f"\n--- threshold {label}: {len(subset)} features ---")
+        rows.append(dict(threshold=label, n_features=len(subset),
+                         **evaluate_width(train_df, valid_df, subset, target_col, config, args.epochs)))
+
+    report = pd.DataFrame(rows)
+    print('\n' + report.to_string(index=False))
+    report_path = os.path.splitext(args.output)[0] + '_report.json'
+    report.to_json(report_path, orient='records', indent=2)
+    print(f"Report saved to {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+File: forecast_store.py
+Description: Small coin-indexed file of precomputed next-step forecasts, written by the training worker and read by the API.
+File Created: 19/10/2026
+Python Version: 3.9+
+"""
+
+# Imports
+import os
+import json
+import threading
+
+FORECASTS_PATH = os.environ.get('FORECASTS_PATH', '/data/forecasts/forecasts.json')
+
+
+def write_forecasts(records, path=FORECASTS_PATH):
+    """
+    Atomically replace the forecasts file with {coin: record}. The API may be reading it at the same
+    time from another service on the shared disk, so write to a temp file and rename.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump({'forecasts': records}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ForecastStore:
+    """
+    In-memory view of the forecasts file. A lookup is a dict access plus an os.stat to pick up a file
+    the worker has replaced since the last read.
+    """
+    def __init__(self, path=FORECASTS_PATH):
+        self.path = path
+        self._forecasts = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._forecasts, self._mtime = {}, None
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path) as f:
+                self._forecasts = json.load(f).get('forecasts', {})
+            self._mtime = mtime
+
+    def get(self, coin):
+        self._refresh()
+        return self._forecasts.get(coin)
+
+    def coins(self):
+        self._refresh()
+        return sorted(self._forecasts)
@@ -21,9 +21,28 @@ from sklearn.preprocessing import MinMaxScaler # <-- السطر الجديد ا
 # استيراد الكلاسات من مشروعك
 from pretrain.datasets import DatasetV1
 from pretrain.lstm import LSTM
+from pretrain.forecaster import Forecaster
+from split_store import read_frame
+
+
+def load_data(args):
+    """
+    تحميل أعمدة الميزات والهدف فقط مرة واحدة لكل الدراسة (من الملف الثنائي المعيّن في الذاكرة إن وُجد)،
+    ثم تحجيم كل عمود على بيانات التدريب.
+    """
+    with open(args.features, 'r') as f:
+        features = json.load(f)['features']
+    columns = features + [args.target]
+    train_df = read_frame(args.train, columns)
+    valid_df = read_frame(args.valid, columns)
+
+    scaler = MinMaxScaler()
+    train_scaled = pd.DataFrame(scaler.fit_transform(train_df), index=train_df.index, columns=columns)
+    valid_scaled = pd.DataFrame(scaler.transform(valid_df), index=valid_df.index, columns=columns)
+    return train_scaled, valid_scaled, features
 
 # دالة الهدف التي سيقوم Optuna بتحسينها
-def objective(trial, args):
+def objective(trial, args, data):
     """
     دالة الهدف لـ Optuna.
     تقوم بتدريب النموذج بإعدادات مقترحة وترجع قيمة الخسارة للتحقق.
@@ -39,19 +58,8 @@ def objective(trial, args):
     print(f"\n--- بدء المحاولة رقم: {trial.number} ---")
     print(f"الإعدادات المقترحة: {params}")
 
-    # 2. تحميل البيانات
-    train_df = pd.read_csv(args.train, index_col='Date', parse_dates=True)
-    valid_df = pd.read_csv(args.valid, index_col='Date', parse_dates=True)
-    with open(args.features, 'r') as f:
-        features = json.load(f)['features']
-
-    # تحجيم البيانات
-    train_scaled = train_df.copy()
-    valid_scaled = valid_df.copy()
-    for col in train_df.columns:
-        s = MinMaxScaler()
-        train_scaled[col] = s.fit_transform(train_df[[col]])
-        valid_scaled[col] = s.transform(valid_df[[col]])
+    # 2. البيانات محملة ومحجّمة مسبقاً في load_data
+    train_scaled, valid_scaled, features = data
 
     # 3. إعداد البيانات للتدريب
     train_dataset = DatasetV1(train_scaled, target=args.target, features=features)
@@ -63,10 +71,12 @@ def objective(trial, args):
     # 4. تدريب النموذج
     early_stopping = EarlyStopping('val_loss', patience=10, verbose=False)
 
-    model = LSTM(
-        n_features=len(features),
-        hidden_units=params['hidden_units'],
-        n_layers=params['n_layers'],
+    model = Forecaster(
+        LSTM(
+            n_features=len(features),
+            hidden_units=params['hidden_units'],
+            n_layers=params['n_layers'],
+        ),
         lr=params['learning_rate']
     )
     
@@ -91,15 +101,16 @@ def objective(trial, args):
 
 def main():
     parser = argparse.ArgumentParser(description='Tune hyperparameters for the LSTM model using Optuna.')
-    parser.add_argument('--train', type=str, required=True, help='Path to the training data CSV.')
-    parser.add_argument('--valid', type=str, required=True, help='Path to the validation data CSV.')
+    parser.add_argument('--train', type=str, required=True, help='Path to the training split (CSV or binary split).')
+    parser.add_argument('--valid', type=str, required=True, help='Path to the validation split (CSV or binary split).')
     parser.add_argument('--features', type=str, required=True, help='Path to the features JSON file.')
     parser.add_argument('--target', type=str, required=True, help='Target coin symbol (e.g., BTC).')
     parser.add_argument('--n_trials', type=int, default=50, help='Number of optimization trials to run.')
     args = parser.parse_args()
 
+    data = load_data(args)
     study = optuna.create_study(direction='minimize')
-    study.optimize(lambda trial: objective(trial, args), n_trials=args.n_trials)
+    study.optimize(lambda trial: objective(trial, args, data), n_trials=args.n_trials)
 
     print("\n--- اكتملت عملية التحسين ---")
     print(f"عدد المحاولات المكتملة: {len(study.trials)}")
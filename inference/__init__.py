@@ -0,0 +1,4 @@
+"""
+Serving-only helpers that import nothing beyond NumPy and PyTorch (no Lightning, sklearn, scipy or pandas).
+"""
+from inference.scaling import MinMaxScaler
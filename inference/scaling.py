@@ -0,0 +1,64 @@
+"""
+File: scaling.py
+Description: NumPy MinMax scaler for serving, a drop-in for the fitted sklearn MinMaxScaler.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Same fitted attributes (data_min_, data_max_, data_range_, scale_, min_) and the same arithmetic as
+sklearn.preprocessing.MinMaxScaler with clip=False, so scaler sidecars and predictions are interchangeable,
+without importing sklearn (and scipy) in every serving worker.
+"""
+
+# Imports
+import numpy as np
+
+
+def _handle_zeros(scale):
+    # Constant columns get a range of 1, as in sklearn
+    scale = scale.copy()
+    scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+    return scale
+
+
+class MinMaxScaler:
+    """
+    Constructor.
+    """
+    def __init__(self, feature_range=(0, 1)):
+        self.feature_range = feature_range
+
+    @staticmethod
+    def _array(X):
+        X = np.asarray(X)
+        return X if X.dtype in (np.float32, np.float64) else X.astype(np.float64)
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        self.data_min_ = np.nanmin(X, axis=0)
+        self.data_max_ = np.nanmax(X, axis=0)
+        self.data_range_ = self.data_max_ - self.data_min_
+        low, high = self.feature_range
+        self.scale_ = (high - low) / _handle_zeros(self.data_range_)
+        self.min_ = low - self.data_min_ * self.scale_
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    @classmethod
+    def from_params(cls, params):
+        """Fitted scaler from saved attributes (see model_registry.save_scalers)."""
+        scaler = cls()
+        for key in ('data_min_', 'data_max_', 'data_range_', 'scale_', 'min_'):
+            setattr(scaler, key, np.asarray(params[key], dtype=np.float64))
+        scaler.n_features_in_ = len(scaler.scale_)
+        return scaler
+
+    def transform(self, X):
+        X = self._array(X)
+        return X * self.scale_.astype(X.dtype) + self.min_.astype(X.dtype)
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    def inverse_transform(self, X):
+        X = self._array(X)
+        return (X - self.min_.astype(X.dtype)) / self.scale_.astype(X.dtype)
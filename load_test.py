@@ -0,0 +1,321 @@
+"""
+File: load_test.py
+Description: Offline load test and latency benchmark for the prediction API (app.py).
+File Created: 19/10/2026
+Python Version: 3.9+
+
+The request bodies are a small pool (--n_payloads) replayed over and over, so with the /predict result cache
+almost every request after the first round would be a cache hit and the benchmark would measure the cache,
+not the model. The server started here therefore runs with PREDICTION_CACHE_SIZE=0 unless --cache is given.
+A server passed with --url keeps its own cache settings.
+"""
+
+# Imports
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'config_nn.json')
+FEATURES_PATH = os.path.join(BASE_DIR, 'config', 'features.json')
+SEQUENCE_LENGTH = 60
+FIXTURE_ROWS = 240
+
+COIN_LIST = [
+    'btc', 'eth', 'usdt', 'usdc', 'bnb', 'xrp', 'busd', 'ada',
+    'sol', 'doge', 'dot', 'dai', 'shib', 'trx', 'avax', 'uni',
+    'wbtc', 'leo', 'ltc'
+]
+
+
+# --- Fixtures ---
+
+def generate_fixtures(fixtures_dir, coins, seed):
+    """
+    Write a random-weight LSTM and a synthetic feature table per coin using the
+    same file naming app.py expects on the persistent disk.
+    """
+    import torch
+    from pretrain.lstm import LSTM
+
+    with open(CONFIG_PATH) as f: config = json.load(f)
+    with open(FEATURES_PATH) as f: features = json.load(f)['features']
+
+    models_dir = os.path.join(fixtures_dir, 'models')
+    data_dir = os.path.join(fixtures_dir, 'data')
+    os.makedirs(models_dir, exist_ok=True)
+    os.makedirs(data_dir, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    columns = features + [f"{coin}_avg_ohlc" for coin in COIN_LIST]
+    # Positive random walks so the table looks like prices and indicators
+    values = 100 + np.cumsum(rng.normal(0, 1, size=(FIXTURE_ROWS, len(columns))), axis=0)
+    data = pd.DataFrame(np.abs(values), columns=columns)
+    data.insert(0, 'Date', pd.date_range(end=datetime.now().date(), periods=FIXTURE_ROWS, freq='D'))
+
+    today = datetime.now().strftime('%d%m%Y')
+    torch.manual_seed(seed)
+    for coin in coins:
+        model = LSTM(n_features=len(features), hidden_units=config['hidden_units'], n_layers=config['n_layers'])
+        torch.save(model.state_dict(), os.path.join(models_dir, f"lstm_{coin}_{today}.pth"))
+        data.to_csv(os.path.join(data_dir, f"{coin}_{today}.csv"), index=False)
+
+    print(f"Fixtures for {len(coins)} coins written to {fixtures_dir}")
+    return models_dir, data_dir, data, features
+
+
+def build_payloads(data, features, n_payloads, seed):
+    """Pre-encode a pool of 60-row request bodies cut from the fixture table."""
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(n_payloads):
+        start = rng.randint(0, len(data) - SEQUENCE_LENGTH)
+        window = data[features].iloc[start:start + SEQUENCE_LENGTH]
+        bodies.append(json.dumps({"sequence": window.to_dict(orient='records')}).encode('utf-8'))
+    return bodies
+
+
+# --- Server ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, port, workers, models_dir, data_dir, cache=False):
+    """Start app.py in a child process pointed at the fixture directories (prediction cache off by default)."""
+    env = dict(os.environ, MODELS_DIR=models_dir, DATA_DIR=data_dir)
+    if not cache:
+        env['PREDICTION_CACHE_SIZE'] = '0'
+    if server == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--timeout', '120', 'app:app']
+    else:
+        cmd = [sys.executable, '-c',
+               f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"]
+    return subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+
+def wait_until_up(base_url, proc, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"Server exited early with code {proc.returncode}")
+        try:
+            requests.get(f"{base_url}/health", timeout=2)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.5)
+    raise TimeoutError(f"Server did not come up within {timeout} seconds")
+
+
+# --- Load generation ---
+
+def parse_mix(mix):
+    """
+    Parse entries like 'btc=5', 'health=1' or 'info:eth=1' into weighted targets.
+    A bare coin name means POST /predict/<coin>.
+    """
+    targets = []
+    for entry in mix:
+        name, _, weight = entry.partition('=')
+        weight = float(weight or 1)
+        if name == 'health':
+            targets.append(('GET', '/health', None, weight))
+        elif name.startswith('info:'):
+            targets.append(('GET', f"/info/{name.split(':', 1)[1]}", None, weight))
+        else:
+            targets.append(('POST', f"/predict/{name}", name, weight))
+    return targets
+
+
+class Recorder:
+    """Thread-safe collection of per-endpoint latencies and outcomes."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, latency, status):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            self.status_codes[endpoint][str(status)] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[endpoint] += 1
+
+    def summary(self, wall_time):
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ms = np.array(values) * 1000
+            report[endpoint] = {
+                'requests': len(values),
+                'throughput_rps': round(len(values) / wall_time, 2),
+                'error_rate': round(self.errors[endpoint] / len(values), 4),
+                'p50_ms': round(float(np.percentile(ms, 50)), 2),
+                'p95_ms': round(float(np.percentile(ms, 95)), 2),
+                'p99_ms': round(float(np.percentile(ms, 99)), 2),
+                'max_ms': round(float(ms.max()), 2),
+                'status_codes': dict(self.status_codes[endpoint]),
+            }
+        return report
+
+
+def send(session, base_url, target, bodies, recorder, scheduled_at=None):
+    method, path, _, _ = target
+    endpoint = f"{method} {path}"
+    # In open-loop mode latency is measured from the scheduled send time to avoid coordinated omission
+    start = scheduled_at if scheduled_at is not None else time.perf_counter()
+    try:
+        if method == 'POST':
+            response = session.post(base_url + path, data=random.choice(bodies),
+                                    headers={"Content-Type": "application/json"}, timeout=120)
+        else:
+            response = session.get(base_url + path, timeout=120)
+        status = response.status_code
+    except requests.exceptions.RequestException as e:
+        status = type(e).__name__
+    recorder.record(endpoint, time.perf_counter() - start, status)
+
+
+_thread_local = threading.local()
+
+
+def thread_session():
+    # One keep-alive session per thread; trust_env=False keeps proxies out of a localhost run
+    if not hasattr(_thread_local, 'session'):
+        _thread_local.session = requests.Session()
+        _thread_local.session.trust_env = False
+    return _thread_local.session
+
+
+def run_closed_loop(base_url, targets, bodies, concurrency, duration, recorder):
+    """Each of `concurrency` workers sends its next request as soon as the previous one returns."""
+    weights = [t[3] for t in targets]
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            target = random.choices(targets, weights=weights)[0]
+            send(thread_session(), base_url, target, bodies, recorder)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+
+def run_open_loop(base_url, targets, bodies, rps, duration, max_workers, recorder):
+    """Issue requests on a fixed schedule of `rps` per second regardless of how fast responses come back."""
+    weights = [t[3] for t in targets]
+    interval = 1.0 / rps
+    start = time.perf_counter()
+    n_requests = int(rps * duration)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i in range(n_requests):
+            scheduled_at = start + i * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            target = random.choices(targets, weights=weights)[0]
+            pool.submit(lambda t=target, s=scheduled_at: send(thread_session(), base_url, t, bodies, recorder, s))
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<28}{'reqs':>8}{'rps':>9}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, r in report.items():
+        print(f"{endpoint:<28}{r['requests']:>8}{r['throughput_rps']:>9}{r['error_rate'] * 100:>8.2f}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the prediction API against locally generated fixtures.')
+    parser.add_argument('--mix', nargs='+', default=['btc=4', 'eth=2', 'sol=1', 'health=1'],
+                        help="weighted request mix, e.g. btc=5 eth=1 health=1 info:btc=1")
+    parser.add_argument('--rps', type=float, help='target requests per second (open loop); omit for closed-loop concurrency mode')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='concurrent clients (closed loop) or max in-flight requests (open loop)')
+    parser.add_argument('-d', '--duration', type=float, default=30, help='test duration in seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unrecorded traffic before measuring')
+    parser.add_argument('--server', choices=['gunicorn', 'werkzeug'], default='gunicorn', help='how to start app.py')
+    parser.add_argument('--workers', type=int, default=3, help='gunicorn worker count (matches the Dockerfile by default)')
+    parser.add_argument('--url', type=str, help='target an already running server instead of starting one')
+    parser.add_argument('--fixtures', type=str, help='fixture directory (generated into a temp dir by default)')
+    parser.add_argument('--coins', nargs='+', default=COIN_LIST, help='coins to generate fixtures for')
+    parser.add_argument('--n_payloads', type=int, default=32, help='number of distinct request bodies to replay')
+    parser.add_argument('--cache', action='store_true',
+                        help='keep the prediction cache on (replayed bodies then mostly measure cache hits)')
+    parser.add_argument('--startup_timeout', type=float, default=300, help='seconds to wait for the server to load all models')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('-o', '--output', type=str, help='write the JSON report to this file')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    fixtures_dir = args.fixtures or tempfile.mkdtemp(prefix='loadtest_')
+    models_dir, data_dir, data, features = generate_fixtures(fixtures_dir, args.coins, args.seed)
+    bodies = build_payloads(data, features, args.n_payloads, args.seed)
+    targets = parse_mix(args.mix)
+
+    proc = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        print(f"Starting {args.server} on {base_url} ...")
+        proc = start_server(args.server, port, args.workers, models_dir, data_dir, args.cache)
+
+    try:
+        wait_until_up(base_url, proc, args.startup_timeout)
+        mode = f"open loop at {args.rps} rps" if args.rps else f"closed loop with {args.concurrency} clients"
+        print(f"Server is up. Running {mode} for {args.duration}s (+{args.warmup}s warm-up)...")
+
+        def run(duration, recorder):
+            if args.rps:
+                run_open_loop(base_url, targets, bodies, args.rps, duration, args.concurrency, recorder)
+            else:
+                run_closed_loop(base_url, targets, bodies, args.concurrency, duration, recorder)
+
+        if args.warmup > 0:
+            run(args.warmup, Recorder())
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        run(args.duration, recorder)
+        wall_time = time.perf_counter() - started
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    report = recorder.summary(wall_time)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {'timestamp': datetime.now().isoformat(timespec='seconds'), 'mode': 'rps' if args.rps else 'concurrency',
+                         'rps': args.rps, 'concurrency': args.concurrency, 'duration': args.duration,
+                         'wall_time': round(wall_time, 3), 'server': 'external' if args.url else args.server,
+                         'workers': args.workers, 'mix': args.mix,
+                         'prediction_cache': 'external' if args.url else ('on' if args.cache else 'off')},
+                'endpoints': report,
+            }, f, indent=2)
+        print(f"\nReport saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+File: metrics.py
+Description: Lightweight in-process counters and latency histograms exposed in Prometheus text format.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Every gunicorn worker keeps its own registry, so /metrics reports the worker that served the scrape.
+Recording a value is a lock plus a bisect over a short bucket list, cheap enough to leave on in production.
+"""
+
+# Imports
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond stages up to slow cold requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = ['{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs]
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(l, '') for l in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(l, '') for l in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One slot per bucket plus the +Inf overflow, then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', le))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# --- Metrics shared by the serving code ---
+PREDICTION_STAGE_SECONDS = histogram(
+    'prediction_stage_seconds', 'Time spent in each stage of a /predict request.', ('coin', 'stage'))
+PREDICTION_ERRORS = counter(
+    'prediction_errors_total', 'Failed /predict requests by coin and reason.', ('coin', 'reason'))
+ASSET_LOAD_SECONDS = histogram(
+    'asset_load_seconds', 'Time to load the model, scalers and data for a coin at startup.', ('coin',),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+ASSET_LOAD_FAILURES = counter(
+    'asset_load_failures_total', 'Coins whose assets failed to load at startup.', ('coin',))
+WARMUP_SECONDS = histogram(
+    'model_warmup_seconds', 'Synthetic warm-up forward passes per coin: the first pass (phase=first) and the following ones (phase=steady).',
+    ('coin', 'phase'))
+
+
+def render():
+    return REGISTRY.render()
@@ -1,11 +1,23 @@
 # model_forecast.py (النسخة النهائية والمصححة)
 
-import pandas as pd
+# مسار الخدمة خفيف: PyTorch و NumPy فقط عند بدء التشغيل. pandas (قراءة CSV) و sklearn (نماذج gbm)
+# تُستورد عند الحاجة فقط، والتحجيم بمحجم NumPy من حزمة inference (انظر benchmark_startup.py)
+
+import os
+import glob
 import json
+import time
+from datetime import datetime
+import numpy as np
 import torch
 from pretrain.gru import GRU
 from pretrain.lstm import LSTM
-from sklearn.preprocessing import MinMaxScaler
+from pretrain.lstm_horizon import LSTMHorizon
+from pretrain.student import build_student
+from inference.scaling import MinMaxScaler
+from metrics import PREDICTION_STAGE_SECONDS
+from model_registry import load_scalers
+from weights_store import load_into, load_weights
 import warnings
 
 # تجاهل التحذيرات غير الهامة
@@ -14,9 +26,36 @@ warnings.filterwarnings("ignore")
 # تحديد الجهاز (سيكون 'cpu' في بيئة Docker التي أنشأناها)
 DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
-def load_prediction_assets(config_path, features_path, model_path, model_type, valid_data_path, target_coin):
+def find_latest_file(directory, coin, prefix, suffix):
+    """
+    تبحث هذه الدالة في مجلد معين عن أحدث ملف يطابق نمطًا محددًا.
+    """
+    search_pattern = os.path.join(directory, f"{prefix}{coin}_*{suffix}")
+    files = glob.glob(search_pattern)
+    if not files:
+        return None
+
+    latest_file = None
+    latest_date = None
+
+    for file_path in files:
+        filename = os.path.basename(file_path)
+        try:
+            date_str = filename.replace(f"{prefix}{coin}_", "").replace(suffix, "")
+            current_date = datetime.strptime(date_str, '%d%m%Y')
+            if latest_date is None or current_date > latest_date:
+                latest_date = current_date
+                latest_file = file_path
+        except ValueError:
+            print(f"WARNING: Ignoring file with incorrect date format: {filename}")
+            continue
+    return latest_file
+
+def load_prediction_assets(config_path, features_path, model_path, model_type, valid_data_path, target_coin, horizon_model_path=None, scaler_path=None):
     """
     تحميل جميع الأصول اللازمة للتنبؤ مرة واحدة عند بدء تشغيل الخادم.
+    horizon_model_path (اختياري): نموذج LSTMHorizon يعيد مسار عدة خطوات مستقبلية بتمرير أمامي واحد.
+    scaler_path (اختياري): ملف المحجمات المحفوظ مع النموذج في السجل (model_registry)، يغني عن قراءة ملف البيانات.
     """
     print("Loading prediction assets...")
     
@@ -25,54 +64,126 @@ def load_prediction_assets(config_path, features_path, model_path, model_type, v
     with open(features_path) as f: features = json.load(f)['features']
     
     # تحميل النموذج
-    model_class = LSTM if model_type.lower() == 'lstm' else GRU
-    model = model_class(
-        n_features=len(features),
-        hidden_units=config['hidden_units'],
-        n_layers=config['n_layers'],
-    )
-    model.load_state_dict(torch.load(model_path, map_location=DEVICE))
-    model.to(DEVICE)
-    model.eval()  # وضع النموذج في وضع التقييم (مهم جداً)
+    if model_type.lower() == 'gbm':
+        # نموذج الأشجار (joblib) يحمل قائمة ميزاته ويعمل على القيم الخام
+        from pretrain.gbm import LaggedGBM
+        model = LaggedGBM.load(model_path)
+        if model.features != features:
+            raise ValueError("ميزات نموذج GBM لا تطابق ملف الميزات features.json")
+    elif model_type.lower() == 'student':
+        # نموذج الطالب المقطّر (distill.py): بنيته (GRU بطبقة واحدة أو TCN) موصوفة في config_student.json
+        model = build_student(config, len(features))
+        load_into(model, model_path)
+        model.to(DEVICE)
+        model.eval()
+    else:
+        model_class = LSTM if model_type.lower() == 'lstm' else GRU
+        model = model_class(
+            n_features=len(features),
+            hidden_units=config['hidden_units'],
+            n_layers=config['n_layers'],
+        )
+        # الأوزان تُقرأ من الملف بالتعيين في الذاكرة (mmap) دون نسخ (weights_store)
+        load_into(model, model_path)
+        model.to(DEVICE)
+        model.eval()  # وضع النموذج في وضع التقييم (مهم جداً)
+
+    # تحميل نموذج الآفاق المتعددة إن وجد (عدد الخطوات يُستنتج من أبعاد الطبقة الخطية)
+    horizon_model = None
+    if horizon_model_path:
+        horizon_state, zero_copy = load_weights(horizon_model_path)
+        horizon_model = LSTMHorizon(
+            n_features=len(features),
+            hidden_units=config['hidden_units'],
+            n_layers=config['n_layers'],
+            horizon=horizon_state['linear.weight'].shape[0],
+        )
+        horizon_model.load_state_dict(horizon_state, assign=zero_copy)
+        horizon_model.to(DEVICE)
+        horizon_model.eval()
     
-    # تحميل بيانات التحقق لتهيئة المحجمات (Scalers)
-    valid_df = pd.read_csv(valid_data_path, index_col='Date', parse_dates=True)
     target_col_name = f"{target_coin.lower()}_avg_ohlc"
-    
-    # التأكد من وجود كل الأعمدة قبل تهيئة المحجمات
     all_required_cols = features + [target_col_name]
-    if not all(col in valid_df.columns for col in all_required_cols):
-        missing_cols = set(all_required_cols) - set(valid_df.columns)
-        raise ValueError(f"ملف بيانات التحقق 'valid.csv' تنقصه الأعمدة التالية: {missing_cols}")
 
-    # تهيئة المحجمات
-    main_scaler = MinMaxScaler().fit(valid_df[all_required_cols])
-    target_only_scaler = MinMaxScaler().fit(valid_df[[target_col_name]])
+    if scaler_path:
+        # المحجمات المحفوظة وقت التدريب (نفس المعاملات التي كانت ستُحسب من ملف البيانات)
+        main_scaler, target_only_scaler = load_scalers(scaler_path, all_required_cols)
+    else:
+        # تحميل بيانات التحقق لتهيئة المحجمات (Scalers)
+        import pandas as pd
+        valid_df = pd.read_csv(valid_data_path, index_col='Date', parse_dates=True)
+
+        # التأكد من وجود كل الأعمدة قبل تهيئة المحجمات
+        if not all(col in valid_df.columns for col in all_required_cols):
+            missing_cols = set(all_required_cols) - set(valid_df.columns)
+            raise ValueError(f"ملف بيانات التحقق 'valid.csv' تنقصه الأعمدة التالية: {missing_cols}")
+
+        # تهيئة المحجمات
+        main_scaler = MinMaxScaler().fit(valid_df[all_required_cols].to_numpy())
+        target_only_scaler = MinMaxScaler().fit(valid_df[[target_col_name]].to_numpy())
     
     print("Assets loaded successfully.")
     
     # إرجاع قاموس يحتوي على كل الأصول المحملة
     return {
         "model": model,
+        "model_type": model_type.lower(),
         "config": config,
         "features": features,
         "main_scaler": main_scaler,
         "target_only_scaler": target_only_scaler,
-        "target_col_name": target_col_name
+        "target_col_name": target_col_name,
+        "coin": target_coin.lower(),
+        "horizon_model": horizon_model,
+        "max_horizon": horizon_model.horizon if horizon_model is not None else 1
     }
 
-def make_prediction(assets, input_data):
+def warm_up(assets, passes=3, sequence_length=None):
+    """
+    تمريرات أمامية تركيبية بأشكال الطلبات الفعلية (دفعة واحدة × sequence_length × عدد الميزات) لكل نموذج محمّل،
+    حتى لا يدفع أول طلب حقيقي كلفة التهيئة الكسولة للنوى وتوسيع الذاكرة.
+    تعيد زمن كل تمريرة بالثواني.
+    """
+    features = assets['features']
+    sequence_length = sequence_length or assets['config'].get('sequence_length', 60)
+    # قيم في منتصف نطاق المحجم: مدخلات واقعية بعد التحجيم (≈0.5) دون الحاجة إلى بيانات حقيقية
+    scaler = assets['main_scaler']
+    raw = np.tile(scaler.data_min_[:len(features)] + scaler.data_range_[:len(features)] / 2, (sequence_length, 1))
+
+    timings = []
+    for _ in range(passes):
+        started = time.perf_counter()
+        if assets.get('model_type') == 'gbm':
+            assets['model'].predict_window(raw[-assets['model'].min_rows:].astype(np.float32))
+        else:
+            scaled = raw * scaler.scale_[:len(features)] + scaler.min_[:len(features)]
+            x = torch.tensor(scaled, dtype=torch.float).unsqueeze(0).to(DEVICE)
+            with torch.no_grad():
+                for model in (assets['model'], assets.get('horizon_model')):
+                    if model is not None:
+                        y = model(x).cpu().numpy().reshape(-1, 1)
+                        assets['target_only_scaler'].inverse_transform(y)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def make_prediction(assets, input_data, horizon=1):
     """
     تقوم بعملية التنبؤ بناءً على بيانات التسلسل التي يتم إرسالها مباشرة في الطلب.
+    مع horizon > 1 تعيد قائمة بقيم المسار كاملاً من تمرير أمامي واحد لنموذج الآفاق المتعددة.
     """
     # نضع كل الكود في كتلة try واحدة لمعالجة أي خطأ بشكل آمن
     try:
         # --- 1. استخراج الأصول اللازمة ---
-        model = assets['model']
+        if horizon == 1:
+            model = assets['model']
+        elif assets.get('horizon_model') is not None and horizon <= assets['max_horizon']:
+            model = assets['horizon_model']
+        else:
+            raise ValueError(f"الأفق المطلوب ({horizon}) غير مدعوم، الحد الأقصى هو {assets.get('max_horizon', 1)}.")
         features = assets['features']
         main_scaler = assets['main_scaler']
         target_only_scaler = assets['target_only_scaler']
-        target_col_name = assets['target_col_name']
+        coin = assets.get('coin', 'unknown')
 
         # --- 2. التحقق من هيكل الطلب الأساسي ---
         if 'sequence' not in input_data or not isinstance(input_data['sequence'], list) or not input_data['sequence']:
@@ -80,39 +191,49 @@ def make_prediction(assets, input_data):
 
         input_sequence = input_data['sequence']
 
-        # --- 3. تحويل البيانات المدخلة إلى DataFrame والتحقق من الميزات ---
-        input_df = pd.DataFrame(input_sequence)
-        
-        required_features = set(features)
-        provided_features = set(input_df.columns)
-        
-        if not required_features.issubset(provided_features):
-            missing = sorted(list(required_features - provided_features))
-            error_message = f"التسلسل المرسل تنقصه الميزات المطلوبة: {missing}"
-            raise ValueError(error_message)
+        # --- 3. تحويل البيانات المدخلة إلى مصفوفة [خطوات، ميزات] بترتيب features.json والتحقق من الميزات ---
+        # (اسم المرحلة build_dataframe باقٍ كما هو للحفاظ على استمرارية المقاييس)
+        with PREDICTION_STAGE_SECONDS.time(coin=coin, stage='build_dataframe'):
+            if not all(isinstance(row, dict) for row in input_sequence):
+                raise ValueError("كل عنصر في 'sequence' يجب أن يكون كائناً يحتوي على قيم الميزات.")
+
+            required_features = set(features)
+            provided_features = set().union(*input_sequence)
+
+            if not required_features.issubset(provided_features):
+                missing = sorted(list(required_features - provided_features))
+                error_message = f"التسلسل المرسل تنقصه الميزات المطلوبة: {missing}"
+                raise ValueError(error_message)
+
+            input_values = np.array([[row.get(f, np.nan) for f in features] for row in input_sequence], dtype=np.float64)
+
+        # نموذج الأشجار: متجه التأخيرات من القيم الخام مباشرة دون تحجيم أو عكس تحجيم
+        if assets.get('model_type') == 'gbm':
+            if len(input_values) < model.min_rows:
+                raise ValueError(f"التسلسل المرسل يجب أن يحتوي على {model.min_rows} صفاً على الأقل.")
+            with PREDICTION_STAGE_SECONDS.time(coin=coin, stage='forward'):
+                return model.predict_window(input_values.astype(np.float32))
 
         # --- 4. تحجيم (Scale) بيانات الإدخال ---
-        # نستخدم .copy() لتجنب التحذيرات، ونرتب الأعمدة لضمان تطابقها مع المحجم
-        sequence_for_scaling = input_df[features].copy()
-        sequence_for_scaling.loc[:, target_col_name] = 0
-        
-        # التأكد من أن ترتيب الأعمدة مطابق تماماً لما تم تدريب المحجم عليه
-        ordered_columns = features + [target_col_name]
-        sequence_for_scaling = sequence_for_scaling[ordered_columns]
-        
-        scaled_sequence = main_scaler.transform(sequence_for_scaling)[:, :len(features)]
+        with PREDICTION_STAGE_SECONDS.time(coin=coin, stage='scale'):
+            # المحجم الرئيسي مُهيّأ على الميزات ثم عمود الهدف؛ أعمدة الميزات فقط هي مدخلات النموذج
+            n_features = len(features)
+            scaled_sequence = input_values * main_scaler.scale_[:n_features] + main_scaler.min_[:n_features]
 
         # --- 5. إجراء التنبؤ ---
-        with torch.no_grad():
+        with PREDICTION_STAGE_SECONDS.time(coin=coin, stage='forward'), torch.no_grad():
             input_tensor = torch.tensor(scaled_sequence, dtype=torch.float).unsqueeze(0).to(next(model.parameters()).device)
             y_hat = model(input_tensor)
 
         # --- 6. عكس التحجيم (Inverse Scale) ---
-        prediction_scaled = y_hat.cpu().numpy().flatten()
-        final_forecast = target_only_scaler.inverse_transform(prediction_scaled.reshape(-1, 1)).flatten()
+        with PREDICTION_STAGE_SECONDS.time(coin=coin, stage='inverse_transform'):
+            prediction_scaled = y_hat.cpu().numpy().flatten()[:horizon]
+            final_forecast = target_only_scaler.inverse_transform(prediction_scaled.reshape(-1, 1)).flatten()
 
         # --- 7. إرجاع النتيجة النهائية ---
-        return float(final_forecast[0])
+        if horizon == 1:
+            return float(final_forecast[0])
+        return [float(v) for v in final_forecast]
 
     except Exception as e:
         # التقاط أي خطأ يحدث في أي خطوة أعلاه وطباعته في سجل الخادم
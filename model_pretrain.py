@@ -17,33 +17,67 @@ import pytorch_lightning as pl
 from pytorch_lightning.callbacks import EarlyStopping
 from pretrain.gru import GRU
 from pretrain.lstm import LSTM
+from pretrain.lstm_horizon import LSTMHorizon
+from pretrain.forecaster import Forecaster, StreamingForecaster
+from pretrain.gbm import LaggedGBM, DEFAULT_LAGS
+from split_store import split_columns, read_frame
+from weights_store import export_weights
 import warnings
 
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 class StockDataset(Dataset):
-    """Custom PyTorch Dataset for creating sequences."""
-    def __init__(self, data, target_col, feature_cols, sequence_length):
+    """
+    Custom PyTorch Dataset for creating sequences.
+    With horizon > 1 the label is the trajectory of the next `horizon` rows after the window (t+1 .. t+H).
+    """
+    def __init__(self, data, target_col, feature_cols, sequence_length, horizon=1, label_offset=None):
         self.features = data[feature_cols].values
         self.target = data[target_col].values
         self.sequence_length = sequence_length
+        self.horizon = horizon
+        # A trajectory starts on the row after the window; horizon 1 keeps the label on the window's last row
+        # unless label_offset=1 asks for the next-day label of train_worker.create_sequences
+        self.label_offset = (1 if horizon > 1 else 0) if label_offset is None else label_offset
 
     def __len__(self):
-        return self.target.shape[0] - self.sequence_length + 1
+        return max(0, self.target.shape[0] - self.sequence_length - self.horizon - self.label_offset + 2)
 
     def __getitem__(self, index):
         features_sequence = self.features[index:index + self.sequence_length]
-        target_value = self.target[index + self.sequence_length - 1]
+        first = index + self.sequence_length - 1 + self.label_offset
+        if self.horizon == 1:
+            target_value = self.target[first]
+        else:
+            target_value = self.target[first:first + self.horizon]
         return torch.tensor(features_sequence, dtype=torch.float), torch.tensor(target_value, dtype=torch.float)
 
+class StreamingDataset(StockDataset):
+    """
+    Windows of sequence_length + resync_every rows whose output at each of the last resync_every + 1 rows is
+    labelled with the next row's target (the next-day target of the served train_worker models), for
+    StreamingForecaster (models served by the stateful predictor of streaming.py).
+    """
+    def __init__(self, data, target_col, feature_cols, sequence_length, resync_every):
+        super(StreamingDataset, self).__init__(data, target_col, feature_cols, sequence_length + resync_every,
+                                               label_offset=1)
+        self.n_outputs = resync_every + 1
+
+    def __getitem__(self, index):
+        end = index + self.sequence_length
+        return (torch.tensor(self.features[index:end], dtype=torch.float),
+                torch.tensor(self.target[end - self.n_outputs + 1:end + 1], dtype=torch.float))
+
 def main():
     parser = argparse.ArgumentParser(description='Pretrain ML models for crypto-coins forecast')
-    parser.add_argument('--train', type=str, required=True, help='Path to the CSV training dataset.')
-    parser.add_argument('--valid', type=str, required=True, help='Path to the CSV validation dataset.')
+    parser.add_argument('--train', type=str, required=True, help='Path to the training split (CSV or binary split written by data_split).')
+    parser.add_argument('--valid', type=str, required=True, help='Path to the validation split (CSV or binary split written by data_split).')
     parser.add_argument('--target', type=str, required=True, help='Target coin to predict (e.g., BTC).')
     parser.add_argument('--features', type=str, required=True, help='Path to JSON file with feature list.')
-    parser.add_argument('--model', type=str, required=True, help='Model to train (lstm or gru).')
+    parser.add_argument('--model', type=str, required=True, help='Model to train (lstm, gru, lstm_horizon or gbm).')
+    parser.add_argument('--horizon', type=int, default=7, help='Number of future steps predicted by lstm_horizon.')
+    parser.add_argument('--stream_resync', type=int, default=0, help='Train an lstm for streaming inference with a full-window resync every N steps (0: off).')
     parser.add_argument('--config', type=str, required=True, help='Path to JSON file with config for pretraining.')
     parser.add_argument('--path', type=str, default=os.getcwd(), help='Path for saving the pretrained model.')
     parser.add_argument('--filename', type=str, help='Filename for the model.')
@@ -63,51 +97,82 @@ def main():
         with open(args.config) as f: config = json.load(f)
         with open(args.features) as f: features = json.load(f)['features']
         
-        train_df = pd.read_csv(args.train, index_col='Date', parse_dates=True)
-        valid_df = pd.read_csv(args.valid, index_col='Date', parse_dates=True)
-
+        available_columns = split_columns(args.train)
         target_col_name = f"{args.target.lower()}_avg_ohlc"
 
         if target_col_name in features:
             raise ValueError("Invalid data format: Target column cannot be in the features list.")
         
-        if target_col_name not in train_df.columns:
+        if target_col_name not in available_columns:
             raise ValueError(f"Target column '{target_col_name}' not found in the dataset.")
 
-        missing_features = [f for f in features if f not in train_df.columns]
+        missing_features = [f for f in features if f not in available_columns]
         if missing_features:
             raise ValueError(f"The following features are not in the dataset: {missing_features}")
 
+        # Only the features.json columns are read (memory-mapped float32 when data_split wrote a binary split)
         target_and_features = features + [target_col_name]
-        train_subset = train_df[target_and_features]
-        valid_subset = valid_df[target_and_features]
+        train_subset = read_frame(args.train, target_and_features)
+        valid_subset = read_frame(args.valid, target_and_features)
         
+        model_type = args.model.lower()
+        if model_type not in ['gru', 'lstm', 'lstm_horizon', 'gbm']:
+            raise ValueError("Invalid model type. Choose 'gru', 'lstm', 'lstm_horizon' or 'gbm'.")
+
+        # أشجار التعزيز تعمل على القيم الخام (لا تحتاج تحجيماً) وتُحفظ بصيغة joblib
+        if model_type == 'gbm':
+            gbm = LaggedGBM(
+                features, target_col_name,
+                lags=config.get('lags', DEFAULT_LAGS),
+                reference_feature=config.get('reference_feature'),
+                n_trees=config['n_trees'],
+                learning_rate=config['learning_rate'],
+                patience=config.get('patience'),
+                max_leaf_nodes=config.get('max_leaf_nodes', 31),
+                seed=config['seed'],
+            )
+            print(f"\nStarting training for GBM model ({len(gbm.lags)} lags x {len(features)} features)...")
+            gbm.fit(train_subset)
+            valid_mae = abs(gbm.predict(valid_subset[features])[:-1] - valid_subset[target_col_name].values[gbm.lags[-1] + 1:]).mean()
+            print(f"GBM trained with {gbm.model.n_iter_} trees, validation MAE: {valid_mae:.6f}")
+
+            output_path = os.path.join(args.path, 'models', args.filename + '.joblib')
+            gbm.save(output_path)
+            print(f"\nTraining complete. Model saved to: {output_path}")
+            return
+
         scaler = MinMaxScaler()
         train_scaled = pd.DataFrame(scaler.fit_transform(train_subset), index=train_subset.index, columns=train_subset.columns)
         valid_scaled = pd.DataFrame(scaler.transform(valid_subset), index=valid_subset.index, columns=valid_subset.columns)
 
-        model_type = args.model.lower()
-        if model_type not in ['gru', 'lstm']:
-            raise ValueError("Invalid model type. Choose 'gru' or 'lstm'.")
+        horizon = args.horizon if model_type == 'lstm_horizon' else 1
+        if args.stream_resync and model_type != 'lstm':
+            raise ValueError("--stream_resync is only supported for the 'lstm' model.")
             
         pl.seed_everything(config['seed'])
         
         sequence_length = config.get('sequence_length', 60)
-        train_dataset = StockDataset(train_scaled, target_col=target_col_name, feature_cols=features, sequence_length=sequence_length)
-        validation_dataset = StockDataset(valid_scaled, target_col=target_col_name, feature_cols=features, sequence_length=sequence_length)
+        if args.stream_resync:
+            train_dataset = StreamingDataset(train_scaled, target_col_name, features, sequence_length, args.stream_resync)
+            validation_dataset = StreamingDataset(valid_scaled, target_col_name, features, sequence_length, args.stream_resync)
+        else:
+            train_dataset = StockDataset(train_scaled, target_col=target_col_name, feature_cols=features, sequence_length=sequence_length, horizon=horizon)
+            validation_dataset = StockDataset(valid_scaled, target_col=target_col_name, feature_cols=features, sequence_length=sequence_length, horizon=horizon)
 
         train_loader = DataLoader(train_dataset, batch_size=config['batch_size'], num_workers=config['num_workers'], shuffle=True)
         validation_loader = DataLoader(validation_dataset, batch_size=config['batch_size'], num_workers=config['num_workers'])
 
         early_stopping = EarlyStopping('val_loss', patience=config['patience'])
         
-        model_class = LSTM if model_type == 'lstm' else GRU
-        model = model_class(
-            n_features=len(features),
-            hidden_units=config['hidden_units'],
-            n_layers=config['n_layers'],
-            lr=config['learning_rate']
-        )
+        model_kwargs = dict(n_features=len(features), hidden_units=config['hidden_units'], n_layers=config['n_layers'])
+        if model_type == 'lstm_horizon':
+            network = LSTMHorizon(horizon=horizon, **model_kwargs)
+        else:
+            network = (LSTM if model_type == 'lstm' else GRU)(**model_kwargs)
+        if args.stream_resync:
+            model = StreamingForecaster(network, lr=config['learning_rate'], resync_every=args.stream_resync)
+        else:
+            model = Forecaster(network, lr=config['learning_rate'])
         
         # --- الشرح: تم تعديل هذا الجزء لحل المشكلة ---
         trainer = pl.Trainer(
@@ -121,7 +186,8 @@ def main():
         trainer.fit(model, train_loader, validation_loader)
         
         output_path = os.path.join(args.path, 'models', args.filename + '.pth')
-        torch.save(model.state_dict(), output_path)
+        # حفظ أوزان النموذج الداخلي فقط حتى يطابق ما يحمّله الخادم (مع ملف جانبي فيه البصمة sha256)
+        export_weights(model.model.state_dict(), output_path)
         print(f"\nTraining complete. Model saved to: {output_path}")
 
     except Exception as e:
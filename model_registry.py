@@ -0,0 +1,155 @@
+"""
+File: model_registry.py
+Description: Registry index of trained models: coin -> version -> artifacts, written by the trainer, read by serving.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+registry.json (next to the models by default) holds, for every coin, the versions registered by
+train_worker.py and which one is current per model type:
+
+    {"format_version": 1, "updated_at": ..., "coins": {"btc": {
+        "current": {"lstm": "lstm_btc_19102026"},
+        "versions": {"lstm_btc_19102026": {"model_type", "model_path", "data_path", "scaler_path",
+                                           "horizon_model_path", "checksum", "features_hash", "n_features",
+                                           "metrics", "created_at"}}}}}
+
+Artifact paths are stored relative to the registry file, so a copied or remounted disk keeps working.
+The file is replaced atomically (temp file + rename): the API and the worker share the disk. Serving resolves
+a coin with two dict lookups; directory scanning (find_latest_file) is only the fallback for coins that
+have no registry entry yet.
+
+The scaler sidecar is a small JSON of the fitted MinMax parameters, so serving does not have to read the
+whole data CSV at startup to refit them. It is read back into the NumPy scaler of inference/scaling.py.
+"""
+
+# Imports
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from inference.scaling import MinMaxScaler
+
+REGISTRY_PATH = os.environ.get('REGISTRY_PATH')
+FORMAT_VERSION = 1
+
+
+def registry_path(models_dir):
+    return REGISTRY_PATH or os.path.join(models_dir, 'registry.json')
+
+
+def features_hash(features):
+    """Short hash of the ordered feature list a model was trained on."""
+    return hashlib.sha256(json.dumps(list(features)).encode()).hexdigest()[:16]
+
+
+def load_registry(path):
+    if not os.path.exists(path):
+        return {'format_version': FORMAT_VERSION, 'coins': {}}
+    with open(path) as f:
+        registry = json.load(f)
+    if registry.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported registry format {registry.get('format_version')} in {path}")
+    return registry
+
+
+def _write_registry(registry, path):
+    registry['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(registry, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def register_version(path, coin, version, model_type, model_path, data_path, features, scaler_path=None,
+                     horizon_model_path=None, metrics=None, checksum=None, make_current=True):
+    """Add (or replace) a version of a coin's model and, by default, make it the current one for its type."""
+    base = os.path.dirname(os.path.abspath(path))
+    relative = lambda p: os.path.relpath(os.path.abspath(p), base) if p else None
+
+    registry = load_registry(path)
+    entry = registry['coins'].setdefault(coin.lower(), {'current': {}, 'versions': {}})
+    entry['versions'][version] = {
+        'model_type': model_type.lower(),
+        'model_path': relative(model_path),
+        'data_path': relative(data_path),
+        'scaler_path': relative(scaler_path),
+        'horizon_model_path': relative(horizon_model_path),
+        'checksum': checksum,
+        'features_hash': features_hash(features),
+        'n_features': len(features),
+        'metrics': metrics or {},
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    if make_current:
+        entry['current'][model_type.lower()] = version
+    _write_registry(registry, path)
+    return entry['versions'][version]
+
+
+def resolve(registry, path, coin, model_type):
+    """Current version of a coin for a model type, with absolute artifact paths, or None."""
+    entry = registry['coins'].get(coin.lower())
+    version = entry and entry['current'].get(model_type.lower())
+    if not version:
+        return None
+    base = os.path.dirname(os.path.abspath(path))
+    record = dict(entry['versions'][version], version=version)
+    for key in ('model_path', 'data_path', 'scaler_path', 'horizon_model_path'):
+        if record.get(key):
+            record[key] = os.path.normpath(os.path.join(base, record[key]))
+    return record
+
+
+def resolve_artifacts(coin, model_type, models_dir, data_dir, registry=None, suffix='.pth'):
+    """
+    Artifacts to serve for a coin: from the registry when it has the coin, otherwise the newest files found by
+    find_latest_file (models trained before the registry existed, or by model_pretrain.py).
+    Horizon models are not trained by the cron job, so a registry record without one still gets the newest
+    lstm_horizon_<coin>_<date>.pth on disk.
+    """
+    from model_forecast import find_latest_file
+
+    def latest_horizon_model():
+        return find_latest_file(models_dir, coin, f"{model_type}_horizon_", ".pth") if model_type == 'lstm' else None
+
+    path = registry_path(models_dir)
+    if registry is None:
+        registry = load_registry(path)
+    record = resolve(registry, path, coin, model_type)
+    if record is not None:
+        record['source'] = 'registry'
+        if not record.get('horizon_model_path'):
+            record['horizon_model_path'] = latest_horizon_model()
+        return record
+
+    model_path = find_latest_file(models_dir, coin, f"{model_type}_", suffix)
+    horizon_model_path = latest_horizon_model()
+    return {
+        'version': os.path.splitext(os.path.basename(model_path))[0] if model_path else None,
+        'model_type': model_type, 'model_path': model_path,
+        'data_path': find_latest_file(data_dir, coin, "", ".csv"), 'scaler_path': None,
+        'horizon_model_path': horizon_model_path, 'features_hash': None, 'metrics': {}, 'source': 'scan',
+    }
+
+
+def save_scalers(path, main_scaler, target_scaler, columns):
+    """JSON sidecar with the fitted MinMax parameters of the main (features + target) and target scalers.
+    `columns` is features + [target column], the order the main scaler was fitted on."""
+    def params(scaler):
+        return {k: getattr(scaler, k).tolist() for k in ('min_', 'scale_', 'data_min_', 'data_max_', 'data_range_')}
+    with open(path, 'w') as f:
+        json.dump({'columns': list(columns), 'main': params(main_scaler), 'target': params(target_scaler)}, f)
+
+
+def load_scalers(path, columns):
+    """(main_scaler, target_scaler) rebuilt from a sidecar; the column order must match the one it was saved with."""
+    with open(path) as f:
+        sidecar = json.load(f)
+    if sidecar['columns'] != list(columns):
+        raise ValueError(f"Scaler sidecar {path} was fitted on different columns")
+
+    return MinMaxScaler.from_params(sidecar['main']), MinMaxScaler.from_params(sidecar['target'])
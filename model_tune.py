@@ -15,6 +15,7 @@ from pretrain.lstm_tuned import LSTMTuned
 from pretrain.datasets import DatasetV1
 #from pretrain.datasets import Dataset  # بدلاً من DatasetV1
 import bentoml
+from split_store import split_columns, read_frame
 
 warnings.filterwarnings("ignore")
 
@@ -31,8 +32,6 @@ def parse_arguments():
 def load_and_preprocess_data(train_path, valid_path, features_path, target_symbol):
     """تحميل البيانات ومعالجتها."""
     print("جاري تحميل ومعالجة البيانات...")
-    train_df = pd.read_csv(train_path, index_col='Date', parse_dates=True)
-    valid_df = pd.read_csv(valid_path, index_col='Date', parse_dates=True)
     with open(features_path, 'r') as f:
         features = json.load(f)['features']
 
@@ -47,12 +46,14 @@ def load_and_preprocess_data(train_path, valid_path, features_path, target_symbo
     target_and_features = features + [target_col_name]
     
     # التأكد من وجود جميع الأعمدة قبل المتابعة
-    missing_cols = [col for col in target_and_features if col not in train_df.columns]
+    available_columns = split_columns(train_path)
+    missing_cols = [col for col in target_and_features if col not in available_columns]
     if missing_cols:
         raise KeyError(f"الأعمدة التالية غير موجودة في البيانات: {missing_cols}")
 
-    train_subset = train_df[target_and_features]
-    valid_subset = valid_df[target_and_features]
+    # قراءة أعمدة الميزات والهدف فقط (من الملف الثنائي المعيّن في الذاكرة إن وُجد)
+    train_subset = read_frame(train_path, target_and_features)
+    valid_subset = read_frame(valid_path, target_and_features)
 
     scaler = MinMaxScaler()
     train_scaled = pd.DataFrame(scaler.fit_transform(train_subset), index=train_subset.index, columns=train_subset.columns)
@@ -0,0 +1,108 @@
+# precompute_forecasts.py
+# يحسب التنبؤ التالي لكل عملة من آخر نافذة ميزات محفوظة ويخزنه في ملف صغير مفهرس حسب العملة،
+# ليقدمه الـ API مباشرة عبر GET /forecast/<coin> دون تشغيل النموذج.
+# يتم استدعاؤه تلقائياً في نهاية train_worker.py ويمكن تشغيله كمهمة يومية مستقلة.
+# مع --streaming يُحفظ حالة LSTM لكل عملة بين التشغيلات ويتقدم النموذج بخطوة زمنية واحدة لكل يوم جديد
+# (streaming.py)، مع إعادة مزامنة من نافذة كاملة كل --resync_every خطوة.
+# يصلح وضع البث لنماذج LSTM فقط (تنبؤ اليوم التالي): نماذج train_worker المسجلة تعمل لكنها دُرّبت على نوافذ 60 صفاً
+# من حالة صفرية، والنماذج المدربة بـ model_pretrain.py --stream_resync N مدربة على هذا النمط تحديداً فتنحرف أقل.
+
+import os
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+from model_forecast import load_prediction_assets, make_prediction
+from model_registry import resolve_artifacts
+from forecast_store import write_forecasts, FORECASTS_PATH
+from streaming import StreamingPredictor, DEFAULT_RESYNC_EVERY
+
+MODELS_DIR = os.environ.get('MODELS_DIR', '/data/models')
+DATA_DIR = os.environ.get('DATA_DIR', '/data/data')
+STATE_DIR = os.path.join(os.path.dirname(FORECASTS_PATH), 'stream_state')
+CONFIG_PATH = 'config/config_nn.json'
+FEATURES_PATH = 'config/features.json'
+MODEL_TYPE = 'lstm'
+SEQUENCE_LENGTH = 60
+
+COIN_LIST = [
+    'btc', 'eth', 'usdt', 'usdc', 'bnb', 'xrp', 'busd', 'ada',
+    'sol', 'doge', 'dot', 'dai', 'shib', 'trx', 'avax', 'uni',
+    'wbtc', 'leo', 'ltc'
+]
+
+
+def precompute_coin(coin, models_dir=MODELS_DIR, data_dir=DATA_DIR, state_dir=None, resync_every=DEFAULT_RESYNC_EVERY):
+    """
+    يحسب تنبؤ عملة واحدة بنفس مسار /predict تماماً (نفس الأصول ونفس make_prediction)
+    حتى تطابق النتيجة المخزنة ما كان سيعيده الـ API.
+    مع state_dir: وضع البث، تُحمّل حالة العملة المحفوظة ويتقدم النموذج بالأيام الجديدة فقط.
+    """
+    artifacts = resolve_artifacts(coin, MODEL_TYPE, models_dir, data_dir)
+    model_path, data_path = artifacts['model_path'], artifacts['data_path']
+    if not model_path or not data_path:
+        raise FileNotFoundError(f"Could not find model or data files for {coin.upper()}")
+
+    assets = load_prediction_assets(CONFIG_PATH, FEATURES_PATH, model_path, MODEL_TYPE, data_path, coin,
+                                    scaler_path=artifacts['scaler_path'])
+    sequence_length = assets['config'].get('sequence_length', SEQUENCE_LENGTH)
+
+    model_version = artifacts['version']
+
+    data_df = pd.read_csv(data_path, index_col='Date', parse_dates=True)
+    latest_window = data_df[assets['features']].tail(sequence_length)
+    if len(latest_window) < sequence_length:
+        raise ValueError(f"Not enough rows for {coin.upper()}: need {sequence_length}, found {len(latest_window)}")
+
+    record = {"coin": coin, "model_version": model_version, "data_file": os.path.basename(data_path),
+              "as_of": latest_window.index[-1].strftime('%Y-%m-%d')}
+    if state_dir:
+        predictor = StreamingPredictor(assets, model_version, resync_every, sequence_length)
+        state_path = os.path.join(state_dir, f"{coin}.npz")
+        predictor.load_state(state_path)
+        result = predictor.advance(data_df[assets['features']])
+        predictor.save_state(state_path)
+        record["prediction"] = result['prediction']
+        record["streaming"] = {k: result[k] for k in ('mode', 'steps_since_resync', 'drift')}
+    else:
+        record["prediction"] = make_prediction(assets, {"sequence": latest_window.to_dict(orient='records')})
+    record["generated_at"] = datetime.now().isoformat(timespec='seconds')
+    return record
+
+
+def precompute_all(coins=COIN_LIST, output_path=FORECASTS_PATH, models_dir=MODELS_DIR, data_dir=DATA_DIR,
+                   state_dir=None, resync_every=DEFAULT_RESYNC_EVERY):
+    print(f"--- حساب التنبؤات المسبقة لـ {len(coins)} عملة ---")
+    records = {}
+    for coin in coins:
+        try:
+            records[coin] = precompute_coin(coin, models_dir, data_dir, state_dir, resync_every)
+            print(f"  - {coin.upper()}: {records[coin]['prediction']} ({records[coin]['model_version']})")
+        except Exception as e:
+            print(f"  - ❌ تعذر حساب تنبؤ {coin.upper()}: {e}")
+
+    if records:
+        write_forecasts(records, output_path)
+        print(f"✅ تم حفظ {len(records)} تنبؤاً في: {output_path}")
+    else:
+        print("❌ لم يتم حساب أي تنبؤ، لم يتم تعديل الملف.")
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute next-step forecasts for every coin from the latest stored data.')
+    parser.add_argument('--coins', nargs='+', default=COIN_LIST, help='coins to precompute')
+    parser.add_argument('-o', '--output', type=str, default=FORECASTS_PATH, help='forecasts file')
+    parser.add_argument('--models_dir', type=str, default=MODELS_DIR)
+    parser.add_argument('--data_dir', type=str, default=DATA_DIR)
+    parser.add_argument('--streaming', action='store_true', help='advance a saved per-coin LSTM state by the new rows only (LSTM models only, see streaming.py)')
+    parser.add_argument('--state_dir', type=str, default=STATE_DIR, help='per-coin streaming states')
+    parser.add_argument('--resync_every', type=int, default=DEFAULT_RESYNC_EVERY, help='steps between full-window resyncs')
+    args = parser.parse_args()
+    precompute_all(args.coins, args.output, args.models_dir, args.data_dir,
+                   args.state_dir if args.streaming else None, args.resync_every)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+File: prediction_cache.py
+Description: Content-addressed LRU cache with TTL for /predict results.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Entries are keyed by (coin, model version, hash of the canonicalized sequence), so a new model version
+never sees predictions of the previous one. Concurrent requests for the same key wait for the single
+request that is already computing it instead of running the pipeline again.
+"""
+
+# Imports
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import counter
+
+CACHE_MAX_ENTRIES = int(os.environ.get('PREDICTION_CACHE_SIZE', '1024'))
+CACHE_TTL_SECONDS = float(os.environ.get('PREDICTION_CACHE_TTL', '3600'))
+
+CACHE_REQUESTS = counter(
+    'prediction_cache_requests_total', 'Prediction cache lookups by coin and result (hit, miss, coalesced).', ('coin', 'result'))
+
+
+def sequence_hash(input_data, features):
+    """
+    Hash of the sequence restricted to the model's features in their training order, so key order,
+    whitespace and extra fields in the request do not change the key. Returns None for malformed input,
+    which is then computed (and rejected) without touching the cache.
+    """
+    sequence = input_data.get('sequence') if isinstance(input_data, dict) else None
+    if not isinstance(sequence, list) or not sequence or not all(isinstance(row, dict) for row in sequence):
+        return None
+    canonical = json.dumps([[row.get(f) for f in features] for row in sequence], separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class _Pending:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PredictionCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._pending = {}              # key -> _Pending
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, or run compute() once for all concurrent callers."""
+        if key is None or not self.enabled:
+            return compute()
+
+        coin = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    CACHE_REQUESTS.inc(coin=coin, result='hit')
+                    return entry[1]
+                del self._entries[key]
+
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._pending[key] = _Pending()
+
+        if not leader:
+            CACHE_REQUESTS.inc(coin=coin, result='coalesced')
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        CACHE_REQUESTS.inc(coin=coin, result='miss')
+        try:
+            pending.value = compute()
+        except Exception as e:
+            # Failures are shared with the waiting requests but never cached
+            pending.error = e
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, pending.value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return pending.value
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.event.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+PREDICTION_CACHE = PredictionCache()
@@ -0,0 +1,164 @@
+"""
+File: prediction_log.py
+Description: Non-blocking prediction log: bounded queue, background batch writer, gzip JSONL with rotation.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+A /predict request only builds a small dict and puts it on a bounded in-memory queue (put_nowait). When the
+queue is full the record is dropped and counted, so a slow disk never shows up in request latency. One
+daemon thread per worker drains the queue in batches, serializes them to JSON lines and appends each batch to
+the current file as one gzip member (concatenated members are a valid .gz file, and a crash loses at most
+the batch in flight). Files rotate when the day changes or the file reaches PREDICTION_LOG_MAX_BYTES:
+
+    <dir>/predictions-<YYYYMMDD>-<pid>-<seq>.jsonl.gz
+
+The pid keeps gunicorn workers from writing to the same file. `read_log` streams the records back for
+backtests.
+"""
+
+# Imports
+import os
+import glob
+import gzip
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime, timezone
+
+from metrics import counter
+
+PREDICTION_LOG_DIR = os.environ.get('PREDICTION_LOG_DIR', '/data/logs/predictions')
+PREDICTION_LOG_ENABLED = os.environ.get('PREDICTION_LOG', '1') == '1'
+PREDICTION_LOG_INPUTS = os.environ.get('PREDICTION_LOG_INPUTS', '0') == '1'
+PREDICTION_LOG_QUEUE_SIZE = int(os.environ.get('PREDICTION_LOG_QUEUE_SIZE', '10000'))
+PREDICTION_LOG_MAX_BYTES = int(os.environ.get('PREDICTION_LOG_MAX_BYTES', str(64 * 1024 * 1024)))
+
+LOG_RECORDS = counter(
+    'prediction_log_records_total', 'Prediction log records by result (written, dropped, failed).', ('result',))
+
+
+class PredictionLog:
+    def __init__(self, directory=PREDICTION_LOG_DIR, queue_size=PREDICTION_LOG_QUEUE_SIZE, batch_size=500,
+                 flush_interval=1.0, max_bytes=PREDICTION_LOG_MAX_BYTES, compresslevel=6, enabled=True):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._file = None
+        self._file_day = None
+        self._sequence = 0
+
+    def log(self, record):
+        """Queue a record without blocking; returns False when it was dropped."""
+        if not self.enabled:
+            return False
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            LOG_RECORDS.inc(result='dropped')
+            return False
+
+    def _ensure_writer(self):
+        # Started lazily in the process that logs (gunicorn workers fork after import)
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='prediction-log', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            lines = ''.join(json.dumps(record, separators=(',', ':'), default=str) + '\n' for record in batch)
+            f = self._current_file()
+            f.write(gzip.compress(lines.encode('utf-8'), compresslevel=self.compresslevel))
+            f.flush()
+            LOG_RECORDS.inc(len(batch), result='written')
+        except Exception:
+            # The log must never take the service down; the batch is lost and counted
+            LOG_RECORDS.inc(len(batch), result='failed')
+            self._close_file()
+
+    def _current_file(self):
+        day = datetime.now(timezone.utc).strftime('%Y%m%d')
+        if self._file is not None and (day != self._file_day or self._file.tell() >= self.max_bytes):
+            self._close_file()
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            if day != self._file_day:
+                self._sequence = 0
+            while True:
+                path = os.path.join(self.directory, f"predictions-{day}-{os.getpid()}-{self._sequence:04d}.jsonl.gz")
+                self._sequence += 1
+                if not os.path.exists(path):
+                    break
+            self._file = open(path, 'ab')
+            self._file_day = day
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    def close(self, timeout=5.0):
+        """Write what is queued and stop the writer (registered with atexit)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._close_file()
+
+
+def read_log(directory=PREDICTION_LOG_DIR, pattern='predictions-*.jsonl.gz'):
+    """All logged records, file by file in name order (day, then worker and rotation)."""
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+PREDICTION_LOG = PredictionLog(enabled=PREDICTION_LOG_ENABLED)
+
+
+def log_prediction(coin, model_version, horizon, prediction, sequence_digest, latency_seconds, input_data=None,
+                   features=None):
+    """Build the record for one /predict response; the raw sequence is only kept with PREDICTION_LOG_INPUTS=1."""
+    record = {
+        'ts': time.time(), 'coin': coin, 'model_version': model_version, 'horizon': horizon,
+        'prediction': prediction, 'sequence_hash': sequence_digest, 'latency_ms': round(latency_seconds * 1000, 3),
+    }
+    if PREDICTION_LOG_INPUTS and input_data is not None:
+        record['sequence'] = [[row.get(f) for f in features] for row in input_data.get('sequence', [])]
+    return PREDICTION_LOG.log(record)
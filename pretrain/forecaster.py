@@ -0,0 +1,87 @@
+"""
+File: forecaster.py
+Description: Lightning training wrapper for the inference models in pretrain/.
+File Created: 19/10/2026
+Python Version: 3.9
+
+The models in lstm.py, gru.py and lstm_horizon.py are plain nn.Modules so serving does not need
+Lightning. Training wraps them here; `forecaster.model.state_dict()` is exactly what serving loads.
+Distiller trains a student on a mix of the true labels and a teacher's predictions (see distill.py).
+StreamingForecaster trains a model for the stateful predictor of streaming.py.
+"""
+
+# Imports
+import torch
+import torch.nn.functional as F
+import pytorch_lightning as pl
+
+
+class Forecaster(pl.LightningModule):
+    """
+    Constructor.
+    """
+    def __init__(self, model, lr=1e-3):
+        super(Forecaster, self).__init__()
+        self.model = model
+        self.lr = lr
+        self.save_hyperparameters(ignore=['model'])
+
+    # Forward Pass
+    def forward(self, x):
+        return self.model(x)
+
+    # Targets come as (batch,) for single-step models and (batch, horizon) for multi-horizon ones
+    def _loss(self, batch):
+        x, y = batch
+        y_hat = self(x)
+        return F.mse_loss(y_hat, y.view_as(y_hat))
+
+    # Training step
+    def training_step(self, train_batch, batch_idx):
+        loss = self._loss(train_batch)
+        self.log('train_loss', loss)
+        return loss
+
+    # Validation step
+    def validation_step(self, val_batch, batch_idx):
+        loss = self._loss(val_batch)
+        self.log('val_loss', loss)
+
+    # Optimizers
+    def configure_optimizers(self):
+        return torch.optim.Adam(self.parameters(), lr=self.lr)
+
+
+class Distiller(Forecaster):
+    """
+    Constructor. alpha weights the teacher term: 1.0 fits the teacher only, 0.0 the true labels only.
+    """
+    def __init__(self, model, lr=1e-3, alpha=0.7):
+        super(Distiller, self).__init__(model, lr)
+        self.alpha = alpha
+
+    # Training batches are (x, y, y_teacher); validation batches are plain (x, y), scored on the true labels
+    def training_step(self, train_batch, batch_idx):
+        x, y, y_teacher = train_batch
+        y_hat = self(x)
+        loss = (self.alpha * F.mse_loss(y_hat, y_teacher.view_as(y_hat))
+                + (1 - self.alpha) * F.mse_loss(y_hat, y.view_as(y_hat)))
+        self.log('train_loss', loss)
+        return loss
+
+
+class StreamingForecaster(Forecaster):
+    """
+    Constructor. Windows are sequence_length + resync_every rows long, run from a zero state, and the output at
+    each of the last resync_every + 1 steps is supervised with the next row's target. That is the range of history lengths the streaming
+    predictor runs on between two full-window resyncs, so single-step updates stay as accurate as a full window.
+    The model must provide forward_steps (see lstm.py).
+    """
+    def __init__(self, model, lr=1e-3, resync_every=30):
+        super(StreamingForecaster, self).__init__(model, lr)
+        self.n_outputs = resync_every + 1
+
+    # Forward Pass - (batch, n_outputs) predictions for the last n_outputs timesteps
+    def forward(self, x):
+        out, _ = self.model.forward_steps(x)
+        return out[:, -self.n_outputs:, 0]
@@ -0,0 +1,142 @@
+"""
+File: gbm.py
+Description: Histogram gradient-boosted trees on lagged, flattened feature windows.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+A sample is the window ending at row t: the feature rows t - lag for every lag in `lags` are flattened into one
+vector, and its label is the target of row t + 1 (the next day, as train_worker.create_sequences labels the
+served LSTMs; row t's indicators already see row t's price). Trees cannot extrapolate outside the price range
+seen in training, so the target is learned relative to the last value of a reference feature (by default the
+coin's 7-day SMA) and turned back into a price at prediction time. Features are used raw: trees do not need scaling.
+
+sklearn's predict() walks the trees one by one in Python, ~10us per tree for a single row. For serving, the
+fitted trees are flattened into node arrays once and a request row descends all trees together with vectorized
+steps (one per tree level). The flat path is checked against predict() when it is built and disabled if the
+fitted model has a layout it does not understand.
+"""
+
+# Imports
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+DEFAULT_LAGS = (0, 1, 2, 3, 6, 13, 29)
+
+
+class LaggedGBM:
+    """
+    Constructor.
+    """
+    def __init__(self, features, target_col, lags=DEFAULT_LAGS, reference_feature=None, n_trees=100,
+                 learning_rate=0.1, patience=None, max_leaf_nodes=31, seed=None):
+        self.features = list(features)
+        self.target_col = target_col
+        self.lags = tuple(sorted(lags))
+        if reference_feature is None:
+            reference_feature = target_col.replace('_avg_ohlc', '_sma7')
+        if reference_feature not in self.features:
+            raise ValueError(f"Reference feature '{reference_feature}' is not in the features list")
+        self.reference_feature = reference_feature
+        self._reference_index = self.features.index(reference_feature)
+        self.model = HistGradientBoostingRegressor(
+            max_iter=n_trees, learning_rate=learning_rate, max_leaf_nodes=max_leaf_nodes,
+            early_stopping=bool(patience), n_iter_no_change=patience or 10, random_state=seed,
+        )
+
+    @property
+    def min_rows(self):
+        """Rows a request sequence must have."""
+        return self.lags[-1] + 1
+
+    def lagged_matrix(self, values):
+        """[T, F] feature rows -> [T - max_lag, F * n_lags] samples, one per window end row max_lag .. T-1."""
+        values = np.asarray(values, dtype=np.float32)
+        n = values.shape[0] - self.lags[-1]
+        if n < 1:
+            raise ValueError(f"Need at least {self.min_rows} rows, got {values.shape[0]}")
+        end = np.arange(self.lags[-1], values.shape[0])
+        return np.concatenate([values[end - lag] for lag in self.lags], axis=1)
+
+    def _reference(self, values):
+        return np.asarray(values, dtype=np.float64)[self.lags[-1]:, self._reference_index]
+
+    def fit(self, frame):
+        """Fit on a Date-ordered frame holding the features and the target column (next-row labels)."""
+        values = frame[self.features].to_numpy(dtype=np.float32)
+        # The last window end row has no next day to learn from
+        reference = self._reference(values)[:-1]
+        target = frame[self.target_col].to_numpy(dtype=np.float64)[self.lags[-1] + 1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative = target / reference - 1.0
+        valid = np.isfinite(relative)
+        samples = self.lagged_matrix(values)[:-1][valid]
+        self.model.fit(samples, relative[valid])
+        self._compile(samples[-32:])
+        return self
+
+    def _compile(self, check_rows):
+        """Flatten every tree into shared node arrays for predict_window; keep it only if it matches predict()."""
+        self._flat = None
+        try:
+            nodes = [tree[0].nodes for tree in self.model._predictors]
+            baseline = float(np.ravel(self.model._baseline_prediction)[0])
+        except (AttributeError, IndexError, TypeError):
+            return
+        if any(n['is_categorical'].any() for n in nodes if 'is_categorical' in n.dtype.names):
+            return
+
+        offsets = np.cumsum([0] + [len(n) for n in nodes[:-1]])
+        shift = np.repeat(offsets, [len(n) for n in nodes])
+        flat = np.concatenate(nodes)
+        self._flat = {
+            'roots': offsets.astype(np.intp),
+            'feature': flat['feature_idx'].astype(np.intp),
+            'threshold': flat['num_threshold'].astype(np.float64),
+            'missing_left': flat['missing_go_to_left'].astype(bool),
+            'left': (flat['left'] + shift).astype(np.intp),
+            'right': (flat['right'] + shift).astype(np.intp),
+            'is_leaf': flat['is_leaf'].astype(bool),
+            'value': flat['value'].astype(np.float64),
+            'baseline': baseline,
+        }
+        expected = self.model.predict(check_rows)
+        actual = np.array([self._predict_row(row) for row in check_rows])
+        if not np.allclose(actual, expected, rtol=1e-9, atol=1e-12):
+            self._flat = None
+
+    def _predict_row(self, row):
+        """Relative prediction of one lagged row, descending all trees one level per step."""
+        flat = self._flat
+        row = np.asarray(row, dtype=np.float64)
+        index = flat['roots']
+        leaf = flat['is_leaf'][index]
+        while not leaf.all():
+            x = row[flat['feature'][index]]
+            go_left = np.where(np.isnan(x), flat['missing_left'][index], x <= flat['threshold'][index])
+            index = np.where(leaf, index, np.where(go_left, flat['left'][index], flat['right'][index]))
+            leaf = flat['is_leaf'][index]
+        return flat['baseline'] + flat['value'][index].sum()
+
+    def predict(self, values):
+        """Next-day price prediction for every window end row of a [T, F] feature array."""
+        relative = self.model.predict(self.lagged_matrix(values))
+        return self._reference(values) * (1.0 + relative)
+
+    def predict_window(self, values):
+        """Next-day prediction for a single request sequence ([seq, F], oldest row first)."""
+        values = np.asarray(values, dtype=np.float32)[-self.min_rows:]
+        if getattr(self, '_flat', None) is None:
+            return float(self.predict(values)[-1])
+        relative = self._predict_row(self.lagged_matrix(values)[-1])
+        return float(self._reference(values)[-1] * (1.0 + relative))
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        model = joblib.load(path)
+        if not isinstance(model, LaggedGBM):
+            raise ValueError(f"{path} does not contain a LaggedGBM model")
+        return model
@@ -44,5 +44,14 @@ class LSTM(nn.Module):
         out = self.linear(out[:, -1, :])
         return out
 
+    # Stateful pass for streaming inference: outputs at every timestep plus the final (h, c), which can be fed
+    # back to continue the sequence one new row at a time. Same weights and result as forward() on the last step.
+    def forward_steps(self, x, state=None):
+        if state is None:
+            h0 = torch.zeros(self.n_layers, x.size(0), self.hidden_units, device=x.device)
+            state = (h0, torch.zeros_like(h0))
+        out, state = self.lstm(x, state)
+        return self.linear(out), state
+
     # All training-related methods (training_step, validation_step, configure_optimizers, etc.)
     # have been removed as they are not needed for inference.
\ No newline at end of file
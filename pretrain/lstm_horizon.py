@@ -0,0 +1,43 @@
+"""
+File: lstm_horizon.py
+Description: LSTM model with a direct multi-horizon head (one output per future step).
+File Created: 19/10/2026
+Python Version: 3.9
+"""
+
+# Imports - Only PyTorch is needed
+import torch
+import torch.nn as nn
+
+# LSTM Model whose linear head predicts the whole trajectory in a single forward pass
+class LSTMHorizon(nn.Module):
+    """
+    Constructor for the inference model.
+    `horizon` is the number of future steps predicted at once; output shape is (batch, horizon).
+    """
+    def __init__(self, n_features=7, hidden_units=100, n_layers=10, horizon=7):
+        super(LSTMHorizon, self).__init__()
+        self.n_features = n_features
+        self.hidden_units = hidden_units
+        self.n_layers = n_layers
+        self.horizon = horizon
+
+        self.lstm = nn.LSTM(
+            input_size=n_features,
+            hidden_size=hidden_units,
+            num_layers=self.n_layers,
+            batch_first=True,
+            dropout=0.1
+        )
+        self.linear = nn.Linear(self.hidden_units, self.horizon)
+
+    # Forward Pass - no recursion or feature extrapolation, every horizon step comes from the same hidden state
+    def forward(self, x):
+        h0 = torch.zeros(self.n_layers, x.size(0), self.hidden_units, device=x.device)
+        c0 = torch.zeros(self.n_layers, x.size(0), self.hidden_units, device=x.device)
+
+        out, _ = self.lstm(x, (h0.detach(), c0.detach()))
+
+        # Last time step -> one value per horizon step
+        out = self.linear(out[:, -1, :])
+        return out
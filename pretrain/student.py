@@ -0,0 +1,26 @@
+"""
+File: student.py
+Description: Compact student architectures distilled from the production LSTM (see distill.py).
+File Created: 19/10/2026
+Python Version: 3.9
+
+A student is described by config/config_student.json: `student_type` is 'gru' (a shallow GRU, 1 layer by
+default) or 'tcn' (temporal conv net). The same config builds the network for training and for serving.
+"""
+
+# Imports
+from pretrain.gru import GRU
+from pretrain.tcn import TCN
+
+STUDENT_TYPES = ('gru', 'tcn')
+
+
+def build_student(config, n_features):
+    """Untrained student network for `n_features` inputs."""
+    student_type = config.get('student_type', 'gru').lower()
+    if student_type == 'gru':
+        return GRU(n_features=n_features, hidden_units=config['hidden_units'], n_layers=config['n_layers'])
+    if student_type == 'tcn':
+        return TCN(n_features=n_features, channels=config['channels'], kernel_size=config['kernel_size'],
+                   n_levels=config['n_levels'])
+    raise ValueError(f"Invalid student type '{student_type}'. Choose one of {STUDENT_TYPES}.")
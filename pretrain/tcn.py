@@ -0,0 +1,41 @@
+"""
+File: tcn.py
+Description: Temporal convolutional network (causal dilated convolutions) for inference.
+File Created: 19/10/2026
+Python Version: 3.9
+
+Level i is a causal convolution with dilation 2**i and a residual connection, so the receptive field grows
+exponentially with depth while every level runs over all timesteps in parallel. Only the last output step is
+used, and it only depends on the last `receptive_field` input rows: longer sequences are cut to that.
+"""
+
+# Imports
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class TCN(nn.Module):
+    """
+    Constructor for the inference model.
+    """
+    def __init__(self, n_features=7, channels=32, kernel_size=3, n_levels=5):
+        super(TCN, self).__init__()
+        self.n_features = n_features
+        self.channels = channels
+        self.kernel_size = kernel_size
+        self.n_levels = n_levels
+        self.receptive_field = 1 + (kernel_size - 1) * (2 ** n_levels - 1)
+
+        self.input = nn.Conv1d(n_features, channels, kernel_size=1)
+        self.levels = nn.ModuleList(
+            nn.Conv1d(channels, channels, kernel_size=kernel_size, dilation=2 ** i) for i in range(n_levels)
+        )
+        self.linear = nn.Linear(channels, 1)
+
+    # Forward Pass - x is (batch, timesteps, features) like the recurrent models
+    def forward(self, x):
+        out = self.input(x[:, -self.receptive_field:, :].transpose(1, 2))
+        for i, conv in enumerate(self.levels):
+            # Left padding only: step t never sees steps after t
+            out = out + F.relu(conv(F.pad(out, ((self.kernel_size - 1) * 2 ** i, 0))))
+        return self.linear(out[:, :, -1])
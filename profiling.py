@@ -0,0 +1,126 @@
+"""
+File: profiling.py
+Description: Opt-in sampling profiler for live /predict requests and training runs.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Profiling is off unless enabled through the environment:
+    PROFILE_PREDICT_EVERY_N   profile every Nth /predict request in each worker (0 disables)
+    PROFILE_TRAIN_STEPS       profile this many training batches of each coin's trainer.fit (0 disables)
+    PROFILE_TRAIN_SKIP        batches to let pass before the training capture starts (default 5)
+    PROFILE_DIR               output directory (default /data/logs/profiles)
+
+Each capture writes, under a name carrying the coin and model version:
+    <name>.trace.json   Chrome/Perfetto trace with the Python call stacks around every torch op
+    <name>.ops.txt      torch operator breakdown sorted by self CPU time
+    <name>.stacks.txt   folded stacks, ready for flamegraph.pl / speedscope
+    <name>.pstats       cProfile of the pure-Python code of the capturing thread (JSON parsing, row building,
+                        scaling), which the torch trace only sees when it calls a torch op; open with snakeviz
+    <name>.python.txt   the same cProfile as a table sorted by cumulative time
+    <name>.meta.json    coin, model version and capture details
+"""
+
+# Imports
+import os
+import io
+import json
+import pstats
+import cProfile
+import threading
+from datetime import datetime
+
+import torch
+from torch.profiler import profile, ProfilerActivity
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/data/logs/profiles')
+PREDICT_PROFILE_EVERY_N = int(os.environ.get('PROFILE_PREDICT_EVERY_N', '0'))
+TRAIN_PROFILE_STEPS = int(os.environ.get('PROFILE_TRAIN_STEPS', '0'))
+TRAIN_PROFILE_SKIP = int(os.environ.get('PROFILE_TRAIN_SKIP', '5'))
+
+
+class ProfileCapture:
+    """
+    Records a torch profile (with Python stacks) and a cProfile of the calling thread between start() and
+    stop() and writes them to disk. Usable as a context manager around a single request.
+    """
+    def __init__(self, kind, coin, model_version, output_dir=None, background_save=False):
+        self.kind = kind
+        self.coin = coin
+        self.model_version = model_version or 'unknown'
+        self.output_dir = output_dir or PROFILE_DIR
+        self.background_save = background_save
+        self._profiler = None
+        self._python_profiler = None
+        self._started_at = None
+
+    def start(self):
+        self._started_at = datetime.now()
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        self._profiler = profile(activities=activities, record_shapes=True, with_stack=True)
+        self._profiler.__enter__()
+        self._python_profiler = cProfile.Profile()
+        try:
+            self._python_profiler.enable()
+        except ValueError:  # another Python profiler is already active (Python 3.12+ allows only one)
+            self._python_profiler = None
+
+    def stop(self, **details):
+        if self._python_profiler is not None:
+            self._python_profiler.disable()
+        self._profiler.__exit__(None, None, None)
+        if self.background_save:
+            # Exporting the trace takes longer than the request itself, so keep it off the response path
+            threading.Thread(target=self._save, args=(details,), daemon=True).start()
+        else:
+            self._save(details)
+
+    def _save(self, details):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = self._started_at.strftime('%Y%m%d_%H%M%S_%f')
+            base = os.path.join(self.output_dir, f"{self.kind}_{self.coin}_{self.model_version}_{stamp}")
+
+            self._profiler.export_chrome_trace(base + '.trace.json')
+            self._profiler.export_stacks(base + '.stacks.txt', 'self_cpu_time_total')
+            with open(base + '.ops.txt', 'w') as f:
+                f.write(self._profiler.key_averages().table(sort_by='self_cpu_time_total', row_limit=50))
+            if self._python_profiler is not None:
+                self._python_profiler.dump_stats(base + '.pstats')
+                table = io.StringIO()
+                pstats.Stats(self._python_profiler, stream=table).sort_stats('cumulative').print_stats(50)
+                with open(base + '.python.txt', 'w') as f:
+                    f.write(table.getvalue())
+            with open(base + '.meta.json', 'w') as f:
+                json.dump(dict(details, kind=self.kind, coin=self.coin, model_version=self.model_version,
+                               started_at=self._started_at.isoformat(), pid=os.getpid()), f, indent=2)
+            print(f"Profile saved to {base}.*")
+        except Exception as e:
+            print(f"ERROR: could not save profile for {self.coin}: {e}")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(failed=exc_type is not None)
+        return False
+
+
+class RequestSampler:
+    """Thread-safe every-Nth-call sampler; never fires when N is 0."""
+    def __init__(self, every_n):
+        self.every_n = every_n
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def should_profile(self):
+        if self.every_n <= 0:
+            return False
+        with self._lock:
+            self._count += 1
+            return self._count % self.every_n == 0
+
+
+PREDICT_SAMPLER = RequestSampler(PREDICT_PROFILE_EVERY_N)
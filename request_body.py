@@ -0,0 +1,98 @@
+"""
+File: request_body.py
+Description: Compressed JSON request bodies: gzip/zstd encoding for clients, bounded streaming decoding for app.py.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+A 60-row /predict sequence repeats every feature name on every row (~430 KB as plain JSON); gzip cuts it
+to under half (432 KB -> 162 KB on the random-valued load_test fixtures).
+Clients send it with `Content-Encoding: gzip` (standard library) or `zstd` (optional `zstandard` package).
+The server never holds the whole compressed body and its expansion at once without a bound: the body is read
+from the WSGI stream through a decompressing reader, chunk by chunk, and rejected as soon as the decoded size
+passes MAX_DECODED_REQUEST_BYTES (decompression bombs). The wire size is capped separately by Flask's
+MAX_CONTENT_LENGTH (MAX_REQUEST_BYTES).
+"""
+
+# Imports
+import os
+import gzip
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional: without it only gzip and identity bodies are accepted
+    zstandard = None
+
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', str(2 * 1024 * 1024)))
+MAX_DECODED_REQUEST_BYTES = int(os.environ.get('MAX_DECODED_REQUEST_BYTES', str(8 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+class RequestBodyError(ValueError):
+    """A body that cannot be decoded, with the HTTP status to answer (400, 413 or 415)."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def supported_encodings():
+    return ('gzip', 'zstd') if zstandard is not None else ('gzip',)
+
+
+def encode_body(payload, encoding='gzip', level=None):
+    """JSON body and headers for a request; encoding is 'gzip', 'zstd' or None (uncompressed)."""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    headers = {"Content-Type": "application/json"}
+    if encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=6 if level is None else level)
+    elif encoding == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd request bodies require the 'zstandard' package")
+        body = zstandard.ZstdCompressor(level=3 if level is None else level).compress(body)
+    elif encoding is not None:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return body, headers
+
+
+def _reader(stream, encoding):
+    if encoding in ('', 'identity'):
+        return stream
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    raise RequestBodyError(415, f"Unsupported Content-Encoding '{encoding}'. Supported: "
+                                f"{', '.join(('identity',) + supported_encodings())}.")
+
+
+def read_body(stream, encoding=None, limit=MAX_DECODED_REQUEST_BYTES):
+    """Decoded bytes of a request stream, read chunk by chunk and capped at `limit` decoded bytes."""
+    reader = _reader(stream, (encoding or '').strip().lower())
+    body = bytearray()
+    try:
+        while True:
+            chunk = reader.read(min(CHUNK_SIZE, limit + 1 - len(body)))
+            if not chunk:
+                break
+            body += chunk
+            if len(body) > limit:
+                raise RequestBodyError(413, f"Decoded request body exceeds {limit} bytes.")
+    except (OSError, EOFError, zlib.error) as e:
+        raise RequestBodyError(400, f"Corrupt {encoding} request body: {e}")
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise RequestBodyError(400, f"Corrupt {encoding} request body: {e}")
+        raise
+    return bytes(body)
+
+
+def read_json(stream, encoding=None, limit=MAX_DECODED_REQUEST_BYTES):
+    """Parsed JSON of a (possibly compressed) request stream."""
+    body = read_body(stream, encoding, limit)
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise RequestBodyError(400, f"Invalid JSON body: {e}")
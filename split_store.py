@@ -0,0 +1,113 @@
+"""
+File: split_store.py
+Description: Memory-mappable binary format for the train/valid splits written by data_split.py.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+A split `<name>` is stored next to its CSV as:
+    <name>.npy          float32 [rows, columns] matrix in column-major (Fortran) order
+    <name>.dates.npy    int64 nanosecond timestamps of the rows
+    <name>.schema.json  column names and order, dtype, shape and date range
+Column-major layout keeps every column contiguous on disk, so reading the features.json columns through a
+memory map touches only those columns, with no text parsing and no float64 intermediate.
+"""
+
+# Imports
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+SCHEMA_SUFFIX = '.schema.json'
+
+
+def _base(path):
+    """Split name without extension: accepts `<name>`, `<name>.npy`, `<name>.csv` or `<name>.schema.json`."""
+    for suffix in (SCHEMA_SUFFIX, '.npy', '.csv'):
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def write_split(frame, path):
+    """Write a Date-indexed numeric frame as a binary split; returns the schema path."""
+    base = _base(path)
+    shape = frame.shape
+    matrix = np.lib.format.open_memmap(base + '.npy', mode='w+', dtype=np.float32, shape=shape, fortran_order=True)
+    for j, column in enumerate(frame.columns):
+        matrix[:, j] = frame[column].to_numpy(dtype=np.float32)
+    matrix.flush()
+    del matrix
+
+    dates = pd.DatetimeIndex(frame.index)
+    np.save(base + '.dates.npy', dates.asi8)
+    schema = {
+        'format_version': FORMAT_VERSION,
+        'data': os.path.basename(base) + '.npy',
+        'dates': os.path.basename(base) + '.dates.npy',
+        'index_name': frame.index.name or 'Date',
+        'dtype': 'float32',
+        'order': 'F',
+        'shape': list(shape),
+        'columns': [str(c) for c in frame.columns],
+        'first_date': dates[0].isoformat() if len(dates) else None,
+        'last_date': dates[-1].isoformat() if len(dates) else None,
+    }
+    with open(base + SCHEMA_SUFFIX, 'w') as f:
+        json.dump(schema, f, indent=2)
+    return base + SCHEMA_SUFFIX
+
+
+def is_split(path):
+    """True when `path` names a binary split (or a CSV that has one written next to it)."""
+    return os.path.exists(_base(path) + SCHEMA_SUFFIX)
+
+
+def open_split(path):
+    """(read-only memory map of the full [rows, columns] matrix, schema dict)."""
+    base = _base(path)
+    with open(base + SCHEMA_SUFFIX) as f:
+        schema = json.load(f)
+    if schema.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported split format version {schema.get('format_version')} in {base + SCHEMA_SUFFIX}")
+    matrix = np.load(os.path.join(os.path.dirname(base), schema['data']), mmap_mode='r')
+    if list(matrix.shape) != schema['shape']:
+        raise ValueError(f"Split data shape {matrix.shape} does not match its schema {schema['shape']}")
+    return matrix, schema
+
+
+def split_columns(path):
+    """Column names of a split, from its schema or (for a plain CSV) its header only."""
+    if is_split(path):
+        with open(_base(path) + SCHEMA_SUFFIX) as f:
+            return json.load(f)['columns']
+    return [c for c in pd.read_csv(path, nrows=0).columns if c != 'Date']
+
+
+def read_columns(path, columns):
+    """float32 [rows, len(columns)] array holding only the requested columns, plus the DatetimeIndex."""
+    matrix, schema = open_split(path)
+    positions = {c: j for j, c in enumerate(schema['columns'])}
+    missing = [c for c in columns if c not in positions]
+    if missing:
+        raise KeyError(f"The following columns are not in the split: {missing}")
+
+    values = np.empty((matrix.shape[0], len(columns)), dtype=np.float32)
+    for k, column in enumerate(columns):
+        values[:, k] = matrix[:, positions[column]]
+    dates = np.load(os.path.join(os.path.dirname(_base(path)), schema['dates']))
+    return values, pd.DatetimeIndex(dates, name=schema['index_name'])
+
+
+def read_frame(path, columns):
+    """
+    Date-indexed float32 frame of `columns`. Binary splits are read through the memory map; a CSV without
+    one is parsed as before, restricted to those columns.
+    """
+    if is_split(path):
+        values, dates = read_columns(path, columns)
+        return pd.DataFrame(values, index=dates, columns=list(columns), copy=False)
+    frame = pd.read_csv(path, index_col='Date', parse_dates=True, usecols=['Date'] + list(columns))
+    return frame[list(columns)].astype(np.float32)
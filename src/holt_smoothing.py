@@ -0,0 +1,129 @@
+"""
+File: holt_smoothing.py
+Description: Vectorized Holt (level + trend) exponential smoothing fitted for all feature columns at once.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Replaces one statsmodels Holt(...).fit() per feature with matrix recursions over a [T, n_features] array:
+smoothing parameters are chosen per column by a batched grid search on the one-step SSE (coarse grid,
+then a local refinement), the initial level/trend use the simple heuristic l0 = y0, b0 = y1 - y0, and the
+fitted state can be advanced row by row as new observations arrive instead of refitting.
+"""
+
+# Imports
+import hashlib
+
+import numpy as np
+
+ALPHA_GRID = np.linspace(0.05, 0.95, 10)
+BETA_GRID = np.linspace(0.0, 0.9, 10)
+REFINE_STEPS = np.linspace(-0.05, 0.05, 5)
+
+
+def _run(y, alpha, beta, level, trend):
+    """
+    Holt recursion over the rows of y for every (parameter set, column) pair in parallel.
+    alpha/beta/level/trend broadcast against y[0]; returns the one-step SSE and the final state.
+    """
+    shape = np.broadcast(alpha, beta, level, y[0]).shape
+    level = np.broadcast_to(level, shape).copy()
+    trend = np.broadcast_to(trend, shape).copy()
+    sse = np.zeros(shape)
+    for row in y:
+        forecast = level + trend
+        error = row - forecast
+        sse += error * error
+        new_level = forecast + alpha * error
+        trend = trend + beta * (new_level - level - trend)
+        level = new_level
+    return sse, level, trend
+
+
+class BatchedHolt:
+    """Fitted Holt state for n_features columns: per-column alpha, beta, level and trend."""
+    def __init__(self, alpha, beta, level, trend, n_obs):
+        self.alpha = alpha
+        self.beta = beta
+        self.level = level
+        self.trend = trend
+        self.n_obs = n_obs
+
+    @classmethod
+    def fit(cls, y, refine=True):
+        """Fit on a [T, n_features] array (T >= 3) with no missing values."""
+        y = np.asarray(y, dtype=np.float64)
+        if y.ndim != 2 or y.shape[0] < 3:
+            raise ValueError(f"Expected a [T, n_features] array with at least 3 rows, got shape {y.shape}")
+        if not np.isfinite(y).all():
+            raise ValueError("Holt smoothing input contains NaN or infinite values")
+
+        level0, trend0 = y[0], y[1] - y[0]
+        history = y[1:]
+
+        # Coarse grid: every (alpha, beta) pair against every column at once -> SSE of shape [G, n_features]
+        grid_alpha, grid_beta = (g.ravel()[:, None] for g in np.meshgrid(ALPHA_GRID, BETA_GRID, indexing='ij'))
+        sse, _, _ = _run(history, grid_alpha, grid_beta, level0, trend0)
+        best = sse.argmin(axis=0)
+        alpha, beta = grid_alpha[best, 0], grid_beta[best, 0]
+
+        if refine:
+            # Local grid around each column's own best pair
+            da, db = (d.ravel()[:, None] for d in np.meshgrid(REFINE_STEPS, REFINE_STEPS, indexing='ij'))
+            local_alpha = np.clip(alpha + da, 0.01, 1.0)
+            local_beta = np.clip(beta + db, 0.0, 1.0)
+            sse, _, _ = _run(history, local_alpha, local_beta, level0, trend0)
+            best = sse.argmin(axis=0)
+            columns = np.arange(y.shape[1])
+            alpha, beta = local_alpha[best, columns], local_beta[best, columns]
+
+        _, level, trend = _run(history, alpha, beta, level0, trend0)
+        return cls(alpha, beta, level, trend, n_obs=y.shape[0])
+
+    def update(self, rows):
+        """Advance the state with new observations ([k, n_features]) without refitting the parameters."""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if rows.shape[0] == 0:
+            return self
+        _, self.level, self.trend = _run(rows, self.alpha, self.beta, self.level, self.trend)
+        self.n_obs += rows.shape[0]
+        return self
+
+    def forecast(self, horizon):
+        """[horizon, n_features] matrix of level + h * trend for h = 1..horizon."""
+        steps = np.arange(1, horizon + 1, dtype=np.float64)[:, None]
+        return self.level[None, :] + steps * self.trend[None, :]
+
+    def save(self, path):
+        np.savez(path, alpha=self.alpha, beta=self.beta, level=self.level, trend=self.trend, n_obs=self.n_obs)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f['alpha'], f['beta'], f['level'], f['trend'], int(f['n_obs']))
+
+
+# Fitted states per model version with the digest of the rows they have seen, shared by every request of this process
+_FITTED = {}
+
+
+def _digest(rows):
+    return hashlib.sha256(np.ascontiguousarray(rows, dtype=np.float64).tobytes()).hexdigest()
+
+
+def get_or_fit(model_version, y):
+    """
+    Return the Holt state for a model version. A cached state is advanced over any rows of y it has not
+    seen yet; it is refitted when y no longer extends what it was fitted on (fewer rows, other width, or
+    rows it has already seen that were revised since).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    state, digest = _FITTED.get(model_version, (None, None))
+    if (state is None or state.n_obs > y.shape[0] or state.level.shape[0] != y.shape[1]
+            or _digest(y[:state.n_obs]) != digest):
+        state = BatchedHolt.fit(y)
+    elif state.n_obs < y.shape[0]:
+        state.update(y[state.n_obs:])
+    else:
+        return state
+    _FITTED[model_version] = (state, _digest(y))
+    return state
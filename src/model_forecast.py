@@ -1,11 +1,12 @@
 # model_forecast.py (النسخة النهائية المصححة)
 
+import os
 import pandas as pd
 import json
 import torch
 from pretrain.gru import GRU
 from pretrain.lstm import LSTM
-from statsmodels.tsa.holtwinters import Holt
+from holt_smoothing import get_or_fit
 from sklearn.preprocessing import MinMaxScaler
 import warnings
 
@@ -41,6 +42,10 @@ def load_prediction_assets(config_path, features_path, model_path, model_type, v
     
     # 2. محجم للهدف فقط (لعكس تحويل مخرجات النموذج)
     target_scaler = MinMaxScaler().fit(valid_df[[target_col_name]])
+
+    # ملاءمة Holt لكل الميزات دفعة واحدة، مخزنة حسب إصدار النموذج
+    model_version = os.path.splitext(os.path.basename(model_path))[0]
+    holt = get_or_fit(model_version, valid_df[features].to_numpy(dtype=float))
     
     print("Assets loaded successfully.")
     
@@ -51,7 +56,9 @@ def load_prediction_assets(config_path, features_path, model_path, model_type, v
         "features_scaler": features_scaler, # تم التغيير
         "target_scaler": target_scaler,     # تم التغيير
         "valid_df": valid_df,
-        "target_col_name": target_col_name
+        "target_col_name": target_col_name,
+        "model_version": model_version,
+        "holt": holt
     }
 
 def make_prediction(assets, horizon=7):
@@ -66,13 +73,8 @@ def make_prediction(assets, horizon=7):
     features_scaler = assets['features_scaler'] # تم التغيير
     target_scaler = assets['target_scaler']     # تم التغيير
 
-    # 1. توقع الميزات المستقبلية باستخدام Holt
-    pred_set = pd.DataFrame()
-    for feature in features:
-        holt = Holt(valid_df[feature], initialization_method="estimated").fit()
-        pred = holt.forecast(horizon)
-        pred_set = pd.concat([pred_set, pred], axis=1)
-    pred_set.columns = features
+    # 1. توقع الميزات المستقبلية باستخدام Holt (كل الميزات كعمليات مصفوفات واحدة)
+    pred_set = pd.DataFrame(assets['holt'].forecast(horizon), columns=features)
 
     # 2. الحصول على آخر تسلسل من البيانات
     sequence_length = config.get('sequence_length', 60)
@@ -98,4 +100,14 @@ def make_prediction(assets, horizon=7):
     print(f"✅ Forecast complete. Prediction: {final_forecast[0]}")
     
     # 7. إرجاع النتيجة
-    return float(final_forecast[0])
\ No newline at end of file
+    return float(final_forecast[0])
+
+
+def append_observations(assets, new_rows):
+    """
+    إضافة صفوف ميزات جديدة (مثلاً بيانات يوم جديد) وتحديث حالة Holt تدريجياً دون إعادة الملاءمة.
+    """
+    new_rows = new_rows[assets['valid_df'].columns]
+    assets['valid_df'] = pd.concat([assets['valid_df'], new_rows])
+    assets['holt'] = get_or_fit(assets['model_version'], assets['valid_df'][assets['features']].to_numpy(dtype=float))
+    return assets
\ No newline at end of file
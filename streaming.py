@@ -0,0 +1,158 @@
+"""
+File: streaming.py
+Description: Stateful streaming predictor: advances a coin's LSTM state by one timestep per new daily row.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+A full-window forecast runs the LSTM over 60 rows from a zero state. Here the (h, c) state reached at the last
+processed day is kept, and each new feature row costs a single-timestep forward pass. The state then carries
+more than 60 rows of history, so every `resync_every` steps it is rebuilt from a full-window run; the gap
+between the streamed and the full-window prediction at that point is reported as `drift`.
+
+Valid models are LSTMs that predict the next day's target, like everything /predict serves:
+    train_worker models (the registry, used by precompute_forecasts --streaming): trained from a zero state on
+        60-row windows only, so the longer streamed history is outside what they saw; resync_every bounds it
+    model_pretrain.py --stream_resync N (StreamingForecaster): supervised on next-row labels at exactly the
+        range of history lengths between resyncs, so they drift less
+GRU, horizon, GBM and student models have no forward_steps and are rejected.
+
+The state is persisted per coin (.npz) between runs of the daily job, together with the MinMax scaling in effect
+at its last resync: serving refits the scalers on each day's data file, and rows must be scaled the same way for
+the whole stretch the state has seen. The state is only reused with the same model version and feature list;
+a revised last row, a missing last date or any mismatch triggers a resync with the current scalers.
+"""
+
+# Imports
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+import torch
+
+DEFAULT_RESYNC_EVERY = 30
+
+
+class StreamingPredictor:
+    """
+    Constructor. `assets` come from model_forecast.load_prediction_assets (a model with forward_steps).
+    """
+    def __init__(self, assets, model_version, resync_every=DEFAULT_RESYNC_EVERY, sequence_length=60):
+        self.model = assets['model']
+        if not hasattr(self.model, 'forward_steps'):
+            raise ValueError(f"Model type '{assets.get('model_type')}' does not support streaming inference")
+        self.features = assets['features']
+        self.resync_every = resync_every
+        self.sequence_length = sequence_length
+
+        # MinMax scaling of the feature columns only (the target column of main_scaler is not an input)
+        scaler, target_scaler, n = assets['main_scaler'], assets['target_only_scaler'], len(self.features)
+        self.current_scaling = {
+            'scale': scaler.scale_[:n].astype(np.float32), 'min': scaler.min_[:n].astype(np.float32),
+            'target_scale': float(target_scaler.scale_[0]), 'target_min': float(target_scaler.min_[0]),
+        }
+        self.key = hashlib.sha256(json.dumps([model_version, self.features]).encode()).hexdigest()[:16]
+        self.state = None
+
+    @property
+    def scaling(self):
+        return self.state['scaling'] if self.state is not None else self.current_scaling
+
+    def _scale(self, values, scaling=None):
+        scaling = scaling or self.scaling
+        return np.asarray(values, dtype=np.float32) * scaling['scale'] + scaling['min']
+
+    def _run(self, rows, state=None):
+        """Forward pass over [T, F] scaled rows from `state`: (scaled prediction at the last row, new state)."""
+        with torch.no_grad():
+            out, state = self.model.forward_steps(torch.from_numpy(np.ascontiguousarray(rows)).unsqueeze(0), state)
+        return float(out[0, -1, 0]), state
+
+    def _inverse(self, scaled, scaling=None):
+        scaling = scaling or self.scaling
+        return (scaled - scaling['target_min']) / scaling['target_scale']
+
+    def _new_rows(self, frame):
+        """Rows after the last processed day, or None when the stored state cannot be continued."""
+        state = self.state
+        if state is None or state['key'] != self.key:
+            return None
+        last_date = pd.Timestamp(state['last_date'])
+        if last_date not in frame.index:
+            return None
+        position = frame.index.get_loc(last_date)
+        if not np.allclose(self._scale(frame.iloc[position].to_numpy()), state['last_row'], atol=1e-6):
+            return None
+        return frame.iloc[position + 1:]
+
+    def advance(self, frame):
+        """
+        Bring the state up to the last row of `frame` (Date-indexed feature rows, oldest first) and return
+        {'prediction', 'mode' (step / resync / unchanged), 'as_of', 'steps_since_resync', 'drift'}.
+        """
+        frame = frame[self.features]
+        if len(frame) < self.sequence_length:
+            raise ValueError(f"Need at least {self.sequence_length} rows, got {len(frame)}")
+        new_rows = self._new_rows(frame)
+        drift = None
+
+        if new_rows is not None and len(new_rows) == 0:
+            mode = 'unchanged'
+        elif new_rows is not None and self.state['steps_since_resync'] + len(new_rows) <= self.resync_every:
+            mode = 'step'
+            scaled, (h, c) = self._run(self._scale(new_rows.to_numpy()), self._torch_state())
+            self._store(frame, scaled, h, c, self.state['steps_since_resync'] + len(new_rows))
+        else:
+            mode = 'resync'
+            if new_rows is not None:
+                streamed, _ = self._run(self._scale(new_rows.to_numpy()), self._torch_state())
+                streamed = self._inverse(streamed)
+            self.state = None
+            scaled, (h, c) = self._run(self._scale(frame.tail(self.sequence_length).to_numpy()))
+            if new_rows is not None:
+                drift = abs(streamed - self._inverse(scaled))
+            self._store(frame, scaled, h, c, 0)
+
+        return {'prediction': self._inverse(self.state['scaled_prediction']), 'mode': mode,
+                'as_of': self.state['last_date'][:10], 'steps_since_resync': self.state['steps_since_resync'],
+                'drift': drift}
+
+    def _torch_state(self):
+        return torch.from_numpy(self.state['h']), torch.from_numpy(self.state['c'])
+
+    def _store(self, frame, scaled_prediction, h, c, steps_since_resync):
+        scaling = self.scaling
+        self.state = {
+            'key': self.key, 'last_date': frame.index[-1].isoformat(), 'steps_since_resync': steps_since_resync,
+            'scaled_prediction': scaled_prediction, 'last_row': self._scale(frame.iloc[-1].to_numpy(), scaling),
+            'h': h.numpy().copy(), 'c': c.numpy().copy(), 'scaling': scaling,
+        }
+
+    def save_state(self, path):
+        """Atomically write the state (the daily job and the API may share the disk)."""
+        if self.state is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        scaling = self.state['scaling']
+        meta = {k: self.state[k] for k in ('key', 'last_date', 'steps_since_resync', 'scaled_prediction')}
+        meta.update(target_scale=scaling['target_scale'], target_min=scaling['target_min'])
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, h=self.state['h'], c=self.state['c'], last_row=self.state['last_row'],
+                     scale=scaling['scale'], min=scaling['min'], meta=np.array(json.dumps(meta)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def load_state(self, path):
+        """Load a saved state if there is one written for the same model and features."""
+        if not os.path.exists(path):
+            return
+        with np.load(path) as saved:
+            meta = json.loads(str(saved['meta']))
+            if meta['key'] != self.key:
+                return
+            scaling = {'scale': saved['scale'], 'min': saved['min'],
+                       'target_scale': meta.pop('target_scale'), 'target_min': meta.pop('target_min')}
+            self.state = dict(meta, h=saved['h'], c=saved['c'], last_row=saved['last_row'], scaling=scaling)
@@ -0,0 +1,118 @@
+"""
+File: timeframe_resample.py
+Description: Streaming multi-timeframe resampling for data_split --multi_data.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+Each input CSV (Coin, Date, Open, High, Low, Close, Volume at any bar size) is read in fixed-size chunks and
+reduced to daily bars with one vectorized groupby per chunk. Chunk results are partial bars carrying the
+timestamps of their first and last rows, so they merge exactly whatever the chunk boundaries and row order:
+open of the earliest row, max high, min low, close of the latest row, summed volume. Memory is bounded by the
+chunk size plus the (much smaller) daily output.
+
+Intraday sources also produce a per-resolution feature block, aligned on the daily index:
+    {coin}_rvol_{res}    realized volatility, sqrt of the sum of squared intra-bar log returns log(C/O)
+    {coin}_range_{res}   mean intra-bar log range log(H/L)
+Both are sums over bars, so they merge across chunks the same way.
+"""
+
+# Imports
+import numpy as np
+import pandas as pd
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+DAILY = pd.Timedelta('1D')
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def resolution_label(delta):
+    """Short label for a bar size: 15m, 1h, 4h, 1d..."""
+    minutes = int(delta / pd.Timedelta('1min'))
+    if minutes % 1440 == 0:
+        return f"{minutes // 1440}d"
+    if minutes % 60 == 0:
+        return f"{minutes // 60}h"
+    return f"{minutes}m"
+
+
+def _read_chunks(path, chunksize):
+    return pd.read_csv(path, usecols=['Coin', 'Date'] + OHLCV, chunksize=chunksize,
+                       dtype={c: np.float32 for c in OHLCV} | {'Coin': 'category'})
+
+
+def detect_resolution(path, sample_rows=100_000):
+    """Median spacing between consecutive bars of the same coin, from the first rows of the file."""
+    sample = pd.read_csv(path, usecols=['Coin', 'Date'], nrows=sample_rows)
+    sample['Date'] = pd.to_datetime(sample['Date'])
+    spacing = sample.sort_values(['Coin', 'Date']).groupby('Coin')['Date'].diff().dropna()
+    spacing = spacing[spacing > pd.Timedelta(0)]
+    if spacing.empty:
+        raise ValueError(f"Cannot detect the bar size of {path}: need at least two bars of one coin")
+    return spacing.median()
+
+
+def _aggregate_chunk(chunk, rule):
+    chunk['Date'] = pd.to_datetime(chunk['Date'])
+    chunk['Coin'] = chunk['Coin'].astype(str).str.upper()
+    chunk['Bar'] = chunk['Date'].dt.floor(rule)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chunk['sq_return'] = np.log(chunk['Close'] / chunk['Open']) ** 2
+        chunk['log_range'] = np.log(chunk['High'] / chunk['Low'])
+
+    chunk = chunk.sort_values('Date', kind='stable')
+    return chunk.groupby(['Coin', 'Bar'], sort=False, observed=True).agg(
+        Open=('Open', 'first'), High=('High', 'max'), Low=('Low', 'min'), Close=('Close', 'last'),
+        Volume=('Volume', 'sum'), first_ts=('Date', 'min'), last_ts=('Date', 'max'),
+        sq_return=('sq_return', 'sum'), log_range=('log_range', 'sum'), n_bars=('Date', 'size'),
+    ).reset_index()
+
+
+def _merge_partials(partials):
+    """Combine partial bars of the same (Coin, Bar) coming from different chunks."""
+    parts = pd.concat(partials, ignore_index=True)
+    keys = ['Coin', 'Bar']
+    grouped = parts.groupby(keys, sort=True)
+    merged = grouped.agg(High=('High', 'max'), Low=('Low', 'min'), Volume=('Volume', 'sum'),
+                         sq_return=('sq_return', 'sum'), log_range=('log_range', 'sum'), n_bars=('n_bars', 'sum'))
+    merged['Open'] = parts.loc[grouped['first_ts'].idxmin(), keys + ['Open']].set_index(keys)['Open']
+    merged['Close'] = parts.loc[grouped['last_ts'].idxmax(), keys + ['Close']].set_index(keys)['Close']
+    return merged.reset_index()
+
+
+def resample_csv(path, rule='1D', chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Daily (or `rule`) bars of one CSV.
+    Returns (long OHLCV frame with Date/Coin columns, per-resolution block or None, resolution label).
+    """
+    resolution = detect_resolution(path)
+    partials = [_aggregate_chunk(chunk, rule) for chunk in _read_chunks(path, chunksize)]
+    bars = _merge_partials(partials)
+    label = resolution_label(resolution)
+
+    block = None
+    if resolution < pd.Timedelta(rule):
+        stats = pd.DataFrame({
+            'Coin': bars['Coin'].str.lower(), 'Bar': bars['Bar'],
+            'rvol': np.sqrt(bars['sq_return']), 'range': bars['log_range'] / bars['n_bars'],
+        }).pivot(index='Bar', columns='Coin')
+        stats.columns = [f"{coin}_{stat}_{label}" for stat, coin in stats.columns]
+        block = stats.rename_axis('Date')
+
+    daily = bars.rename(columns={'Bar': 'Date'})[['Date', 'Coin'] + OHLCV]
+    print(f"... {path}: {label} bars -> {len(daily)} {resolution_label(pd.Timedelta(rule))} bars "
+          f"for {daily['Coin'].nunique()} coins")
+    return daily, block, resolution
+
+
+def combine_timeframes(paths, rule='1D', chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Resample every source to `rule` bars. For the OHLCV table, each (Date, Coin) comes from the finest source
+    that has it; intraday sources add their per-resolution blocks, outer-joined on Date.
+    """
+    results = sorted((resample_csv(path, rule, chunksize) for path in paths), key=lambda r: r[2])
+    daily = pd.concat([r[0] for r in results], ignore_index=True)
+    daily = daily.drop_duplicates(subset=['Date', 'Coin'], keep='first').sort_values(['Coin', 'Date'])
+
+    blocks = [r[1] for r in results if r[1] is not None]
+    block = pd.concat(blocks, axis=1).sort_index() if blocks else None
+    return daily.reset_index(drop=True), block
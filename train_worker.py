@@ -5,20 +5,32 @@ import torch
 import pytorch_lightning as pl
 from pytorch_lightning.callbacks import ModelCheckpoint, EarlyStopping
 from torch.utils.data import TensorDataset, DataLoader
+from sklearn.preprocessing import MinMaxScaler
 from datetime import datetime, timedelta
 import os
+import json
 import numpy as np
 
 # استيراد دوالك ونماذجك
 from data_pull import fetch_crypto_data_from_coingecko
 from feature_engineering import create_features
 from pretrain.lstm import LSTM
+from pretrain.forecaster import Forecaster
+from precompute_forecasts import precompute_all
+from model_registry import register_version, registry_path, save_scalers
+from weights_store import export_weights, inference_state_dict
+import profiling
 
 # --- الإعدادات ---
 # المسارات إلى القرص الصلب الدائم في Render
 MODELS_OUTPUT_DIR = '/data/models' 
 DATA_OUTPUT_DIR = '/data/data' # مجلد لحفظ ملفات البيانات المستخدمة للتدريب
 LOGS_DIR = '/data/logs' # مجلد لحفظ سجلات التدريب
+CHECKPOINTS_DIR = os.path.join(LOGS_DIR, 'checkpoints') # نقاط حفظ Lightning المؤقتة (ليست ملفات الخدمة)
+CONFIG_PATH = 'config/config_nn.json'
+FEATURES_PATH = 'config/features.json'
+# تخزين الأوزان بدقة float16 (نصف الحجم على القرص، تُحوّل إلى float32 عند التحميل)
+EXPORT_HALF = os.environ.get('EXPORT_HALF', '0') == '1'
 
 COIN_LIST = [
     'btc', 'eth', 'usdt', 'usdc', 'bnb', 'xrp', 'busd', 'ada', 
@@ -72,6 +84,41 @@ def prepare_dataloaders(features_df, target_col_name, sequence_length, batch_siz
     return train_loader, val_loader, n_features
 
 
+class ProfileTrainingCallback(pl.Callback):
+    """
+    يسجل ملف تحليل أداء بطول ثابت (عدد محدد من الدفعات) أثناء trainer.fit.
+    يتم تفعيله عبر متغير البيئة PROFILE_TRAIN_STEPS.
+    """
+    def __init__(self, coin, model_version, steps, skip=0):
+        self.steps = steps
+        self.skip = skip
+        self.capture = profiling.ProfileCapture('train', coin, model_version, output_dir=profiling.PROFILE_DIR)
+        self.recorded = 0
+        self.active = False
+        self.done = False
+
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx):
+        if not self.active and not self.done and trainer.global_step >= self.skip:
+            self.capture.start()
+            self.active = True
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx):
+        if self.active:
+            self.recorded += 1
+            if self.recorded >= self.steps:
+                self._finish(trainer)
+
+    def on_train_end(self, trainer, pl_module):
+        # في حال انتهى التدريب قبل اكتمال عدد الدفعات المطلوب
+        if self.active:
+            self._finish(trainer)
+
+    def _finish(self, trainer):
+        self.capture.stop(batches=self.recorded, start_step=self.skip, batch_size=BATCH_SIZE, epoch=trainer.current_epoch)
+        self.active = False
+        self.done = True
+
+
 def run_training_job():
     print("--- [WORKER] بدء مهمة التدريب المجدولة ---")
 
@@ -79,6 +126,8 @@ def run_training_job():
     os.makedirs(MODELS_OUTPUT_DIR, exist_ok=True)
     os.makedirs(DATA_OUTPUT_DIR, exist_ok=True)
     os.makedirs(LOGS_DIR, exist_ok=True)
+    with open(CONFIG_PATH) as f: config = json.load(f)
+    with open(FEATURES_PATH) as f: features = json.load(f)['features']
 
     # --- 1. جلب البيانات وهندسة الميزات (مرة واحدة لكل العملات) ---
     print("[1/3] جلب ومعالجة البيانات لجميع العملات...")
@@ -109,36 +158,56 @@ def run_training_job():
             if target_col not in features_df.columns:
                 print(f"  - العمود المستهدف '{target_col}' غير موجود، تخطي هذه العملة.")
                 continue
+            missing = [col for col in features if col not in features_df.columns]
+            if missing:
+                print(f"  - ميزات غير موجودة في البيانات {missing}، تخطي هذه العملة.")
+                continue
+
+            # نفس الميزات ونفس التحجيم الذي يستخدمه الخادم (features.json و MinMax على ملف البيانات المحفوظ)
+            columns = features + [target_col]
+            main_scaler = MinMaxScaler().fit(features_df[columns])
+            target_scaler = MinMaxScaler().fit(features_df[[target_col]])
+            scaled_df = pd.DataFrame(main_scaler.transform(features_df[columns]), index=features_df.index, columns=columns)
 
             # تجهيز محملات البيانات لهذه العملة
-            train_loader, val_loader, n_features = prepare_dataloaders(features_df, target_col, SEQUENCE_LENGTH, BATCH_SIZE)
+            train_loader, val_loader, n_features = prepare_dataloaders(scaled_df, target_col, SEQUENCE_LENGTH, BATCH_SIZE)
             
             if train_loader is None:
                 print(f"  - لا توجد بيانات كافية لتدريب نموذج {coin.upper()}.")
                 continue
 
             # إعداد نقاط الحفظ والتوقف المبكر
-            # ** تعديل جذري هنا لحفظ الملف بالاسم الصحيح الذي يفهمه app.py **
+            # نقطة الحفظ (.ckpt) مؤقتة؛ ملف الخدمة هو أوزان النموذج الداخلي (.pth) ويُسجل في registry.json
             current_date_str = datetime.now().strftime("%d%m%Y")
+            model_version = f'lstm_{coin}_{current_date_str}'
             checkpoint_callback = ModelCheckpoint(
-                dirpath=MODELS_OUTPUT_DIR,
-                # حفظ الملف بالاسم واللاحقة الصحيحين
-                filename=f'lstm_{coin}_{current_date_str}',
+                dirpath=CHECKPOINTS_DIR,
+                filename=model_version,
                 save_top_k=1,
                 verbose=True,
                 monitor='val_loss',
                 mode='min'
             )
             early_stopping_callback = EarlyStopping(monitor='val_loss', patience=10, verbose=True)
+            callbacks = [checkpoint_callback, early_stopping_callback]
 
-            # تهيئة النموذج
-            model = LSTM(n_features=n_features, lr=1e-4)
+            # وضع التحليل الاختياري لأداء التدريب
+            if profiling.TRAIN_PROFILE_STEPS > 0:
+                callbacks.append(ProfileTrainingCallback(
+                    coin, f'lstm_{coin}_{current_date_str}', profiling.TRAIN_PROFILE_STEPS, profiling.TRAIN_PROFILE_SKIP
+                ))
+
+            # تهيئة النموذج (نموذج الاستدلال داخل غلاف التدريب Forecaster)
+            model = Forecaster(
+                LSTM(n_features=n_features, hidden_units=config['hidden_units'], n_layers=config['n_layers']),
+                lr=config['learning_rate'],
+            )
 
             # تهيئة المدرب
             trainer = pl.Trainer(
                 max_epochs=MAX_EPOCHS,
                 accelerator='cpu',
-                callbacks=[checkpoint_callback, early_stopping_callback],
+                callbacks=callbacks,
                 logger=pl.loggers.CSVLogger(save_dir=LOGS_DIR, name=f'{coin}_training_logs'),
                 enable_progress_bar=False # مناسب للتشغيل في الخلفية
             )
@@ -148,18 +217,41 @@ def run_training_job():
             trainer.fit(model, train_loader, val_loader)
 
             if checkpoint_callback.best_model_path:
-                print(f"  - ✅ اكتمل تدريب {coin.upper()}! تم حفظ أفضل نموذج في: {checkpoint_callback.best_model_path}")
+                # تصدير أوزان الاستدلال فقط من أفضل نقطة حفظ إلى ملف .pth الذي يحمّله الخادم، ثم حذف نقطة الحفظ
+                # (حالة المُحسِّن والاستدعاءات لا يحتاجها الخادم وتشغل القرص المشترك)
+                checkpoint = torch.load(checkpoint_callback.best_model_path, map_location='cpu', weights_only=False)
+                model_save_path = os.path.join(MODELS_OUTPUT_DIR, f'{model_version}.pth')
+                weights_info = export_weights(inference_state_dict(checkpoint), model_save_path, half=EXPORT_HALF)
+                os.remove(checkpoint_callback.best_model_path)
+                print(f"  - ✅ اكتمل تدريب {coin.upper()}! تم حفظ أفضل نموذج في: {model_save_path} "
+                      f"({weights_info['bytes'] / 1e6:.2f} MB, {weights_info['dtype']})")
                 # حفظ نسخة من البيانات المستخدمة مع تاريخ اليوم لضمان التوافق
                 data_filename = f"{coin}_{current_date_str}.csv"
                 data_save_path = os.path.join(DATA_OUTPUT_DIR, data_filename)
-                features_df.to_csv(data_save_path, index=False)
+                features_df.to_csv(data_save_path, index_label='Date')
                 print(f"  - تم حفظ نسخة البيانات المستخدمة في: {data_save_path}")
+
+                # ملف المحجمات وتسجيل الإصدار في سجل النماذج (يصبح الإصدار الحالي للعملة)
+                scaler_save_path = os.path.join(MODELS_OUTPUT_DIR, f'{model_version}.scaler.json')
+                save_scalers(scaler_save_path, main_scaler, target_scaler, columns)
+                register_version(
+                    registry_path(MODELS_OUTPUT_DIR), coin, model_version, 'lstm', model_save_path, data_save_path,
+                    features, scaler_path=scaler_save_path, checksum=weights_info['sha256'],
+                    metrics={'val_loss': float(checkpoint_callback.best_model_score),
+                             'epochs': trainer.current_epoch,
+                             'train_windows': len(train_loader.dataset), 'val_windows': len(val_loader.dataset)},
+                )
+                print(f"  - تم تسجيل الإصدار {model_version} في سجل النماذج.")
             else:
                  print(f"  - ❌ فشل تدريب {coin.upper()} أو لم يتم تحقيق تحسن لحفظ النموذج.")
 
         except Exception as e:
             print(f"  - ‼️ حدث خطأ فادح أثناء تدريب نموذج {coin.upper()}: {e}")
 
+    # --- 3. حساب تنبؤات اليوم التالي مسبقاً لتقديمها عبر GET /forecast/<coin> ---
+    print("\n[3/3] حساب التنبؤات المسبقة لجميع العملات...")
+    precompute_all(COIN_LIST, models_dir=MODELS_OUTPUT_DIR, data_dir=DATA_OUTPUT_DIR)
+
     print("\n--- ✅ نجحت مهمة التدريب المجدولة لجميع العملات ---")
 
 if __name__ == "__main__":
@@ -0,0 +1,298 @@
+"""
+File: walk_forward.py
+Description: Parallel walk-forward (rolling-origin) cross-validation of the per-coin models.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+The feature table is read once (CSV or binary split) into two shared-memory float32 blocks, features [T, F]
+and the coins' targets [T, C]. Samples follow train_worker.create_sequences, the convention of the served
+models: sample i is rows i .. i+seq-1 and its label is the next day's target at row i+seq (the last input row
+already carries indicators of its own day's price), so a fold is nothing more than ranges of sample indices:
+    expanding   train [0, origin)                      test [origin, origin + test_size)
+    rolling     train [origin - train_size, origin)    test [origin, origin + test_size)
+with origins moving forward by test_size. Each (coin, fold) job runs in a spawned process that attaches to the
+shared blocks, builds batches straight from a sliding-window view, scales them with min/max taken from the
+fold's own training rows (no look-ahead), trains with early stopping on the tail of the training range and
+scores the test range. Output is one row of metrics per fold and coin, plus a per-coin summary.
+"""
+
+# Imports
+import os
+import argparse
+import json
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+
+from split_store import split_columns, read_frame
+
+warnings.filterwarnings("ignore")
+
+COIN_LIST = [
+    'btc', 'eth', 'usdt', 'usdc', 'bnb', 'xrp', 'busd', 'ada',
+    'sol', 'doge', 'dot', 'dai', 'shib', 'trx', 'avax', 'uni',
+    'wbtc', 'leo', 'ltc'
+]
+
+# Shared arrays of the current worker process, set by _attach
+_SHARED = {}
+
+
+def make_folds(n_samples, n_folds, min_train, test_size=None, mode='expanding'):
+    """
+    List of fold dicts with sample index ranges. `min_train` is the number of samples (or a fraction of them)
+    in the first training range; in rolling mode every training range has that length.
+    """
+    if 0 < min_train < 1:
+        min_train = int(n_samples * min_train)
+    min_train = int(min_train)
+    if test_size is None:
+        test_size = (n_samples - min_train) // n_folds
+    if min_train < 2 or test_size < 1 or min_train + n_folds * test_size > n_samples:
+        raise ValueError(f"Cannot fit {n_folds} folds of {test_size} test samples after {min_train} training "
+                         f"samples in {n_samples} samples")
+
+    folds = []
+    for k in range(n_folds):
+        origin = min_train + k * test_size
+        train_start = 0 if mode == 'expanding' else origin - min_train
+        folds.append({'fold': k, 'train': (train_start, origin), 'test': (origin, origin + test_size)})
+    return folds
+
+
+def regression_metrics(y_true, y_pred, y_prev):
+    """MAE, RMSE, MAPE (%), directional accuracy against the previous actual, and the persistence MAE."""
+    error = y_pred - y_true
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mape = np.nanmean(np.abs(error) / np.abs(y_true)) * 100
+    return {
+        'mae': float(np.mean(np.abs(error))),
+        'rmse': float(np.sqrt(np.mean(error ** 2))),
+        'mape': float(mape),
+        'directional_accuracy': float(np.mean(np.sign(y_pred - y_prev) == np.sign(y_true - y_prev))),
+        'naive_mae': float(np.mean(np.abs(y_true - y_prev))),
+    }
+
+
+def _to_shared(array):
+    block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block
+
+
+def _attach(spec, threads):
+    """Worker initializer: map the shared blocks and pin the torch thread count."""
+    import torch
+    torch.set_num_threads(threads)
+    for name, (block_name, shape) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _SHARED[name + '_block'] = block
+        _SHARED[name] = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+
+
+def _build_model(config, n_features):
+    from pretrain.lstm import LSTM
+    from pretrain.gru import GRU
+    model_class = GRU if config.get('model_type', 'lstm').lower() == 'gru' else LSTM
+    return model_class(n_features=n_features, hidden_units=config['hidden_units'], n_layers=config['n_layers'])
+
+
+def run_fold(coin_index, coin, fold, config, sequence_length, epochs, val_fraction, seed):
+    """Train and score one coin on one fold, reading only the shared arrays."""
+    import torch
+    torch.manual_seed(seed + fold['fold'])
+    rng = np.random.default_rng(seed + fold['fold'])
+
+    features, targets = _SHARED['features'], _SHARED['targets'][:, coin_index]
+    # [N, F, seq], no copy; the last window has no next-day label
+    windows = np.lib.stride_tricks.sliding_window_view(features, sequence_length, axis=0)[:-1]
+    labels = targets[sequence_length:]
+
+    train_start, train_end = fold['train']
+    test_start, test_end = fold['test']
+    # Scaling from the rows the training samples can see
+    train_rows = features[train_start:train_end + sequence_length - 1]
+    f_min, f_span = train_rows.min(axis=0), np.ptp(train_rows, axis=0)
+    f_span[f_span == 0] = 1.0
+    train_labels = labels[train_start:train_end]
+    t_min, t_span = float(train_labels.min()), float(np.ptp(train_labels)) or 1.0
+
+    def batch(indices):
+        x = (windows[indices].transpose(0, 2, 1) - f_min) / f_span
+        y = (labels[indices] - t_min) / t_span
+        return torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32)), torch.from_numpy(y.astype(np.float32))
+
+    n_val = max(1, int((train_end - train_start) * val_fraction))
+    fit_idx = np.arange(train_start, train_end - n_val)
+    val_idx = np.arange(train_end - n_val, train_end)
+
+    model = _build_model(config, features.shape[1])
+    optimizer = torch.optim.Adam(model.parameters(), lr=config['learning_rate'])
+    loss_fn = torch.nn.MSELoss()
+    batch_size, patience = config['batch_size'], config.get('patience', 10)
+
+    def predict(indices):
+        model.eval()
+        out = []
+        with torch.no_grad():
+            for start in range(0, len(indices), 1024):
+                x, _ = batch(indices[start:start + 1024])
+                out.append(model(x).reshape(-1).numpy())
+        return np.concatenate(out)
+
+    started = time.perf_counter()
+    best_loss, best_state, stale, epochs_run = np.inf, None, 0, 0
+    for epoch in range(epochs):
+        model.train()
+        order = rng.permutation(fit_idx)
+        for start in range(0, len(order), batch_size):
+            x, y = batch(order[start:start + batch_size])
+            optimizer.zero_grad()
+            loss = loss_fn(model(x).reshape(-1), y)
+            loss.backward()
+            optimizer.step()
+        epochs_run = epoch + 1
+
+        val_loss = float(np.mean((predict(val_idx) - (labels[val_idx] - t_min) / t_span) ** 2))
+        if val_loss < best_loss:
+            best_loss, stale = val_loss, 0
+            best_state = {k: v.clone() for k, v in model.state_dict().items()}
+        else:
+            stale += 1
+            if stale >= patience:
+                break
+    if best_state is None:
+        # No epoch (epochs=0) or only NaN validation losses: there is no model worth scoring
+        raise ValueError(f"no usable model after {epochs_run} epoch(s) (validation loss {best_loss})")
+    model.load_state_dict(best_state)
+
+    test_idx = np.arange(test_start, test_end)
+    y_pred = predict(test_idx) * t_span + t_min
+    y_true = labels[test_idx]
+    # Previous actual target (the window's last day) for the direction and persistence baseline
+    y_prev = targets[test_idx + sequence_length - 1]
+
+    return dict(coin=coin, fold=fold['fold'], train_samples=len(fit_idx), test_samples=len(test_idx),
+                epochs=epochs_run, val_loss=best_loss, train_seconds=round(time.perf_counter() - started, 2),
+                **regression_metrics(y_true, y_pred, y_prev))
+
+
+def walk_forward(data_path, features, coins, config, n_folds=5, min_train=0.5, test_size=None, mode='expanding',
+                 epochs=None, val_fraction=0.1, workers=None, seed=1234):
+    """Run every (coin, fold) job in parallel; returns the per-fold metrics frame."""
+    available = split_columns(data_path)
+    skipped = [c for c in coins if f"{c.lower()}_avg_ohlc" not in available]
+    if skipped:
+        print(f"Skipping coins without a target column: {', '.join(c.upper() for c in skipped)}")
+    coins = [c for c in coins if c not in skipped]
+    if not coins:
+        raise ValueError("None of the requested coins has a target column in the dataset")
+    targets = [f"{c.lower()}_avg_ohlc" for c in coins]
+
+    # Features and targets are read and converted exactly once
+    frame = read_frame(data_path, features + targets)
+    dates = frame.index
+    sequence_length = config.get('sequence_length', 60)
+    n_samples = len(frame) - sequence_length
+    folds = make_folds(n_samples, n_folds, min_train, test_size, mode)
+
+    blocks = {
+        'features': _to_shared(np.ascontiguousarray(frame[features].to_numpy(dtype=np.float32))),
+        'targets': _to_shared(np.ascontiguousarray(frame[targets].to_numpy(dtype=np.float32))),
+    }
+    spec = {'features': (blocks['features'].name, (len(frame), len(features))),
+            'targets': (blocks['targets'].name, (len(frame), len(targets)))}
+    del frame
+
+    jobs = [(i, coin, fold) for i, coin in enumerate(coins) for fold in folds]
+    workers = max(1, min(workers or os.cpu_count(), len(jobs)))
+    threads = max(1, os.cpu_count() // workers)
+    print(f"--- Walk-forward: {len(coins)} coins x {len(folds)} folds ({mode}), "
+          f"{workers} workers x {threads} threads ---")
+
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'),
+                                 initializer=_attach, initargs=(spec, threads)) as pool:
+            futures = [(coin, fold, pool.submit(run_fold, i, coin, fold, config, sequence_length,
+                                                config['n_epochs'] if epochs is None else epochs, val_fraction, seed))
+                       for i, coin, fold in jobs]
+            for coin, fold, future in futures:
+                try:
+                    row = future.result()
+                except Exception as e:
+                    print(f"  - ❌ {coin.upper()} fold {fold['fold']}: {e}")
+                    continue
+                # Date of the label of the first and last sample of each range
+                row.update(train_from=dates[fold['train'][0] + sequence_length].date(),
+                           test_from=dates[fold['test'][0] + sequence_length].date(),
+                           test_to=dates[fold['test'][1] + sequence_length - 1].date())
+                print(f"  - {coin.upper()} fold {row['fold']}: MAE {row['mae']:.4f} "
+                      f"(naive {row['naive_mae']:.4f}), dir. acc. {row['directional_accuracy']:.2f}")
+                rows.append(row)
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+    return pd.DataFrame(rows)
+
+
+def summarize(results):
+    """Mean and standard deviation of every metric across folds, per coin."""
+    metrics = ['mae', 'rmse', 'mape', 'directional_accuracy', 'naive_mae']
+    summary = results.groupby('coin')[metrics].agg(['mean', 'std'])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+    return summary.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward cross-validation of the per-coin models')
+    parser.add_argument('-d', '--data', type=str, required=True,
+                        help='feature table with the coins\' *_avg_ohlc targets (CSV or binary split)')
+    parser.add_argument('--features', type=str, default='config/features.json', help='Path to the features JSON.')
+    parser.add_argument('--config', type=str, default='config/config_nn.json', help='Model/training config JSON.')
+    parser.add_argument('--coins', nargs='+', default=COIN_LIST, help='coins to evaluate')
+    parser.add_argument('-k', '--folds', type=int, default=5, help='number of folds')
+    parser.add_argument('--min_train', type=float, default=0.5,
+                        help='first training range, in samples or as a fraction of all samples')
+    parser.add_argument('--test_size', type=int, help='test samples per fold (default: split the rest evenly)')
+    parser.add_argument('--mode', type=str, default='expanding', help='expanding or rolling training window')
+    parser.add_argument('--epochs', type=int, help='maximum epochs per fold (default: n_epochs of the config)')
+    parser.add_argument('--workers', type=int, help='parallel fold workers (default: one per CPU)')
+    parser.add_argument('-o', '--output', type=str, default='walk_forward.csv', help='per-fold metrics CSV')
+    args = parser.parse_args()
+
+    if args.mode not in ('expanding', 'rolling'):
+        print('Invalid mode selected: allowed are expanding and rolling!')
+        sys.exit(1)
+
+    with open(args.features) as f: features = json.load(f)['features']
+    with open(args.config) as f: config = json.load(f)
+
+    started = time.perf_counter()
+    try:
+        results = walk_forward(args.data, features, args.coins, config, args.folds, args.min_train, args.test_size,
+                               args.mode, args.epochs, workers=args.workers, seed=config.get('seed', 1234))
+    except (ValueError, KeyError, FileNotFoundError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if results.empty:
+        print("❌ No fold could be evaluated.")
+        sys.exit(1)
+
+    results.to_csv(args.output, index=False)
+    summary = summarize(results)
+    summary_path = os.path.splitext(args.output)[0] + '_summary.csv'
+    summary.to_csv(summary_path, index=False)
+    print('\n' + summary.to_string(index=False))
+    print(f"\nDone in {time.perf_counter() - started:.1f}s. Saved to {args.output} and {summary_path}")
+
+
+if __name__ == '__main__':
+    main()
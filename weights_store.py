@@ -0,0 +1,122 @@
+"""
+File: weights_store.py
+Description: Slim weights-only inference artifacts: export from Lightning checkpoints, memory-mapped loading.
+File Created: 19/10/2026
+Python Version: 3.9+
+
+A Lightning checkpoint carries optimizer state, callback state and hyperparameters next to the weights. The
+export keeps the inference state_dict only (the `model.` sub-module of Forecaster), with every tensor in its
+own contiguous storage, optionally stored as float16. The file is a regular torch zip archive: serving opens
+it with torch.load(mmap=True) and float32 weights are assigned to the model without a copy. Float16 files are
+half the size on disk and are upcast to float32 when loaded.
+
+The SHA-256 of the file is written to a `<path>.json` sidecar together with the dtype, parameter count and
+size; check it with `verify_weights` (reading the whole file) after copying artifacts around.
+
+CLI:
+    python weights_store.py <checkpoint.ckpt | weights.pth> -o models/lstm_btc_19102026.pth [--half]
+"""
+
+# Imports
+import os
+import argparse
+import hashlib
+import json
+
+import torch
+
+FORMAT_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def inference_state_dict(checkpoint, prefix='model.'):
+    """The inference network's state_dict from a Lightning checkpoint dict or a plain state_dict."""
+    state = checkpoint.get('state_dict', checkpoint)
+    if state and all(key.startswith(prefix) for key in state):
+        state = {key[len(prefix):]: value for key, value in state.items()}
+    return state
+
+
+def export_weights(state_dict, path, half=False):
+    """Write a slim weights file and its sidecar; returns the sidecar (with the checksum)."""
+    dtype = torch.float16 if half else torch.float32
+    # Each tensor gets its own compact storage (views into larger buffers would otherwise save the whole buffer)
+    slim = {key: (value.detach().to(dtype) if value.is_floating_point() else value.detach()).contiguous().clone()
+            for key, value in state_dict.items()}
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    torch.save(slim, tmp_path)
+    os.replace(tmp_path, path)
+
+    sidecar = {
+        'format_version': FORMAT_VERSION,
+        'dtype': str(dtype).replace('torch.', ''),
+        'parameters': sum(value.numel() for value in slim.values()),
+        'bytes': os.path.getsize(path),
+        'sha256': file_sha256(path),
+    }
+    with open(f"{path}.json", 'w') as f:
+        json.dump(sidecar, f, indent=2)
+    return sidecar
+
+
+def load_weights(path):
+    """
+    State dict of a weights file, memory-mapped. Returns (state_dict, zero_copy): zero_copy is True when every
+    floating tensor is already float32, so the model can take them with load_state_dict(..., assign=True).
+    Files written with the legacy (non-zip) torch format are loaded normally.
+    """
+    try:
+        state = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    except RuntimeError:
+        state = torch.load(path, map_location='cpu')
+    zero_copy = True
+    for key, value in state.items():
+        if value.is_floating_point() and value.dtype != torch.float32:
+            state[key] = value.float()
+            zero_copy = False
+    return state, zero_copy
+
+
+def load_into(model, path):
+    """Load a weights file into `model` (zero-copy for float32 files) and return it."""
+    state, zero_copy = load_weights(path)
+    model.load_state_dict(state, assign=zero_copy)
+    return model
+
+
+def verify_weights(path):
+    """True when the file matches the checksum of its sidecar; None when there is no sidecar."""
+    sidecar_path = f"{path}.json"
+    if not os.path.exists(sidecar_path):
+        return None
+    with open(sidecar_path) as f:
+        expected = json.load(f)['sha256']
+    return file_sha256(path) == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a slim weights-only inference artifact')
+    parser.add_argument('input', type=str, help='Lightning checkpoint (.ckpt) or state_dict (.pth)')
+    parser.add_argument('-o', '--output', type=str, required=True, help='output weights file (.pth)')
+    parser.add_argument('--half', action='store_true', help='store floating weights as float16')
+    args = parser.parse_args()
+
+    checkpoint = torch.load(args.input, map_location='cpu', weights_only=False)
+    sidecar = export_weights(inference_state_dict(checkpoint), args.output, half=args.half)
+    before = os.path.getsize(args.input)
+    print(f"{args.input} ({before / 1e6:.2f} MB) -> {args.output} ({sidecar['bytes'] / 1e6:.2f} MB, "
+          f"{sidecar['dtype']}, {sidecar['parameters']} values)")
+    print(f"sha256 {sidecar['sha256']}")
+
+
+if __name__ == '__main__':
+    main()